@@ -7,9 +7,30 @@ Attributes:
     REDIRECT_URI (str): Callback URI for OAuth authorization response.
     SESSION (bool): Indicates if session management is enabled.
     CODE_CHALLENGE_METHOD (str): Method used for PKCE code challenge.
+    SQUARE_BASE_URL (str): Square API URL, overridable to target a local stand-in such as
+        'tests.fakes.fake_square_server'.
     AUTH_URL (str): Base URL for Square OAuth authorization.
     POST_TOKEN_URL (str): URL for exchanging authorization code for access token.
     PORT (int): Port number for running the local application.
+    HTTP_MAX_CONNECTIONS (int): Maximum open connections in the shared HTTP pool.
+    HTTP_MAX_KEEPALIVE_CONNECTIONS (int): Maximum idle connections kept alive in the pool.
+    HTTP_KEEPALIVE_EXPIRY (float): Seconds an idle connection is kept alive.
+    HTTP_CONNECT_TIMEOUT (float): Seconds to wait for a connection to be established.
+    HTTP_TIMEOUT (float): Seconds to wait for reads, writes and pool checkouts.
+    HTTP_MAX_RETRIES (int): Retries of a throttled or failed request before giving up.
+    HTTP_BACKOFF_INITIAL (float): Backoff ceiling in seconds of the first retry.
+    HTTP_BACKOFF_BASE (float): Growth factor of the backoff ceiling per retry.
+    HTTP_BACKOFF_MAX (float): Largest wait in seconds between attempts.
+    SQUARE_RATE_LIMIT (float): Requests per second allowed per merchant and endpoint.
+    SQUARE_RATE_BURST (int): Requests per merchant and endpoint sent back to back.
+    SQUARE_MIN_RATE (float): Lowest rate throttling can reduce an endpoint to.
+    MIGRATION_BATCH_SIZE (int): Rows rewritten per transaction by data migrations.
+    SQLITE_STORAGE_PROFILE (str): Storage profile of the application engine, one of
+        'app.storage.STORAGE_PROFILES'. Defaults to SQLite's own settings.
+    ETL_STORAGE_PROFILE (str): Storage profile of the engine the ETL syncs write through.
+    SQL_PROFILE_PATH (str | None): Report file of the SQL profiler. Off when unset.
+    SQL_PROFILE_PYTHON (bool): Also profiles Python calls with cProfile while profiling SQL.
+    SQL_PROFILE_N_PLUS_ONE (int): Single executions of a select flagged as an N+1 pattern.
 """
 import os
 from dotenv import load_dotenv
@@ -33,7 +54,39 @@ SESSION = False
 CODE_CHALLENGE_METHOD = "S256"
 
 # URLs
-AUTH_URL = "https://connect.squareup.com/oauth2/authorize?"
-POST_TOKEN_URL = "https://connect.squareup.com/oauth2/token"
+SQUARE_BASE_URL = os.getenv("SQUARE_BASE_URL", "https://connect.squareup.com").rstrip("/")
+AUTH_URL = f"{SQUARE_BASE_URL}/oauth2/authorize?"
+POST_TOKEN_URL = f"{SQUARE_BASE_URL}/oauth2/token"
 
 PORT = 5000
+
+# Shared HTTP connection pool, overridable per deployment
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+
+# Retries of throttled (429) and failed (5xx) requests
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+HTTP_BACKOFF_INITIAL = float(os.getenv("HTTP_BACKOFF_INITIAL", "1"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "2"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "60"))
+
+# Token bucket per merchant and endpoint, halved whenever Square throttles it
+SQUARE_RATE_LIMIT = float(os.getenv("SQUARE_RATE_LIMIT", "10"))
+SQUARE_RATE_BURST = int(os.getenv("SQUARE_RATE_BURST", "20"))
+SQUARE_MIN_RATE = float(os.getenv("SQUARE_MIN_RATE", "0.5"))
+
+# Data migrations commit every batch so other connections are never locked out for long
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "5000"))
+
+# SQLite PRAGMAs of the application engine, shared by Flask, reports and the token cache.
+# Only the ETL engine trades durability for bulk write speed with 'etl-bulk'
+SQLITE_STORAGE_PROFILE = os.getenv("SQLITE_STORAGE_PROFILE", "default")
+ETL_STORAGE_PROFILE = os.getenv("ETL_STORAGE_PROFILE", "etl-bulk")
+
+# Opt-in SQL profiling of the application engine, see 'app.profiling'
+SQL_PROFILE_PATH = os.getenv("SQL_PROFILE_PATH")
+SQL_PROFILE_PYTHON = os.getenv("SQL_PROFILE_PYTHON", "0").lower() in ("1", "true", "yes")
+SQL_PROFILE_N_PLUS_ONE = int(os.getenv("SQL_PROFILE_N_PLUS_ONE", "50"))
@@ -7,10 +7,20 @@ Attributes:
     engine (Engine): The SQLAlchemy engine instance used for database connections.
     Session (sessionmaker): A configured sessionmaker
         bound to the engine for creating database sessions.
+    etl_engine (Engine): A second engine on the same database, used by the ETL syncs.
+    ETLSession (sessionmaker): A sessionmaker bound to the ETL engine.
+
+The engine applies the SQLite storage profile named by 'SQLITE_STORAGE_PROFILE', SQLite's
+defaults unless set, and the ETL engine the one named by 'ETL_STORAGE_PROFILE', see
+'app.storage'. Only the ETL syncs opt into the faster, less durable 'etl-bulk' PRAGMAs, so
+Flask, reports and the token cache keep full synchronous commits. When 'SQL_PROFILE_PATH' is
+set, every statement executed by both engines is profiled by 'app.profiling' and the report
+is written to that path when the process exits.
 
 Functions:
     init_db():
-        Should be called once during application startup to ensure all tables are created.
+        Should be called once during application startup to ensure all tables are created
+        and up to date.
         Raises SQLAlchemyError if there is an error during table creation.
 """
 #pylint: disable=[C0415,W0611]
@@ -19,20 +29,39 @@ from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from app.config import (
+    ETL_STORAGE_PROFILE,
+    SQL_PROFILE_PATH,
+    SQL_PROFILE_PYTHON,
+    SQLITE_STORAGE_PROFILE,
+)
+from app.storage import apply_storage_profile
+
 Base = declarative_base()
 
 load_dotenv()
 DB_PATH = os.getenv(key="DB_PATH", default="sqlite:///bellyrub.db")
 
 engine = create_engine(DB_PATH)
+apply_storage_profile(engine, SQLITE_STORAGE_PROFILE)
 Session = sessionmaker(bind=engine)
 
+# Connections only open on first use, so processes that never sync never touch this engine
+etl_engine = create_engine(DB_PATH)
+apply_storage_profile(etl_engine, ETL_STORAGE_PROFILE)
+ETLSession = sessionmaker(bind=etl_engine)
+
+if SQL_PROFILE_PATH:
+    from app.profiling import profile_process
+    profile_process(SQL_PROFILE_PATH, (engine, etl_engine), python=SQL_PROFILE_PYTHON)
+
 def init_db():
     """
     Initializes the database by creating all tables defined in the SQLAlchemy Base metadata.
 
     This function should be called once during application startup to ensure that
-    all database tables are created according to the current models.
+    all database tables are created according to the current models. Tables created by
+    older versions are then upgraded in place by 'app.migrations'.
 
     Raises:
         SQLAlchemyError: If there is an error during table creation.
@@ -44,8 +73,12 @@ def init_db():
     from app.db_models.sync_state import SyncState
     from app.db_models.payment import Payment
     from app.db_models.order import Order
+    from app.db_models.order_line_item import OrderLineItem
+
+    from app.migrations import migrate
 
     Base.metadata.create_all(engine)
+    migrate(engine)
 
 if __name__ == "__main__":
     init_db()
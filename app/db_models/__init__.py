@@ -6,6 +6,7 @@ Imports:
     Group: Model representing user groups.
     Customer: Model representing customers.
     GroupMembership: Model representing membership relationships between customers and groups.
+    OrderLineItem: Model representing line items of orders.
 
 __all__:
     - AccessToken
@@ -13,6 +14,9 @@ __all__:
     - GroupMembership
     - Group
     - SyncState
+    - Payment
+    - Order
+    - OrderLineItem
 """
 from .access_token import AccessToken
 from .group import Group
@@ -21,6 +25,7 @@ from .group_membership import GroupMembership
 from .sync_state import SyncState
 from .payment import Payment
 from .order import Order
+from .order_line_item import OrderLineItem
 
 __all__ = [
     "AccessToken",
@@ -29,5 +34,6 @@ __all__ = [
     "Group",
     "SyncState",
     "Payment",
-    "Order"
+    "Order",
+    "OrderLineItem"
 ]
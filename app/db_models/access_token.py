@@ -16,6 +16,7 @@ Attributes:
 from datetime import datetime, timezone
 from sqlalchemy import Column, String, DateTime, Boolean
 from app.db import Base
+from app.db_models.types import UTCDateTime
 
 class AccessToken(Base):
     """
@@ -37,10 +38,10 @@ class AccessToken(Base):
     merchant_id = Column(String, primary_key=True)
     access_token = Column(String)
     token_type = Column(String)
-    expires_at = Column(String)
+    expires_at = Column(UTCDateTime)
     refresh_token = Column(String)
     short_lived = Column(Boolean, default=False)
-    refresh_token_expires_at = Column(String)
+    refresh_token_expires_at = Column(UTCDateTime)
     created_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
 
     def __repr__(self):
@@ -12,8 +12,9 @@ Attributes:
     note (str): Additional notes or comments about the customer.
     creation_source (str): Source from which the customer record was created.
 """
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, String, Integer
 from app.db import Base
+from app.db_models.types import UTCDateTime
 
 class Customer(Base):
     """
@@ -35,8 +36,8 @@ class Customer(Base):
     __tablename__ = 'customers'
 
     id = Column(String, primary_key=True)
-    created_at = Column(DateTime(timezone=True))
-    updated_at = Column(DateTime(timezone=True), index=True)
+    created_at = Column(UTCDateTime)
+    updated_at = Column(UTCDateTime, index=True)
     given_name = Column(String)
     family_name = Column(String, default="")
     locality = Column(String)
@@ -6,9 +6,12 @@ Classes:
 
     id (str): Primary key, unique identifier for the group.
     name (str): Name of the group.
+    created_at (datetime): UTC timestamp when the group was created.
+    updated_at (datetime): UTC timestamp when the group was last updated.
 """
 from sqlalchemy import Column, String
 from app.db import Base
+from app.db_models.types import UTCDateTime
 
 class Group(Base):
     """
@@ -17,11 +20,16 @@ class Group(Base):
     Attributes:
         id (str): The unique identifier for the group.
         name (str): The name of the group.
+        created_at (datetime): UTC timestamp when the group was created.
+        updated_at (datetime): UTC timestamp when the group was last updated. Upserts never
+            replace a group with an older version of it.
     """
     __tablename__ = 'groups'
 
     id = Column(String, primary_key=True)
     name = Column(String)
+    created_at = Column(UTCDateTime)
+    updated_at = Column(UTCDateTime)
 
     def __repr__(self):
         return f"<Group(id={self.id}, name={self.name})>"
@@ -6,12 +6,14 @@ Classes:
 
     customer_id (str): Foreign key referencing the customer's ID in the 'customers' table.
     group_id (str): Foreign key referencing the group's ID in the 'groups' table.
+    updated_at (datetime): UTC timestamp of the customer version the membership belongs to.
 
 Methods:
     __repr__(): Returns a string representation of the GroupMembership instance.
 """
-from sqlalchemy import Column, String, Integer, ForeignKey
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
 from app.db import Base
+from app.db_models.types import UTCDateTime
 
 class GroupMembership(Base):
     """
@@ -21,12 +23,32 @@ class GroupMembership(Base):
         id (int): Primary key, unique identifier for the group membership.
         customer_id (str): Foreign key referencing the customer's ID.
         group_id (str): Foreign key referencing the group's ID.
+        updated_at (datetime): UTC timestamp of the customer version the membership
+            belongs to.
+        parent_key (str): Column referencing the customer that versions the memberships.
+        natural_key (tuple): Columns identifying a membership when it is upserted.
+
+    Both foreign keys are indexed, so the groups of a customer and the customers of a group
+    are looked up without scanning the table. A customer belongs to a group at most once.
+
+    Memberships are mapped from the 'group_ids' of Square customers and versioned by their
+    customer like order line items: memberships older than the stored customer are deleted
+    when the customer is written, so a customer removed from a group leaves it with its next
+    version. See 'belly_rubb.etl.bulk_upsert.PageWriter'.
     """
     __tablename__ = 'group_memberships'
+    __table_args__ = (
+        Index('ix_group_memberships_customer_id_group_id', 'customer_id', 'group_id',
+              unique=True),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    customer_id = Column(String, ForeignKey('customers.id'))
-    group_id = Column(String, ForeignKey('groups.id'))
+    customer_id = Column(String, ForeignKey('customers.id'), index=True)
+    group_id = Column(String, ForeignKey('groups.id'), index=True)
+    updated_at = Column(UTCDateTime)
+
+    parent_key = 'customer_id'
+    natural_key = ('customer_id', 'group_id')
 
     def __repr__(self):
         return f"<GroupMembership(id={self.id}, customer_id={self.customer_id}, \
@@ -1,14 +1,18 @@
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 from app.db import Base
+from app.db_models.types import UTCDateTime
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_location_id_created_at", "location_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True)
     location_id = Column(String, ForeignKey("payments.location_id"))
-    created_at = Column(String)
-    updated_at = Column(String)
-    customer_id = Column(String, ForeignKey("customers.id"))
+    created_at = Column(UTCDateTime)
+    updated_at = Column(UTCDateTime, index=True)
+    customer_id = Column(String, ForeignKey("customers.id"), index=True)
 
     def __repr__(self):
         return f"<Order(id={self.id}, customer_id={self.customer_id})>"
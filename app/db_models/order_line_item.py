@@ -0,0 +1,71 @@
+"""
+SQLAlchemy ORM model for the 'order_line_items' table.
+
+Classes:
+    OrderLineItem: Represents a single line item of an order.
+
+Attributes:
+    order_id (str): Foreign key referencing the order the line item belongs to.
+    uid (str): Identifier of the line item within its order.
+    catalog_object_id (str): Catalog id of the ordered item variation.
+    name (str): Name of the ordered item.
+    variation_name (str): Name of the ordered item variation.
+    quantity (float): Quantity ordered.
+    gross_sales_money (int): Gross sales of the line item in the smallest currency unit.
+    currency (str): Currency code of the gross sales.
+    created_at (datetime): UTC timestamp when the order was created.
+    updated_at (datetime): UTC timestamp of the order version the line item belongs to.
+"""
+from sqlalchemy import Column, String, Float, Integer, ForeignKey, Index
+from app.db import Base
+from app.db_models.types import UTCDateTime
+
+class OrderLineItem(Base):
+    """
+    Represents a line item of an order in the system.
+
+    The order's creation timestamp is copied onto every line item so item popularity over
+    a date range can be answered from this table and its indexes alone.
+
+    Line items are versioned by their order: every row carries the 'updated_at' of the order
+    version it came from, and rows older than the stored order are deleted when the order is
+    written, so line items removed from an order disappear with its next version. See
+    'belly_rubb.etl.bulk_upsert.PageWriter'.
+
+    Attributes:
+        order_id (str): Foreign key referencing the associated order. Part of the primary key.
+        uid (str): Identifier of the line item within its order. Part of the primary key.
+        catalog_object_id (str): Catalog id of the ordered item variation.
+        name (str): Name of the ordered item.
+        variation_name (str): Name of the ordered item variation.
+        quantity (float): Quantity ordered.
+        gross_sales_money (int): Gross sales of the line item in the smallest currency unit.
+        currency (str): Currency code of the gross sales.
+        created_at (datetime): UTC timestamp when the order was created.
+        updated_at (datetime): UTC timestamp of the order version the line item belongs to.
+        parent_key (str): Column referencing the order that versions the line items.
+    """
+    __tablename__ = "order_line_items"
+    __table_args__ = (
+        Index("ix_order_line_items_name_created_at", "name", "created_at"),
+        Index("ix_order_line_items_catalog_object_id_created_at",
+              "catalog_object_id", "created_at"),
+        Index("ix_order_line_items_created_at", "created_at"),
+    )
+
+    order_id = Column(String, ForeignKey("orders.id"), primary_key=True)
+    uid = Column(String, primary_key=True)
+    catalog_object_id = Column(String)
+    name = Column(String)
+    variation_name = Column(String)
+    quantity = Column(Float)
+    gross_sales_money = Column(Integer)
+    currency = Column(String)
+    created_at = Column(UTCDateTime)
+    updated_at = Column(UTCDateTime)
+
+    parent_key = "order_id"
+
+    def __repr__(self):
+        return f"<OrderLineItem(order_id={self.order_id}, name={self.name}, \
+            variation_name={self.variation_name}, quantity={self.quantity})>"
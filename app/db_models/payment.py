@@ -6,8 +6,8 @@ Classes:
 
 Attributes:
     id (str): Unique identifier for the payment.
-    created_at (str): Timestamp when the payment was created.
-    updated_at (str): Timestamp when the payment was last updated.
+    created_at (datetime): UTC timestamp when the payment was created.
+    updated_at (datetime): UTC timestamp when the payment was last updated. Indexed.
     status (str): Current status of the payment.
     amount (float): Amount of the payment.
     total_money (float): Total money involved in the payment.
@@ -18,16 +18,17 @@ Attributes:
     order_id (str): Foreign key referencing the associated order.
     square_product (str): Product identifier from Square.
 """
-from sqlalchemy import Column, String, Float, ForeignKey
+from sqlalchemy import Column, String, Float, ForeignKey, Index
 from app.db import Base
+from app.db_models.types import UTCDateTime
 
 class Payment(Base):
     """
     Represents a payment transaction in the system.
     Attributes:
         id (str): Unique identifier for the payment.
-        created_at (str): Timestamp when the payment was created.
-        updated_at (str): Timestamp when the payment was last updated.
+        created_at (datetime): UTC timestamp when the payment was created.
+        updated_at (datetime): UTC timestamp when the payment was last updated. Indexed.
         status (str): Current status of the payment.
         amount (float): Amount of the payment.
         total_money (float): Total money involved in the payment.
@@ -37,12 +38,18 @@ class Payment(Base):
         location_id (str): Identifier for the location where the payment was made.
         order_id (str): Foreign key referencing the associated order.
         square_product (str): Product identifier from Square.
+
+    Payments are joined to orders on 'order_id' and filtered by location over a date range,
+    so both are indexed.
     """
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_location_id_created_at", "location_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True)
-    created_at = Column(String)
-    updated_at = Column(String)
+    created_at = Column(UTCDateTime)
+    updated_at = Column(UTCDateTime, index=True)
     status = Column(String)
     amount = Column(Float)
     total_money = Column(Float)
@@ -51,7 +58,7 @@ class Payment(Base):
     status = Column(String)
     card_brand = Column(String)
     location_id = Column(String)
-    order_id = Column(String, ForeignKey("orders.id"))
+    order_id = Column(String, ForeignKey("orders.id"), index=True)
     square_product = Column(String)
 
     def __repr__(self):
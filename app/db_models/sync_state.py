@@ -3,12 +3,13 @@ This module defines the SyncState ORM model for tracking synchronization states
 
 Classes:
     SyncState: Represents the synchronization state for a specific resource,
-    including the last sync timestamp and last update timestamp.
+    including the last sync timestamp and the checkpoint of an unfinished sync.
 """
 #pylint: disable=[E1102]
 from sqlalchemy import Column, String
 
 from app.db import Base
+from app.db_models.types import UTCDateTime
 
 class SyncState(Base):
     """
@@ -16,13 +17,22 @@ class SyncState(Base):
 
     Attributes:
         resource (str): The name of the resource being tracked. Acts as the primary key.
-        last_synced (str): The timestamp of the last successful synchronization
-            for the resource.
+        last_synced (datetime): The UTC timestamp of the last successful synchronization
+            for the resource. None until the first sync completes.
+        cursor (str): Position to resume an unfinished sync from, or None if the last
+            sync completed.
+        high_water_mark (datetime): Latest 'updated_at' among records stored by the
+            unfinished sync.
+        checkpointed_at (datetime): When the unfinished sync last saved a checkpoint.
     """
     __tablename__ = 'sync_states'
 
     resource = Column(String, primary_key=True)
-    last_synced = Column(String, nullable=False)
+    last_synced = Column(UTCDateTime, nullable=True)
+    cursor = Column(String, nullable=True)
+    high_water_mark = Column(UTCDateTime, nullable=True)
+    checkpointed_at = Column(UTCDateTime, nullable=True)
 
     def __repr__(self):
-        return f"<SyncState(resource={self.resource}, last_synced={self.last_synced})>"
+        return (f"<SyncState(resource={self.resource}, last_synced={self.last_synced}, "
+                f"cursor={self.cursor})>")
@@ -0,0 +1,56 @@
+"""
+This module provides the column types shared by the ORM models.
+
+Classes:
+    UTCDateTime: Timestamp column that always stores UTC and returns timezone-aware datetimes.
+
+Functions:
+    to_utc(value: datetime | str | None) -> datetime | None:
+        Normalizes a datetime or ISO 8601 string to an aware UTC datetime.
+"""
+from datetime import datetime, timezone
+from typing import Optional, Union
+from dateutil import parser
+from sqlalchemy.types import DateTime, TypeDecorator
+
+def to_utc(value: Optional[Union[datetime, str]]) -> Optional[datetime]:
+    """
+    Normalizes a datetime or ISO 8601 string to an aware UTC datetime.
+
+    Naive values are assumed to be in UTC already.
+
+    Args:
+        value (datetime | str | None): The timestamp to normalize.
+
+    Returns:
+        datetime | None: The timestamp in UTC, or None for None and empty strings.
+    """
+    if value is None or value == "":
+        return None
+
+    if isinstance(value, str):
+        value = parser.isoparse(value)
+
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+
+    return value.astimezone(timezone.utc)
+
+class UTCDateTime(TypeDecorator):
+    """
+    UTCDateTime stores timestamps in UTC and returns them as aware datetimes.
+
+    Values are converted to UTC and stored without an offset, in SQLite as fixed-width
+    'YYYY-MM-DD HH:MM:SS.ffffff' text. Every stored timestamp therefore has the same format,
+    so comparisons, MAX() and indexes order them chronologically. Datetimes in any timezone
+    and ISO 8601 strings are accepted, and Square's RFC 3339 timestamps can be bound as is.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        value = to_utc(value)
+        return value.replace(tzinfo=None) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return value.replace(tzinfo=timezone.utc) if value is not None else None
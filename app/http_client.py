@@ -0,0 +1,71 @@
+"""
+This module provides the process-wide pooled HTTP client shared by the Square SDK clients
+and the OAuth token requests.
+
+Reusing one client keeps connections alive between requests, so a sync run pays the TCP and
+TLS handshake once per pooled connection instead of once per client. Every request goes
+through the RequestScheduler from 'app.rate_limit', which rate limits and retries it.
+
+Attributes:
+    HTTP_LIMITS (httpx.Limits): Pool size and keep-alive settings from 'app.config'.
+    HTTP_TIMEOUTS (httpx.Timeout): Connect, read, write and pool timeouts from 'app.config'.
+
+Functions:
+    get_http_client() -> httpx.Client:
+        Returns the shared HTTP client, creating it on first use.
+    close_http_client():
+        Closes the shared HTTP client and its pooled connections.
+"""
+import atexit
+import threading
+import httpx
+
+from app.rate_limit import RequestScheduler
+from app.config import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, \
+    HTTP_KEEPALIVE_EXPIRY, HTTP_CONNECT_TIMEOUT, HTTP_TIMEOUT
+
+HTTP_LIMITS = httpx.Limits(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+)
+HTTP_TIMEOUTS = httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+_client = None
+_lock = threading.Lock()
+
+def get_http_client() -> httpx.Client:
+    """
+    Returns the shared HTTP client, creating it on first use.
+
+    httpx clients are thread-safe, so fetcher threads share the same connection pool and
+    the same rate limits.
+
+    Returns:
+        httpx.Client: The pooled HTTP client.
+    """
+    global _client  # pylint: disable=global-statement
+
+    if _client is None:
+        with _lock:
+            if _client is None:
+                transport = RequestScheduler(httpx.HTTPTransport(limits=HTTP_LIMITS))
+                _client = httpx.Client(transport=transport, timeout=HTTP_TIMEOUTS,
+                                       follow_redirects=True)
+
+    return _client
+
+def close_http_client() -> None:
+    """
+    Closes the shared HTTP client and its pooled connections.
+
+    The next call to get_http_client() creates a new client.
+    """
+    global _client  # pylint: disable=global-statement
+
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+atexit.register(close_http_client)
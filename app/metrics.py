@@ -0,0 +1,350 @@
+"""
+This module provides the in-process metrics registry used to find the bottleneck of a sync.
+
+Every stage of the sync loop records into it: the wait for each API page, mapping, filter
+decisions, upsert batches and commits, as well as the latency, retries and throttles of
+every Square request. Timings go into fixed-bucket histograms, so recording costs a lock
+and a bisect and memory does not grow with the number of observations.
+
+The registry is exposed as Prometheus text on the Flask app's '/metrics' route, and sync
+runs log a JSON summary of what they recorded.
+
+Attributes:
+    LATENCY_BUCKETS (tuple): Upper bounds in seconds of the timing histogram buckets.
+    SIZE_BUCKETS (tuple): Upper bounds of the batch size histogram buckets.
+    METRICS (MetricsRegistry): Registry shared by the whole process.
+
+Classes:
+    Histogram:
+        - Counts observations per bucket and estimates quantiles from the buckets.
+    MetricsRegistry:
+        - Holds counters and histograms by name and labels.
+        - Methods:
+            - inc(name: str, amount: float, **labels) -> None: Increments a counter.
+            - observe(name: str, value: float, buckets: tuple, **labels) -> None: Records
+                a value in a histogram.
+            - time(name: str, **labels): Context manager recording its duration.
+            - timed(iterable, name: str, **labels): Records the wait for every item.
+            - snapshot() -> dict: Copies the current values.
+            - summary(since: dict) -> dict: Summarizes the values recorded since a snapshot.
+            - prometheus_text() -> str: Renders the registry in the Prometheus text format.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+import math
+import threading
+import time
+from typing import Optional
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Help text of the metrics recorded by the sync, shown in the Prometheus output
+HELP = {
+    "square_request_seconds": "Latency of Square API request attempts.",
+    "square_retries_total": "Square API attempts retried, by response status.",
+    "square_throttles_total": "Square API attempts throttled with a 429 response.",
+    "sync_fetch_seconds": "Time a sync waited for the next page of records.",
+    "sync_map_seconds": "Time spent filtering and mapping a page of records.",
+    "sync_records_decoded_total": "Records received from the API.",
+    "sync_records_filtered_total": "Filter decisions on received records.",
+    "sync_upsert_seconds": "Time spent executing an upsert batch.",
+    "sync_upsert_rows": "Rows per upsert batch.",
+    "sync_commit_seconds": "Time spent committing a checkpoint or a finished run.",
+}
+
+class Histogram:
+    """
+    Histogram counts observations in buckets with fixed upper bounds.
+
+    Attributes:
+        bounds (tuple): Upper bounds of the buckets. A last bucket holds larger values.
+        counts (list): Number of observations per bucket, not cumulative.
+        sum (float): Sum of all observations.
+        count (int): Number of observations.
+    """
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Records a value.
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self) -> "Histogram":
+        """
+        Returns an independent copy of the histogram.
+        """
+        histogram = Histogram(self.bounds)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+
+        return histogram
+
+    def __sub__(self, other: "Histogram") -> "Histogram":
+        histogram = Histogram(self.bounds)
+        histogram.counts = [a - b for a, b in zip(self.counts, other.counts)]
+        histogram.sum = self.sum - other.sum
+        histogram.count = self.count - other.count
+
+        return histogram
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimates a quantile by interpolating inside the bucket holding it.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float | None: The estimate, the largest bound if it falls in the last bucket,
+                or None without observations.
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+
+        return self.bounds[-1]
+
+class MetricsRegistry:
+    """
+    MetricsRegistry holds counters and histograms keyed by name and labels.
+
+    Series are created on first use. All methods are thread-safe, so fetcher threads, the
+    writer thread and the HTTP transport can record into the same registry.
+
+    Methods:
+        inc(name: str, amount: float = 1, **labels) -> None:
+            Increments a counter.
+        observe(name: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels) -> None:
+            Records a value in a histogram.
+        time(name: str, **labels):
+            Context manager recording the duration of its block in a histogram.
+        timed(iterable, name: str, **labels):
+            Yields the items of an iterable, recording the wait for each of them.
+        snapshot() -> dict:
+            Copies the current values, to summarize a single run later.
+        summary(since: dict | None = None) -> dict:
+            Summarizes the values recorded since a snapshot, as JSON-serializable data.
+        prometheus_text() -> str:
+            Renders all series in the Prometheus text exposition format.
+        reset() -> None:
+            Removes all series.
+    """
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        """
+        Increments a counter.
+
+        Args:
+            name (str): Name of the counter, ending in '_total'.
+            amount (float): Amount to add.
+            **labels: Labels of the series.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS,
+                **labels) -> None:
+        """
+        Records a value in a histogram.
+
+        Args:
+            name (str): Name of the histogram.
+            value (float): The observed value.
+            buckets (tuple): Bucket bounds, used when the series is created.
+            **labels: Labels of the series.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        """
+        Records the duration of the block in seconds, also when it raises.
+
+        Args:
+            name (str): Name of the histogram.
+            **labels: Labels of the series.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, iterable, name: str, **labels):
+        """
+        Yields the items of an iterable, recording how long each one took to produce.
+
+        Args:
+            iterable: Items to yield, e.g. the pages of a pager.
+            name (str): Name of the histogram.
+            **labels: Labels of the series.
+
+        Yields:
+            The items of the iterable.
+        """
+        iterator = iter(iterable)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                self.observe(name, time.perf_counter() - start, **labels)
+
+                yield item
+        finally:
+            # Stop background fetchers such as a PrefetchPager when iteration ends early
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def snapshot(self) -> dict:
+        """
+        Copies the current values.
+
+        Returns:
+            dict: Counter values and histogram copies by series.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {key: h.copy() for key, h in self._histograms.items()},
+            }
+
+    def summary(self, since: Optional[dict] = None) -> dict:
+        """
+        Summarizes the values recorded since a snapshot.
+
+        Args:
+            since (dict | None): Snapshot taken at the start of a run. None summarizes
+                everything recorded by the process.
+
+        Returns:
+            dict: Counter values and histogram statistics by name, then by labels
+                rendered as 'label=value' pairs. Series without new values are left out.
+        """
+        current = self.snapshot()
+        since = since or {"counters": {}, "histograms": {}}
+        summary = {}
+
+        for (name, labels), value in current["counters"].items():
+            value -= since["counters"].get((name, labels), 0)
+            if value:
+                summary.setdefault(name, {})[_label_key(labels)] = value
+
+        for (name, labels), histogram in current["histograms"].items():
+            previous = since["histograms"].get((name, labels))
+            if previous is not None:
+                histogram -= previous
+            if not histogram.count:
+                continue
+
+            summary.setdefault(name, {})[_label_key(labels)] = {
+                "count": histogram.count,
+                "sum": round(histogram.sum, 6),
+                "mean": round(histogram.sum / histogram.count, 6),
+                "p50": _round(histogram.quantile(0.5)),
+                "p95": _round(histogram.quantile(0.95)),
+                "p99": _round(histogram.quantile(0.99)),
+            }
+
+        return summary
+
+    def prometheus_text(self) -> str:
+        """
+        Renders all series in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition, one '# HELP' and '# TYPE' header per metric.
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        for kind, series in (("counter", snapshot["counters"]),
+                             ("histogram", snapshot["histograms"])):
+            previous_name = None
+            for (name, labels), value in sorted(series.items()):
+                if name != previous_name:
+                    lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    previous_name = name
+
+                if kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {value}")
+                    continue
+
+                cumulative = 0
+                for bound, count in zip(value.bounds + (math.inf,), value.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {value.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {value.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """
+        Removes all series.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+def _labels(labels: tuple) -> str:
+    """
+    Renders labels as a Prometheus label set.
+    """
+    if not labels:
+        return ""
+
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+
+    return "{" + ",".join(pairs) + "}"
+
+def _label_key(labels: tuple) -> str:
+    """
+    Renders labels as 'name=value' pairs for JSON summaries.
+    """
+    return ",".join(f"{name}={value}" for name, value in labels)
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 6) if value is not None else None
+
+METRICS = MetricsRegistry()
@@ -0,0 +1,247 @@
+"""
+This module upgrades existing databases in place to match the current models.
+
+'Base.metadata.create_all()' only creates missing tables, so changes to tables that already
+exist are applied here. Applied migrations are recorded in the 'schema_migrations' table and
+skipped afterwards, so migrate() is safe to run on every start. Indexes declared on the models
+are created last, also on tables that existed before the index was added.
+
+Data migrations rewrite rows in batches of 'MIGRATION_BATCH_SIZE', committing after every
+batch. SQLite locks the whole database while writing, so a single transaction over a large
+table would block the application for as long as the migration runs. An interrupted data
+migration is not recorded and simply runs again on the next start.
+
+Timestamps that cannot be parsed are never dropped: their raw value is copied to the
+'timestamp_quarantine' table, with the table, primary key and column it came from, before
+the column is cleared, and the number of quarantined values is logged per table.
+
+Functions:
+    migrate(engine):
+        Applies every pending migration, then creates missing indexes.
+"""
+import json
+
+from loguru import logger
+from sqlalchemy import inspect, text
+
+from app.config import MIGRATION_BATCH_SIZE
+from app.db import Base
+from app.db_models.sync_state import SyncState
+from app.db_models.types import UTCDateTime
+
+# Timestamp columns stored as ISO 8601 strings in mixed formats by older versions
+TIMESTAMP_COLUMNS = {
+    'payments': ('created_at', 'updated_at'),
+    'orders': ('created_at', 'updated_at'),
+    'order_line_items': ('created_at',),
+    'customers': ('created_at', 'updated_at'),
+    'sync_states': ('last_synced', 'high_water_mark', 'checkpointed_at'),
+    'access_tokens': ('expires_at', 'refresh_token_expires_at'),
+}
+
+# Raw values of the timestamps the normalization could not parse, by their row's primary key
+QUARANTINE_TABLE = 'timestamp_quarantine'
+
+def _extend_sync_states(engine) -> None:
+    """
+    Adds the checkpoint columns to 'sync_states' and makes 'last_synced' nullable.
+
+    SQLite cannot relax a NOT NULL constraint, so the table is rebuilt. It holds one row per
+    resource, so copying it is instant.
+    """
+    with engine.begin() as conn:
+        if not inspect(conn).has_table('sync_states'):
+            return
+
+        columns = {column['name'] for column in inspect(conn).get_columns('sync_states')}
+        if 'cursor' in columns:
+            return
+
+        logger.info("Migrating 'sync_states' to store sync checkpoints.")
+
+        conn.execute(text("ALTER TABLE sync_states RENAME TO sync_states_old"))
+        SyncState.__table__.create(conn)
+        conn.execute(text(
+            "INSERT INTO sync_states (resource, last_synced) "
+            "SELECT resource, last_synced FROM sync_states_old"
+        ))
+        conn.execute(text("DROP TABLE sync_states_old"))
+
+def _version_line_items(engine) -> None:
+    """
+    Adds the 'updated_at' column versioning 'order_line_items' rows by their order.
+
+    Existing rows keep NULL and are replaced the next time their order is synchronized.
+    """
+    with engine.begin() as conn:
+        if not inspect(conn).has_table('order_line_items'):
+            return
+
+        columns = {column['name'] for column in inspect(conn).get_columns('order_line_items')}
+        if 'updated_at' in columns:
+            return
+
+        logger.info("Migrating 'order_line_items' to version line items by their order.")
+        conn.execute(text("ALTER TABLE order_line_items ADD COLUMN updated_at DATETIME"))
+
+def _normalize_table(engine, table: str, columns: tuple, batch_size: int) -> tuple:
+    """
+    Rewrites the timestamps of a table in the UTC format of UTCDateTime, batch by batch.
+
+    Rows are walked in rowid order and every batch is committed on its own. Values that are
+    already normalized are not written again. UTCDateTime could not load a value that cannot
+    be parsed, so it is copied to the quarantine table in the same transaction and cleared;
+    the other columns of its row are still normalized.
+
+    Returns:
+        tuple: Number of rows rewritten and number of values quarantined.
+    """
+    normalize = UTCDateTime().dialect_impl(engine.dialect).bind_processor(engine.dialect)
+    keys = inspect(engine).get_pk_constraint(table)['constrained_columns'] or ['rowid']
+    select_batch = text(
+        f"SELECT rowid, {', '.join(keys + list(columns))} FROM {table} "
+        "WHERE rowid > :last ORDER BY rowid LIMIT :limit"
+    )
+    update_row = text(
+        f"UPDATE {table} SET {', '.join(f'{column} = :{column}' for column in columns)} "
+        "WHERE rowid = :rowid"
+    )
+    quarantine = text(
+        f"INSERT OR REPLACE INTO {QUARANTINE_TABLE} (table_name, row_key, column_name, value) "
+        "VALUES (:table_name, :row_key, :column_name, :value)"
+    )
+
+    rewritten = 0
+    quarantined = 0
+    last = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_batch, {"last": last, "limit": batch_size}).all()
+            if not rows:
+                return rewritten, quarantined
+
+            updates = []
+            unparseable = []
+            for rowid, *values in rows:
+                key, values = values[:len(keys)], values[len(keys):]
+                normalized = []
+                for column, value in zip(columns, values):
+                    try:
+                        normalized.append(normalize(value))
+                    except (TypeError, ValueError):
+                        unparseable.append({"table_name": table, "column_name": column,
+                                            "row_key": json.dumps(dict(zip(keys, key))),
+                                            "value": str(value)})
+                        normalized.append(None)
+
+                if normalized != values:
+                    updates.append({"rowid": rowid, **dict(zip(columns, normalized))})
+
+            if unparseable:
+                conn.execute(quarantine, unparseable)
+            if updates:
+                conn.execute(update_row, updates)
+
+        rewritten += len(updates)
+        quarantined += len(unparseable)
+        last = rows[-1][0]
+
+def _normalize_timestamps(engine) -> None:
+    """
+    Converts timestamp columns from ISO 8601 strings to UTCDateTime's UTC format.
+
+    The column values are rewritten in place. SQLite compares values, not declared types,
+    so the tables do not need to be rebuilt. Unparseable values are moved to the quarantine
+    table, so they can be fixed by hand and written back.
+    """
+    tables = set(inspect(engine).get_table_names())
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {QUARANTINE_TABLE} (table_name VARCHAR NOT NULL, "
+            "row_key VARCHAR NOT NULL, column_name VARCHAR NOT NULL, value VARCHAR, "
+            "PRIMARY KEY (table_name, row_key, column_name))"))
+
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        if table not in tables:
+            continue
+
+        rewritten, quarantined = _normalize_table(engine, table, columns, MIGRATION_BATCH_SIZE)
+        if rewritten:
+            logger.info(f"Normalized timestamps of {rewritten} rows in '{table}'.")
+        if quarantined:
+            logger.warning(f"Moved {quarantined} unparseable timestamps of '{table}' to "
+                           f"'{QUARANTINE_TABLE}'.")
+
+def _version_groups(engine) -> None:
+    """
+    Adds the timestamps of 'groups' and versions 'group_memberships' rows by their customer.
+
+    Memberships are upserted by customer and group from now on, so duplicates of a pair are
+    removed, keeping the first, before the unique index is created with the other indexes.
+    Existing memberships keep a NULL version and are replaced the next time their customer
+    is synchronized.
+    """
+    with engine.begin() as conn:
+        for table, added in (('groups', ('created_at', 'updated_at')),
+                             ('group_memberships', ('updated_at',))):
+            if not inspect(conn).has_table(table):
+                continue
+
+            columns = {column['name'] for column in inspect(conn).get_columns(table)}
+            for column in added:
+                if column not in columns:
+                    logger.info(f"Migrating '{table}' to add '{column}'.")
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} DATETIME"))
+
+        if inspect(conn).has_table('group_memberships'):
+            conn.execute(text(
+                "DELETE FROM group_memberships WHERE rowid NOT IN ("
+                "SELECT MIN(rowid) FROM group_memberships GROUP BY customer_id, group_id)"
+            ))
+
+def _create_indexes(engine) -> None:
+    """
+    Creates indexes declared on the models that are missing from existing tables.
+    """
+    tables = set(inspect(engine).get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.tables.values():
+            if table.name not in tables:
+                continue
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+# Applied in order
+MIGRATIONS = (
+    _extend_sync_states,
+    _version_line_items,
+    _normalize_timestamps,
+    _version_groups,
+)
+
+def migrate(engine) -> None:
+    """
+    Applies every pending migration, then creates missing indexes.
+
+    Args:
+        engine (Engine): Engine of the database to migrate.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR PRIMARY KEY)"))
+        applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+    for migration in MIGRATIONS:
+        if migration.__name__ in applied:
+            continue
+
+        migration(engine)
+
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"),
+                         {"name": migration.__name__})
+
+    _create_indexes(engine)
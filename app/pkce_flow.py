@@ -11,11 +11,12 @@ Main Features:
 - Callback route to handle authorization server responses, verify CSRF state, 
     and exchange authorization codes for access tokens.
 - Secure storage of token information in a database.
+- Metrics route exposing sync and Square API metrics in the Prometheus text format.
 - Database initialization and Flask app startup.
 
 Dependencies:
 - Flask for web routing and session management.
-- Requests for HTTP requests to the OAuth server.
+- app.http_client for pooled HTTP requests to the OAuth server.
 - SQLAlchemy for database operations.
 - dotenv for environment variable management.
 - Square API configuration constants.
@@ -28,8 +29,7 @@ import secrets
 import hashlib
 import base64
 from datetime import timezone, datetime
-import requests
-from flask import Flask, render_template, session, redirect, request
+from flask import Flask, Response, render_template, session, redirect, request
 from dateutil import parser
 from loguru import logger
 from sqlalchemy.dialects.sqlite import insert
@@ -37,6 +37,8 @@ from sqlalchemy.dialects.sqlite import insert
 from app.config import SCOPE_STRING, AUTH_URL, SESSION, POST_TOKEN_URL, REDIRECT_URI, \
     CODE_CHALLENGE_METHOD, PORT, SQUARE_APPLICATION_ID
 from app.db import Session, init_db
+from app.http_client import get_http_client
+from app.metrics import METRICS
 from app.db_models.access_token import AccessToken
 
 app = Flask(__name__)
@@ -155,6 +157,16 @@ def store_token_info(token_info: dict) -> None:
 
     logger.success("Token information stored successfully.")
 
+@app.route('/metrics')
+def metrics():
+    """
+    Exposes the sync and Square API metrics of this process for Prometheus.
+
+    Returns:
+        Response: The metrics in the Prometheus text exposition format.
+    """
+    return Response(METRICS.prometheus_text(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/callback')
 def callback():
     """
@@ -184,7 +196,7 @@ def callback():
     code_verifier = session.get('code_verifier')
 
     # Generate response to get access token
-    response = requests.post(
+    response = get_http_client().post(
         POST_TOKEN_URL,
         headers={
             "Content-Type": "application/json"
@@ -195,8 +207,7 @@ def callback():
             "redirect_uri": REDIRECT_URI,
             "code": auth_code,
             "code_verifier": code_verifier
-        },
-        timeout=10
+        }
     )
 
     # Store token info in database
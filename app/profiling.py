@@ -0,0 +1,338 @@
+"""
+This module provides an opt-in SQL statement profiler for the application engines.
+
+The profiler listens to the engines' 'before_cursor_execute' and 'after_cursor_execute'
+events and aggregates every statement by its normalized text, with literals and expanded
+IN lists and VALUES rows collapsed. It reports the call count, total and mean time and the
+rows each statement touched, slowest first.
+
+Selects run again and again with a single set of parameters are flagged as possible N+1
+patterns, such as loading a resource's 'sync_states' row once per record instead of once
+per run. The Python code issuing the statements can be profiled with cProfile at the same
+time.
+
+Profiling a whole process is enabled by pointing 'SQL_PROFILE_PATH' at a report file. The
+report is written when the process exits.
+
+Classes:
+    StatementStats:
+        - Aggregated calls, time and rows of one normalized statement.
+    SQLProfiler:
+        - Collects statement statistics from an engine while started.
+        - Methods:
+            - start() -> SQLProfiler: Starts listening to the engine.
+            - stop() -> None: Stops listening.
+            - stats() -> list: Statement statistics, slowest first.
+            - n_plus_one() -> list: Statements executed like an N+1 pattern.
+            - report() -> str: Renders the statistics as text.
+            - write_report(path: Path) -> Path: Writes the report to a file.
+
+Functions:
+    normalize_statement(statement: str) -> str:
+        Collapses literals, IN lists and VALUES rows of a statement.
+    profile_process(path: str, engine, python: bool) -> SQLProfiler:
+        Profiles the process until it exits, then writes the report.
+
+Usage:
+    with SQLProfiler(python=True) as profiler:
+        sync_all(merchant_id)
+    profiler.write_report(REPORTS_DIR / "sql_profile.txt")
+
+    SQL_PROFILE_PATH=reports/sql_profile.txt python -m belly_rubb.etl.orchestrator
+"""
+import atexit
+import cProfile
+import io
+from pathlib import Path
+import pstats
+import re
+import threading
+import time
+
+from loguru import logger
+from sqlalchemy import event
+
+from app.config import SQL_PROFILE_N_PLUS_ONE
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_ROWS = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_statement(statement: str) -> str:
+    """
+    Collapses a statement to a form shared by all executions of the same query.
+
+    String and number literals become '?', placeholder lists such as 'IN (?, ?, ?)' and
+    multi-row VALUES become '(...)', and whitespace is collapsed.
+
+    Args:
+        statement (str): SQL as sent to the driver.
+
+    Returns:
+        str: The normalized statement.
+    """
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(...)", statement)
+    statement = _VALUES_ROWS.sub(r"\1", statement)
+
+    return _WHITESPACE.sub(" ", statement).strip()
+
+class StatementStats:
+    """
+    StatementStats aggregates the executions of one normalized statement.
+
+    Attributes:
+        statement (str): The normalized statement.
+        calls (int): Number of executions.
+        seconds (float): Total execution time.
+        rows (int): Rows reported by the driver. SQLite reports none for SELECT, so
+            selects count the parameter sets they ran with.
+        single_calls (int): Executions with one set of parameters rather than executemany.
+    """
+    __slots__ = ("statement", "calls", "seconds", "rows", "single_calls")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.single_calls = 0
+
+    @property
+    def mean_ms(self) -> float:
+        return 1000 * self.seconds / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> dict:
+        return dict(statement=self.statement, calls=self.calls, seconds=self.seconds,
+                    mean_ms=self.mean_ms, rows=self.rows)
+
+class SQLProfiler:
+    """
+    SQLProfiler aggregates the statements engines execute while it is started.
+
+    Statements are timed per connection, so sessions on several threads can be profiled
+    at once. With 'python' set, cProfile also runs on the thread that started the
+    profiler, showing which code issued the statements.
+
+    Attributes:
+        engine: Engine, or tuple of engines, to profile. Defaults to the application and
+            ETL engines.
+        python (bool): Also profiles Python calls with cProfile.
+        n_plus_one_threshold (int): Single-parameter executions of a select from which
+            it is flagged as a possible N+1 pattern.
+        statements (dict): StatementStats by normalized statement.
+
+    Methods:
+        start() -> SQLProfiler:
+            Starts listening to the engine and, if enabled, cProfile.
+        stop() -> None:
+            Stops listening.
+        stats() -> list:
+            Statement statistics, slowest in total first.
+        n_plus_one() -> list:
+            Statistics of the selects executed like an N+1 pattern.
+        report(limit: int = 25) -> str:
+            Renders the statistics as a text report.
+        write_report(path: Path, limit: int = 25) -> Path:
+            Writes the report, and the cProfile data next to it.
+    """
+    def __init__(self, engine=None, python: bool = False,
+                 n_plus_one_threshold: int = SQL_PROFILE_N_PLUS_ONE):
+        if engine is None:
+            from app.db import engine, etl_engine  # pylint: disable=import-outside-toplevel
+            engine = (engine, etl_engine)
+
+        self.engine = engine
+        self.python = python
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.statements = {}
+
+        self._profile = cProfile.Profile() if python else None
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._elapsed = 0.0
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("sql_profiler_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+
+        normalized = normalize_statement(statement)
+        rows = cursor.rowcount
+        if rows is None or rows < 0:
+            rows = len(parameters) if executemany else 1
+
+        with self._lock:
+            stats = self.statements.get(normalized)
+            if stats is None:
+                stats = self.statements[normalized] = StatementStats(normalized)
+
+            stats.calls += 1
+            stats.seconds += elapsed
+            stats.rows += rows
+            if not executemany:
+                stats.single_calls += 1
+
+    def _engines(self) -> tuple:
+        return self.engine if isinstance(self.engine, tuple) else (self.engine,)
+
+    def start(self) -> "SQLProfiler":
+        """
+        Starts listening to the engine and, if enabled, cProfile.
+
+        Returns:
+            SQLProfiler: The profiler itself.
+        """
+        for engine in self._engines():
+            event.listen(engine, "before_cursor_execute", self._before_execute)
+            event.listen(engine, "after_cursor_execute", self._after_execute)
+        if self._profile is not None:
+            self._profile.enable()
+
+        self._started_at = time.perf_counter()
+
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops listening. Statistics collected so far are kept.
+        """
+        if self._started_at is None:
+            return
+
+        if self._profile is not None:
+            self._profile.disable()
+        for engine in self._engines():
+            event.remove(engine, "before_cursor_execute", self._before_execute)
+            event.remove(engine, "after_cursor_execute", self._after_execute)
+
+        self._elapsed += time.perf_counter() - self._started_at
+        self._started_at = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self) -> list:
+        """
+        Returns statement statistics, slowest in total first.
+
+        Returns:
+            list: StatementStats of every statement.
+        """
+        with self._lock:
+            return sorted(self.statements.values(), key=lambda s: s.seconds, reverse=True)
+
+    def n_plus_one(self) -> list:
+        """
+        Returns the selects executed one set of parameters at a time, again and again.
+
+        Such a select usually runs once per record of a loop and can be replaced by a
+        single query before the loop, or by a join.
+
+        Returns:
+            list: StatementStats of the flagged selects, slowest first.
+        """
+        return [
+            stats for stats in self.stats()
+            if stats.statement.upper().startswith("SELECT")
+            and stats.single_calls >= self.n_plus_one_threshold
+        ]
+
+    def report(self, limit: int = 25) -> str:
+        """
+        Renders the statistics as a text report.
+
+        Args:
+            limit (int): Number of statements listed.
+
+        Returns:
+            str: The report.
+        """
+        stats = self.stats()
+        total = sum(s.seconds for s in stats)
+        calls = sum(s.calls for s in stats)
+        elapsed = self._elapsed + (time.perf_counter() - self._started_at
+                                   if self._started_at is not None else 0.0)
+
+        lines = [
+            f"SQL profile: {calls:,} executions of {len(stats):,} statements took "
+            f"{total:.3f}s of {elapsed:.3f}s profiled.",
+            "",
+            f"{'calls':>9} {'total s':>9} {'share':>6} {'mean ms':>9} {'rows':>10}  statement",
+        ]
+        for s in stats[:limit]:
+            share = s.seconds / total if total else 0.0
+            lines.append(f"{s.calls:>9,} {s.seconds:>9.3f} {share:>6.1%} {s.mean_ms:>9.3f} "
+                         f"{s.rows:>10,}  {_shorten(s.statement)}")
+
+        flagged = self.n_plus_one()
+        if flagged:
+            lines += ["", "Possible N+1 patterns, load these once instead of per record:"]
+            lines += [f"  {s.single_calls:,} single executions, {s.seconds:.3f}s total: "
+                      f"{_shorten(s.statement)}" for s in flagged]
+
+        if self._profile is not None:
+            output = io.StringIO()
+            pstats.Stats(self._profile, stream=output).sort_stats("cumulative").print_stats(limit)
+            lines += ["", "Python profile, by cumulative time:", output.getvalue()]
+
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: Path, limit: int = 25) -> Path:
+        """
+        Writes the report. With Python profiling, the raw cProfile data is written next to
+        it with a '.prof' suffix, for tools such as snakeviz.
+
+        Args:
+            path (Path): File to write the report to.
+            limit (int): Number of statements listed.
+
+        Returns:
+            Path: The report file.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.report(limit=limit))
+
+        if self._profile is not None:
+            self._profile.dump_stats(path.with_suffix(".prof"))
+
+        logger.info(f"SQL profile written to {path}")
+
+        return path
+
+def _shorten(statement: str, width: int = 200) -> str:
+    return statement if len(statement) <= width else statement[:width - 3] + "..."
+
+def profile_process(path: str, engine=None, python: bool = False) -> SQLProfiler:
+    """
+    Profiles engines until the process exits, then writes the report.
+
+    Args:
+        path (str): File to write the report to.
+        engine: Engine, or tuple of engines, to profile. Defaults to the application and
+            ETL engines.
+        python (bool): Also profiles Python calls of the main thread with cProfile.
+
+    Returns:
+        SQLProfiler: The started profiler.
+    """
+    profiler = SQLProfiler(engine, python=python).start()
+
+    def finish():
+        profiler.stop()
+        profiler.write_report(Path(path))
+
+    atexit.register(finish)
+
+    return profiler
@@ -0,0 +1,309 @@
+"""
+This module provides the request scheduler that rate limits and retries every request sent
+through the shared HTTP client.
+
+Square throttles each application per merchant and endpoint. The scheduler keeps a token
+bucket per merchant and endpoint, retries throttled and failed requests with jittered
+exponential backoff, and halves a bucket's rate when Square throttles it, so parallel syncs
+settle at the highest rate Square accepts instead of failing.
+
+Attributes:
+    RATE_LIMIT_KEY_HEADER (str): Request header naming the rate limit bucket of a client,
+        usually the merchant id. It is removed before the request is sent.
+
+Classes:
+    TokenBucket:
+        - Spaces out requests to an adaptive rate with a bounded burst.
+        - Additively increases its rate on success and halves it when throttled.
+    RequestScheduler:
+        - httpx transport wrapping the pooled transport.
+        - Waits for a token before every request and retries 429 responses, honouring
+            'Retry-After'. 5xx responses and dropped connections are only retried for
+            idempotent requests: GET and HEAD, and the read-only search POSTs.
+            Other POSTs, like the OAuth token exchange, may have been applied, so they are
+            retried on 429 and on connections that were never established only.
+        - Records the latency of every attempt, retries and throttles in 'app.metrics'.
+
+Functions:
+    is_idempotent(request: httpx.Request) -> bool:
+        Checks whether a request can be retried after it may have reached the server.
+    retry_after(response: httpx.Response) -> float | None:
+        Parses the 'Retry-After' header of a response.
+"""
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import random
+import threading
+import time
+from typing import Optional
+import httpx
+from loguru import logger
+
+from app.config import SQUARE_RATE_LIMIT, SQUARE_RATE_BURST, SQUARE_MIN_RATE, \
+    HTTP_MAX_RETRIES, HTTP_BACKOFF_INITIAL, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX
+from app.metrics import METRICS
+
+RATE_LIMIT_KEY_HEADER = "X-Rate-Limit-Key"
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Requests that are safe to send again after a server error or a dropped connection
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+READ_ONLY_POSTS = frozenset({
+    "/v2/customers/search",
+    "/v2/orders/search",
+    "/v2/orders/batch-retrieve",
+})
+
+# Transport errors raised before the request reached the server
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+def is_idempotent(request: httpx.Request) -> bool:
+    """
+    Checks whether a request can be retried after it may have reached the server.
+
+    Args:
+        request (httpx.Request): The request to inspect.
+
+    Returns:
+        bool: True for GET and HEAD requests and the read-only search POSTs.
+    """
+    if request.method in IDEMPOTENT_METHODS:
+        return True
+
+    return request.method == "POST" and request.url.path in READ_ONLY_POSTS
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    Parses the 'Retry-After' header of a response.
+
+    Args:
+        response (httpx.Response): The response to inspect.
+
+    Returns:
+        float | None: Seconds to wait, or None if the header is missing or invalid.
+    """
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class TokenBucket:
+    """
+    TokenBucket spaces out requests to an adaptive rate.
+
+    Tokens are reserved under a lock and waited for outside it, so concurrent callers are
+    queued fairly without holding the lock while sleeping.
+
+    Attributes:
+        rate (float): Current requests per second.
+        max_rate (float): Rate the bucket recovers to after throttling.
+        min_rate (float): Lowest rate throttling can reduce the bucket to.
+        burst (int): Maximum number of requests sent back to back.
+
+    Methods:
+        acquire() -> float:
+            Waits for a token and returns the time waited.
+        on_success():
+            Additively increases the rate towards 'max_rate'.
+        on_throttle():
+            Halves the rate, down to 'min_rate'.
+    """
+    def __init__(self, rate: float = SQUARE_RATE_LIMIT, burst: int = SQUARE_RATE_BURST,
+                 min_rate: float = SQUARE_MIN_RATE):
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        Takes a token, possibly borrowing from the future, and returns the wait needed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """
+        Waits until a request may be sent.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+    def on_success(self) -> None:
+        """
+        Additively increases the rate by a tenth of 'max_rate'.
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def on_throttle(self) -> None:
+        """
+        Halves the rate and drops saved-up tokens so the next requests slow down at once.
+        """
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+        logger.warning(f"Request throttled, lowering rate to {self.rate:.2f} requests/s.")
+
+class RequestScheduler(httpx.BaseTransport):
+    """
+    RequestScheduler rate limits and retries requests before they reach the pooled transport.
+
+    Requests are grouped by the 'X-Rate-Limit-Key' header and the endpoint, so every merchant
+    and endpoint has its own token bucket shared by all clients and threads.
+
+    Attributes:
+        transport (httpx.BaseTransport): Transport that sends the requests.
+        max_retries (int): Retries after the first attempt before a response is returned.
+        backoff_initial (float): Backoff ceiling of the first retry, in seconds.
+        backoff_base (float): Growth factor of the backoff ceiling per retry.
+        backoff_max (float): Largest wait between attempts, in seconds.
+
+    Methods:
+        bucket(key: str, endpoint: str) -> TokenBucket:
+            Returns the token bucket of a merchant and endpoint.
+        handle_request(request: httpx.Request) -> httpx.Response:
+            Sends a request, waiting for its bucket and retrying throttled or failed attempts.
+        _retryable(request: httpx.Request, status: int) -> bool:
+            Checks whether a response status is retried for a request.
+    """
+    def __init__(self, transport: httpx.BaseTransport, max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_initial: float = HTTP_BACKOFF_INITIAL,
+                 backoff_base: float = HTTP_BACKOFF_BASE, backoff_max: float = HTTP_BACKOFF_MAX,
+                 rate: float = SQUARE_RATE_LIMIT, burst: int = SQUARE_RATE_BURST):
+        self.transport = transport
+        self.max_retries = max_retries
+        self.backoff_initial = backoff_initial
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate = rate
+        self.burst = burst
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key: str, endpoint: str) -> TokenBucket:
+        """
+        Returns the token bucket of a merchant and endpoint, creating it on first use.
+
+        Args:
+            key (str): Rate limit key of the client, usually the merchant id.
+            endpoint (str): HTTP method and path of the request.
+
+        Returns:
+            TokenBucket: The shared bucket.
+        """
+        with self._lock:
+            bucket = self._buckets.get((key, endpoint))
+            if bucket is None:
+                bucket = self._buckets[(key, endpoint)] = TokenBucket(self.rate, self.burst)
+
+            return bucket
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """
+        Computes the wait before the next attempt.
+
+        'Retry-After' is honoured when present. Otherwise a full-jitter exponential backoff
+        spreads the retries of concurrent workers apart.
+        """
+        if response is not None:
+            wait = retry_after(response)
+            if wait is not None:
+                return min(wait, self.backoff_max)
+
+        ceiling = min(self.backoff_max, self.backoff_initial * self.backoff_base ** attempt)
+        return random.uniform(0, ceiling)
+
+    def _retryable(self, request: httpx.Request, status: int) -> bool:
+        """
+        Checks whether a response status is retried for a request.
+
+        Throttled requests were not processed and are always retried; server errors only
+        for idempotent requests.
+        """
+        if status == 429:
+            return True
+
+        return status in RETRY_STATUS_CODES and is_idempotent(request)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = request.headers.pop(RATE_LIMIT_KEY_HEADER, "default")
+        endpoint = f"{request.method} {request.url.path}"
+        bucket = self.bucket(key, endpoint)
+        idempotent = is_idempotent(request)
+
+        attempt = 0
+        while True:
+            bucket.acquire()
+
+            try:
+                with METRICS.time("square_request_seconds", endpoint=endpoint):
+                    response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                if not idempotent and not isinstance(e, NOT_SENT_ERRORS):
+                    raise
+
+                METRICS.inc("square_retries_total", endpoint=endpoint, status="error")
+                logger.warning(f"{endpoint} failed: {e}. Retry {attempt + 1}/{self.max_retries}")
+                time.sleep(self._backoff(attempt, None))
+                attempt += 1
+                continue
+
+            if response.status_code == 429:
+                METRICS.inc("square_throttles_total", endpoint=endpoint)
+                bucket.on_throttle()
+            elif response.status_code not in RETRY_STATUS_CODES:
+                bucket.on_success()
+
+            if not self._retryable(request, response.status_code):
+                return response
+
+            if attempt >= self.max_retries:
+                logger.error(f"{endpoint} returned {response.status_code} "
+                             f"after {attempt} retries.")
+                return response
+
+            wait = self._backoff(attempt, response)
+            response.close()
+
+            METRICS.inc("square_retries_total", endpoint=endpoint, status=response.status_code)
+
+            logger.warning(f"{endpoint} returned {response.status_code}. "
+                           f"Retry {attempt + 1}/{self.max_retries} in {wait:.2f}s")
+            time.sleep(wait)
+            attempt += 1
+
+    def close(self) -> None:
+        self.transport.close()
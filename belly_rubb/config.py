@@ -1,3 +1,4 @@
+from datetime import timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -21,13 +22,51 @@ MODELS_DIR = PROJ_ROOT / "models"
 REPORTS_DIR = PROJ_ROOT / "reports"
 FIGURES_DIR = REPORTS_DIR / "figures"
 
+REFERENCES_DIR = PROJ_ROOT / "references"
+ITEM_SYNONYMS = REFERENCES_DIR / "item_synonyms.json"
+
 SRC_DIR = PROJ_ROOT / "belly_rubb"
 CONFIG_DIR = SRC_DIR / "config"
 API_TABLE_METHODS = CONFIG_DIR / "api_table_methods.json"
 
-MAX_RETRIES = 5
-INITIAL_DELAY = 1
-DECAY_BASE = 2
+# Number of rows written per bulk upsert statement
+UPSERT_CHUNK_SIZE = 500
+
+# Number of pages fetcher threads may queue ahead of the database writer
+SYNC_QUEUE_SIZE = 16
+
+# Number of API pages fetched ahead of the page being stored
+PREFETCH_DEPTH = 2
+
+# Number of API pages stored between resumable sync checkpoints
+CHECKPOINT_PAGES = 10
+
+# Incremental syncs re-read records updated this long before the stored high-water mark
+SYNC_OVERLAP_WINDOW = timedelta(minutes=5)
+
+# Raw Square records archived by sync runs for offline replay. 'zstd' needs the optional
+# zstandard package and falls back to 'gzip' without it
+ARCHIVE_DIR = RAW_DATA_DIR / "square"
+ARCHIVE_COMPRESSION = "zstd"
+
+# Raw order CSV exports and the month-partitioned Parquet they are ingested into
+ORDERS_RAW_DIR = RAW_DATA_DIR / "orders"
+ORDERS_PARQUET_DIR = INTERIM_DATA_DIR / "orders"
+
+# Fuzzy match scores above this accept a standardized item name or variation, and the scores
+# of reviewed pairs are cached across quality reports
+FUZZY_MATCH_THRESHOLD = 80
+ITEM_MATCH_CACHE = INTERIM_DATA_DIR / "item_match_scores.json"
+
+# Cached access tokens are refreshed this long before they expire
+TOKEN_REFRESH_MARGIN = timedelta(hours=24)
+
+# Delay before retrying a failed background token refresh
+TOKEN_REFRESH_RETRY = timedelta(minutes=5)
+
+# Cached access tokens are served until this long before they expire, covering clock skew
+# and request latency; refreshing earlier is left to the background timer
+TOKEN_EXPIRY_SKEW = timedelta(minutes=1)
 
 # If tqdm is installed, configure loguru with tqdm.write
 # https://github.com/Delgan/loguru/issues/135
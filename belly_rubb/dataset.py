@@ -1,17 +1,54 @@
+"""
+Builds the datasets used by the notebooks and models.
+
+Order CSV exports dropped into 'data/raw/orders' are ingested into month-partitioned
+Parquet under 'data/interim/orders', one 'month=YYYY-MM/orders.parquet' file per month of
+'Order Date'. Exports are read in parallel with an explicit schema and their date columns
+parsed once, so readers of the Parquet files get typed columns without re-parsing.
+
+Ingestion is incremental: a manifest records the SHA-256 of every export already ingested,
+and only new files are read. Every row is tagged with the digest of its export and its row
+number in it, and merged into the partition of its month by that tag. Rows are never
+deduplicated by value, since an order can hold identical line items, but merging an export
+again, e.g. after an interrupted run, never duplicates its rows. Memory is bounded by a batch
+of exports and the partitions it touches, not by the whole history. Writing Parquet needs
+pyarrow.
+
+Functions:
+    file_digest(path: Path) -> str:
+        SHA-256 of a file's content.
+    read_order_export(path: Path) -> pd.DataFrame:
+        Reads one order CSV export with the order schema.
+    ingest_orders(input_dir: Path, output_dir: Path, workers: int, batch_files: int) -> dict:
+        Ingests new order exports into the month partitions.
+    main(input_dir: Path, output_dir: Path, workers: int, batch_files: int):
+        Command line entry point of 'ingest_orders'.
+
+Usage:
+    python -m belly_rubb.dataset --workers 4
+    pd.read_parquet(INTERIM_DATA_DIR / "orders")
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
 from pathlib import Path
-from square import Square
+
+from app.db import Session
+from app.db_models import Customer, Group, GroupMembership
 from loguru import logger
+import pandas as pd
+from sqlalchemy.dialects.sqlite import insert
 from tqdm import tqdm
 import typer
 
-from belly_rubb.config import PROCESSED_DATA_DIR, RAW_DATA_DIR
-
-from sqlalchemy.dialects.sqlite import insert
-from app.db import Session
-from app.db_models import *
+from belly_rubb.config import ORDERS_PARQUET_DIR, ORDERS_RAW_DIR
 
 app = typer.Typer()
 
+
 def store_customer_info(customer_info: dict) -> None:
     """
     Stores customer information in the database.
@@ -28,17 +65,19 @@ def store_customer_info(customer_info: dict) -> None:
     session_db = Session()
 
     stmt = insert(Customer).values(
-        id=customer_info.get('id'),
-        locality=customer_info.get('address').get('locality'),
-        postal_code=customer_info.get('address').get('postal_code'),
-        reference_id=customer_info.get('reference_id'),
-        note=customer_info.get('note'),
-        creation_source=customer_info.get('creation_source')
+        id=customer_info.get("id"),
+        locality=customer_info.get("address").get("locality"),
+        postal_code=customer_info.get("address").get("postal_code"),
+        reference_id=customer_info.get("reference_id"),
+        note=customer_info.get("note"),
+        creation_source=customer_info.get("creation_source"),
     )
 
-    update_dict = {col.name: stmt.excluded[col.name] for col in Customer.__table__.columns if col.name != 'id'}
+    update_dict = {
+        col.name: stmt.excluded[col.name] for col in Customer.__table__.columns if col.name != "id"
+    }
 
-    stmt = stmt.on_conflict_do_update(index_elements=['id'], set_=update_dict)
+    stmt = stmt.on_conflict_do_update(index_elements=["id"], set_=update_dict)
 
     logger.debug(f"Storing customer info: {Customer(customer_info)}")
 
@@ -48,24 +87,6 @@ def store_customer_info(customer_info: dict) -> None:
 
     logger.success("Customer information stored successfully.")
 
-def api_logic():
-    cursor = None
-    client = Square(token=get_access_token())
-
-    while True:
-        customers = client.customers.list(
-            limit=50,
-            sort_field='created_at',
-            sort_order='DESC',
-            cursor=cursor
-        )
-
-        if customers.is_success():
-            for customer in customers:
-                store_customer_info(customer)
-            cursor = customers.body.cursor
-        else:
-            break
 
 def store_group_info(group_info: dict) -> None:
     """
@@ -79,10 +100,7 @@ def store_group_info(group_info: dict) -> None:
     """
     session_db = Session()
 
-    group = Group(
-        id=group_info.get('id'),
-        name=group_info.get('name')
-    )
+    group = Group(id=group_info.get("id"), name=group_info.get("name"))
     logger.debug(f"Storing group info: {group}")
 
     session_db.add(group)
@@ -91,6 +109,7 @@ def store_group_info(group_info: dict) -> None:
 
     logger.success("Group information stored successfully.")
 
+
 def store_membership_info(membership_info: dict) -> None:
     """
     Stores membership information in the database.
@@ -105,9 +124,9 @@ def store_membership_info(membership_info: dict) -> None:
     session_db = Session()
 
     membership = GroupMembership(
-        id=membership_info.get('id'),
-        customer_id=membership_info.get('customer_id'),
-        group_id=membership_info.get('group_id')
+        id=membership_info.get("id"),
+        customer_id=membership_info.get("customer_id"),
+        group_id=membership_info.get("group_id"),
     )
     logger.debug(f"Storing membership info: {membership}")
 
@@ -117,20 +136,220 @@ def store_membership_info(membership_info: dict) -> None:
 
     logger.success("Membership information stored successfully.")
 
+
+# Column types of the Square order exports. Columns missing from this schema are read as text
+ORDER_DTYPES = {
+    "Order": "string",
+    "Order Name": "string",
+    "Order Subtotal": "float64",
+    "Order Tax Total": "float64",
+    "Order Total": "float64",
+    "Order Refunded Amount": "float64",
+    "Fulfillment Type": "string",
+    "Fulfillment Status": "string",
+    "Channels": "string",
+    "Recipient Name": "string",
+    "Recipient Country": "string",
+    "Item Name": "string",
+    "Item Variation": "string",
+    "Item Quantity": "float64",
+    "Item Price": "float64",
+    "Item Options Total Price": "float64",
+    "Item Total Price": "float64",
+}
+
+# Date columns of the order exports and their formats, parsed once while reading
+ORDER_DATE_FORMATS = {
+    "Order Date": "%Y/%m/%d",
+    "Fulfillment Date": "%m/%d/%Y, %I:%M %p",
+}
+
+# Columns tagging every ingested row with its export and its row number in it
+SOURCE_COLUMNS = ["Export Digest", "Export Row"]
+
+PARTITION_FILE = "orders.parquet"
+MANIFEST_FILE = "_manifest.json"
+
+
+def file_digest(path: Path) -> str:
+    """
+    Hashes a file's content, so renamed or re-dropped exports are recognized.
+
+    Args:
+        path (Path): The file to hash.
+
+    Returns:
+        str: Hex SHA-256 digest of the content.
+    """
+    digest = hashlib.sha256()
+    with open(path, mode="rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def read_order_export(path: Path) -> pd.DataFrame:
+    """
+    Reads an order CSV export with the order schema and parses its date columns.
+
+    Dates not matching their format become NaT instead of failing the whole export.
+
+    Args:
+        path (Path): The CSV export.
+
+    Returns:
+        pd.DataFrame: The rows of the export.
+    """
+    df = pd.read_csv(path, dtype=ORDER_DTYPES)
+
+    for column, date_format in ORDER_DATE_FORMATS.items():
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], format=date_format, errors="coerce")
+
+    return df
+
+
+def _read_manifest(output_dir: Path) -> dict:
+    """
+    Loads the exports already ingested, keyed by content digest.
+    """
+    path = output_dir / MANIFEST_FILE
+
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def _write_atomically(path: Path, write) -> None:
+    """
+    Writes a file through a temporary file, so readers never see a partial one.
+    """
+    tmp = path.with_name(f".{path.name}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _tag_rows(frame: pd.DataFrame, digest: str) -> pd.DataFrame:
+    """
+    Tags the rows of an export with its digest and their row number.
+    """
+    return frame.assign(
+        **{
+            SOURCE_COLUMNS[0]: pd.Series(digest, index=frame.index, dtype="string"),
+            SOURCE_COLUMNS[1]: pd.RangeIndex(len(frame)),
+        }
+    )
+
+
+def _merge_partition(output_dir: Path, month: str, rows: pd.DataFrame) -> int:
+    """
+    Merges rows into the partition of a month, replacing rows merged from the same export.
+
+    Returns:
+        int: Rows added to the partition.
+    """
+    path = output_dir / f"month={month}" / PARTITION_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    existing = pd.read_parquet(path) if path.exists() else None
+    before = len(existing) if existing is not None else 0
+
+    merged = pd.concat([existing, rows], ignore_index=True) if existing is not None else rows
+    merged = merged.drop_duplicates(subset=SOURCE_COLUMNS, keep="last", ignore_index=True)
+
+    if len(merged) > before:
+        _write_atomically(path, lambda tmp: merged.to_parquet(tmp, index=False))
+
+    return len(merged) - before
+
+
+def ingest_orders(
+    input_dir: Path = ORDERS_RAW_DIR,
+    output_dir: Path = ORDERS_PARQUET_DIR,
+    workers: int = os.cpu_count() or 1,
+    batch_files: int = 16,
+) -> dict:
+    """
+    Ingests the order exports not ingested yet into the month partitions.
+
+    Exports are read in parallel, a batch at a time. Every batch is tagged with its exports'
+    digests and row numbers, split by month of 'Order Date' and merged into the partitions it
+    touches before the manifest records its exports, so an interrupted run resumes with the
+    batch it did not finish. Rows without an order date go to the 'month=unknown' partition.
+
+    Args:
+        input_dir (Path): Directory holding the CSV exports.
+        output_dir (Path): Root directory of the month partitions and the manifest.
+        workers (int): Processes reading exports.
+        batch_files (int): Exports merged into the partitions at once.
+
+    Returns:
+        dict: Number of exports ingested and skipped, and of rows read and added.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(output_dir)
+
+    paths = sorted(input_dir.glob("*.csv"))
+    pending = {}
+    for path in paths:
+        digest = file_digest(path)
+        if digest not in manifest and digest not in pending:
+            pending[digest] = path
+
+    counts = {
+        "files": len(pending),
+        "skipped": len(paths) - len(pending),
+        "rows_read": 0,
+        "rows_added": 0,
+    }
+    if not pending:
+        logger.info(f"No new order exports in {input_dir}.")
+        return counts
+
+    batches = list(pending.items())
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        for first in tqdm(range(0, len(batches), batch_files), desc="Order exports"):
+            batch = batches[first : first + batch_files]
+            frames = list(executor.map(read_order_export, [path for _, path in batch]))
+
+            rows = pd.concat(
+                [_tag_rows(frame, digest) for (digest, _), frame in zip(batch, frames)],
+                ignore_index=True,
+            )
+            months = rows["Order Date"].dt.strftime("%Y-%m").fillna("unknown")
+            for month, month_rows in rows.groupby(months, sort=True):
+                counts["rows_added"] += _merge_partition(
+                    output_dir, month, month_rows.reset_index(drop=True)
+                )
+            counts["rows_read"] += sum(len(frame) for frame in frames)
+
+            ingested_at = datetime.now(timezone.utc).isoformat()
+            for (digest, path), frame in zip(batch, frames):
+                manifest[digest] = {
+                    "file": path.name,
+                    "rows": len(frame),
+                    "ingested_at": ingested_at,
+                }
+            _write_atomically(
+                output_dir / MANIFEST_FILE,
+                lambda tmp: tmp.write_text(json.dumps(manifest, indent=2)),
+            )
+
+    return counts
+
+
 @app.command()
 def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    input_path: Path = RAW_DATA_DIR / "dataset.csv",
-    output_path: Path = PROCESSED_DATA_DIR / "dataset.csv",
-    # ----------------------------------------------
+    input_dir: Path = ORDERS_RAW_DIR,
+    output_dir: Path = ORDERS_PARQUET_DIR,
+    workers: int = os.cpu_count() or 1,
+    batch_files: int = 16,
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Processing dataset...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Processing dataset complete.")
-    # -----------------------------------------
+    logger.info(f"Ingesting order exports from {input_dir}...")
+    counts = ingest_orders(input_dir, output_dir, workers=workers, batch_files=batch_files)
+    logger.success(
+        f"Ingested {counts['files']} exports ({counts['skipped']} already ingested): "
+        f"{counts['rows_added']:,} new rows of {counts['rows_read']:,} read."
+    )
 
 
 if __name__ == "__main__":
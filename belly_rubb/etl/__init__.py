@@ -1,11 +1,22 @@
 from .api_manager import APIManager
+from .bulk_upsert import BulkUpserter
 from .customers import CustomerAPI
+from .groups import GroupsAPI
+from .orchestrator import SyncOrchestrator, sync_all
+from .orders import OrdersAPI
 from .payments import PaymentAPI
 from .token_provider import TokenProvider
+from .watermark import SyncWatermark
 
 __all__ = [
     "APIManager",
+    "BulkUpserter",
     "CustomerAPI",
+    "GroupsAPI",
+    "OrdersAPI",
     "PaymentAPI",
-    "TokenProvider"
+    "SyncOrchestrator",
+    "SyncWatermark",
+    "TokenProvider",
+    "sync_all"
 ]
\ No newline at end of file
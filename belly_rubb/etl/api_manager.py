@@ -3,83 +3,76 @@ APIManager provides methods for managing synchronization states and filtering re
 for ETL processes.
 
 This class enables:
-- Checking if records are more recent than the last synchronization for a resource.
-- Iterating over records and yielding those updated since the last sync.
+- Loading the synchronization watermark for a resource once per run.
+- Saving checkpoints of unfinished runs and completing runs.
+- Iterating over records and yielding those updated since the last sync, counting the
+    filter decisions in 'app.metrics'.
 
 Classes:
     APIManager:
-                Determines if a record's creation date is more recent than the last sync date
+                Determines if a record's update date is more recent than the watermark
                 for the specified resource.
 """
-from datetime import datetime
+from datetime import datetime, timezone
+
+from app.db_models import SyncState
+from app.metrics import METRICS
 from loguru import logger
-from sqlalchemy import select
 from sqlalchemy.dialects.sqlite import insert
-from dateutil import parser
 
-from app.db import Session
-from app.db_models import SyncState
+from belly_rubb.etl.mappers import parse_timestamp
+from belly_rubb.etl.watermark import SyncWatermark
+
 
 class APIManager:
     """
     APIManager provides methods for managing synchronization states and filtering records.
 
     This class is designed to facilitate ETL processes by:
-    - Determining if records are more recent than the last synchronization.
+    - Loading the last synchronization of a resource as an in-memory watermark.
     - Upserting synchronization state information in the database.
     - Iterating over records and yielding those that have been updated since the last sync.
 
     Methods:
-        _is_recent(resource: str, record_date: datetime, session) -> bool:
-            Checks if a record's creation date is more recent than the last sync date
-                for a given resource.
-        _upsert_sync_state(resource: str, session, last_synced: datetime) -> None:
+        load_watermark(resource: str, session) -> SyncWatermark:
+            Loads and parses the sync state for a resource once per run.
+        upsert_sync_state(resource: str, session, last_synced: datetime) -> None:
             Inserts or updates the synchronization state for a resource in the database.
-        iter_records(records: list, resource: str):
-            Yields records that have been updated since the last synchronization and
-                updates the sync state after processing.
+        save_checkpoint(resource: str, session, cursor: str,
+                        high_water_mark: datetime) -> None:
+            Records how far an unfinished sync of a resource got.
+        iter_records(records: list, watermark: SyncWatermark, sorted_by_updated: bool):
+            Yields records that have been updated since the watermark.
     """
-    def _is_recent(self, resource: str, record_date: datetime, session) -> bool:
+    def load_watermark(self, resource: str, session) -> SyncWatermark:
         """
-        Determines if a customer's creation date is more recent than the last sync date.
+        Loads the synchronization watermark for a resource once per run.
 
         Args:
-            resource (str): The resource being checked.
-            record_date (datetime): The creation timestamp of the record.
+            resource (str): The resource being synchronized.
             session: Database session to use for the operation.
 
         Returns:
-            bool: True if the record was created after the last sync date or no sync state exists,
-                False otherwise.
+            SyncWatermark: In-memory watermark to pass to iter_records().
         """
-        # Retrieve sync state
-        stmt = (
-            select(SyncState)
-            .where(SyncState.resource == resource)
-        )
-        # Execute query to get sync state
-        sync_state = session.execute(stmt).scalars().first()
-
-        # If it doesn't exist assume record is recent
-        if not sync_state:
-            return True
+        return SyncWatermark.load(resource, session)
 
-        return record_date > parser.isoparse(sync_state.last_synced)
-
-    def upsert_sync_state(self, resource: str, session, last_synced: datetime) -> None:
+    def upsert_sync_state(self, resource: str, session,
+                          last_synced: datetime | None) -> None:
         """
         Upserts the synchronization state for the current resource in the database.
 
         This method inserts a new sync state record for the resource if it does not exist,
         or updates the `last_synced` timestamp if it does. The operation is performed
-        using an upsert (insert or update on conflict) statement.
+        using an upsert (insert or update on conflict) statement. The run is complete, so
+        any checkpoint it left is cleared.
 
         Logs the upsert operation before and after execution.
 
         Params:
             resource (str): Resource to update.
             session: Database session to use for the operation.
-            last_synced (datetime): The last synchronized timestamp.
+            last_synced (datetime): Latest 'updated_at' stored by the completed run.
 
         Returns:
             None
@@ -90,7 +83,10 @@ class APIManager:
         )
 
         update_dict = {
-            "last_synced": last_synced
+            "last_synced": last_synced,
+            "cursor": None,
+            "high_water_mark": None,
+            "checkpointed_at": None
         }
         stmt = stmt.on_conflict_do_update(index_elements=['resource'], set_=update_dict)
 
@@ -98,32 +94,69 @@ class APIManager:
 
         session.execute(stmt)
 
-    def iter_records(self, records: list, resource: str, sorted_by_updated: bool = False):
+    def save_checkpoint(self, resource: str, session, cursor: str | None,
+                        high_water_mark: datetime | None) -> None:
+        """
+        Records how far an unfinished sync of a resource got.
+
+        'last_synced' is left untouched, so the next run resumes from 'cursor' with the
+        same watermark the unfinished run started with.
+
+        Params:
+            resource (str): Resource being synchronized.
+            session: Database session to use for the operation.
+            cursor (str): Position to resume the sync from.
+            high_water_mark (datetime): Latest 'updated_at' stored so far.
+
+        Returns:
+            None
+        """
+        checkpoint = {
+            "cursor": cursor,
+            "high_water_mark": high_water_mark,
+            "checkpointed_at": datetime.now(timezone.utc)
+        }
+        stmt = insert(SyncState).values(resource=resource, **checkpoint)
+        stmt = stmt.on_conflict_do_update(index_elements=['resource'], set_=checkpoint)
+
+        logger.debug(f"Saving checkpoint for resource {resource} at cursor {cursor}")
+
+        session.execute(stmt)
+
+    def iter_records(self, records: list, watermark: SyncWatermark,
+                     sorted_by_updated: bool = False):
         """
         Iterates over a list of records and yields recently updated records.
 
-        Compares 'updated_at' date of record with the last sync date. Updates the sync date
-        after iterating through records.
+        Compares 'updated_at' date of record with the watermark loaded at the start of
+        the run, so no database query is made per record.
 
         Args:
             records (list): A list containing record data.
                 Each record should have an 'updated_at' field.
-            resource (str): Name of the resource being synchronized.
+            watermark (SyncWatermark): Watermark of the resource being synchronized.
             sorted_by_updated (bool): If True, stops iterating when a record is found that
                 is not recent, assuming records are sorted by 'updated_at'.
 
         Yields:
             dict: Records that have been updated since the last synchronization.
         """
-        with Session() as session:
-            with session.begin():
-                for record in records:
-                    # Get date record was updated
-                    record_updated = parser.isoparse(record.updated_at)
-
-                    # Check if record updated since last sync
-                    if self._is_recent(resource, record_updated, session):
-                        yield record
-                    else:
-                        if sorted_by_updated:
-                            break
+        kept = 0
+        try:
+            for record in records:
+                # Get date record was updated
+                record_updated = parse_timestamp(record.updated_at)
+
+                # Check if record updated since last sync
+                if watermark.is_recent(record_updated):
+                    kept += 1
+                    yield record
+                elif sorted_by_updated:
+                    break
+        finally:
+            # Count decisions once per page rather than per record
+            METRICS.inc("sync_records_decoded_total", len(records), resource=watermark.resource)
+            METRICS.inc("sync_records_filtered_total", kept,
+                        resource=watermark.resource, decision="kept")
+            METRICS.inc("sync_records_filtered_total", len(records) - kept,
+                        resource=watermark.resource, decision="skipped")
@@ -0,0 +1,292 @@
+"""
+Module: bulk_upsert.py
+
+This module provides the BulkUpserter and PageWriter classes for writing mapped records to
+the database in chunks instead of one statement per record.
+
+Classes:
+    BulkUpserter:
+        - Builds a single INSERT ... ON CONFLICT DO UPDATE statement for a model once.
+        - Never replaces a row with an older version of it, so upserts are idempotent.
+        - Buffers mapped rows and writes each full chunk with one executemany call.
+        - Records the time and size of every chunk in 'app.metrics'.
+        - Methods:
+            - add(row: dict, session) -> int: Buffers a row, flushing when the chunk is full.
+            - flush(session) -> int: Writes all buffered rows.
+    PageWriter:
+        - Routes pages of mapped rows keyed by model to one BulkUpserter per model.
+        - Replaces the rows of child models, such as order line items and group memberships,
+            with every new version of their parent.
+        - Methods:
+            - write(page: dict, session) -> None: Buffers every model's rows of a page.
+            - flush(session) -> int: Writes the buffered rows of every model.
+
+Usage:
+    upserter = BulkUpserter(Payment)
+    for row in rows:
+        upserter.add(row, session)
+    upserter.flush(session)
+"""
+
+from collections.abc import Iterable
+
+from app.metrics import METRICS, SIZE_BUCKETS
+from loguru import logger
+from sqlalchemy import bindparam, delete, inspect, or_, select
+from sqlalchemy.dialects.sqlite import insert
+
+from belly_rubb.config import UPSERT_CHUNK_SIZE
+
+
+class BulkUpserter:
+    """
+    BulkUpserter collects rows for a model and upserts them in chunks.
+
+    The upsert statement and its update mapping are built once per model, so every chunk
+    reuses the same compiled statement. Rows passed to the same upserter must share the
+    same keys, which must be column names of the model.
+
+    Attributes:
+        model: The 'app.db_models' model rows are written to.
+        chunk_size (int): Number of rows written per statement execution.
+        rows_written (int): Total number of rows written so far.
+
+    Methods:
+        add(row: dict, session) -> int:
+            Buffers a row and flushes the buffer once it reaches chunk_size.
+        extend(rows: Iterable[dict], session) -> int:
+            Buffers several rows, flushing as chunks fill up.
+        flush(session) -> int:
+            Writes all buffered rows to the database.
+    """
+
+    def __init__(
+        self,
+        model,
+        chunk_size: int = UPSERT_CHUNK_SIZE,
+        index_elements: list | None = None,
+        exclude_from_update: tuple = ("created_at",),
+        version_column: str | None = "updated_at",
+    ):
+        """
+        Args:
+            model: The 'app.db_models' model to upsert into.
+            chunk_size (int): Number of rows written per statement execution.
+            index_elements (list): Columns identifying a conflict. Defaults to the primary key.
+            exclude_from_update (tuple): Columns kept from the existing row on conflict.
+            version_column (str): If the model has this column, a conflicting row is only
+                updated when the new value is not older than the stored one. Replaying
+                overlapping pages then never rolls a record back.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+
+        self.model = model
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self._rows = []
+
+        if index_elements is None:
+            index_elements = [col.name for col in inspect(model).primary_key]
+
+        # Build upsert statement once and reuse it for every chunk. A row identified by other
+        # columns than its primary key keeps its stored key
+        stmt = insert(model)
+        update_dict = {}
+        for col in model.__table__.columns:
+            if col.name in index_elements or col.name in exclude_from_update or col.primary_key:
+                continue
+            update_dict[col.name] = stmt.excluded[col.name]
+
+        where = None
+        if version_column is not None and version_column in model.__table__.columns:
+            stored = model.__table__.columns[version_column]
+            incoming = stmt.excluded[version_column]
+            where = or_(stored.is_(None), incoming.is_(None), incoming >= stored)
+
+        self._stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements, set_=update_dict, where=where
+        )
+
+    def add(self, row: dict, session) -> int:
+        """
+        Buffers a mapped row, flushing the buffer when it reaches chunk_size.
+
+        Args:
+            row (dict): Mapping of column names to values.
+            session: Database session to use when flushing.
+
+        Returns:
+            int: Number of rows written by this call.
+        """
+        self._rows.append(row)
+
+        if len(self._rows) >= self.chunk_size:
+            return self.flush(session)
+
+        return 0
+
+    def extend(self, rows: Iterable[dict], session) -> int:
+        """
+        Buffers several mapped rows, flushing every time a chunk fills up.
+
+        Args:
+            rows (Iterable[dict]): Mappings of column names to values.
+            session: Database session to use when flushing.
+
+        Returns:
+            int: Number of rows written by this call.
+        """
+        written = 0
+        for row in rows:
+            written += self.add(row, session)
+
+        return written
+
+    def flush(self, session) -> int:
+        """
+        Writes all buffered rows with a single executemany call.
+
+        Args:
+            session: Database session to use for the operation.
+
+        Returns:
+            int: Number of rows written.
+        """
+        if not self._rows:
+            return 0
+
+        rows, self._rows = self._rows, []
+        table = self.model.__tablename__
+        with METRICS.time("sync_upsert_seconds", table=table):
+            session.execute(self._stmt, rows)
+        METRICS.observe("sync_upsert_rows", len(rows), buckets=SIZE_BUCKETS, table=table)
+        self.rows_written += len(rows)
+
+        logger.debug(f"Upserted {len(rows)} rows into {self.model.__tablename__}")
+
+        return len(rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+class PageWriter:
+    """
+    PageWriter writes pages that hold mapped rows for one or more models.
+
+    Sources yield pages as dictionaries mapping a model to its rows, e.g. orders and their
+    line items. A BulkUpserter is created for each model the first time it appears. Rows of a
+    model with a 'natural_key' attribute are upserted by those columns instead of its primary
+    key, for rows whose primary key is generated by the database.
+
+    A model with a 'parent_key' attribute, naming its foreign key column, holds child rows
+    versioned by their parent: each row carries the 'updated_at' of the parent version it was
+    mapped from. Upserting children only adds and updates rows, so after every flush the
+    children of the parents written since the last flush that are older than the stored
+    parent are deleted. Children removed from a parent then disappear with its next version,
+    and replaying an older page cannot bring them back.
+
+    Attributes:
+        chunk_size (int): Number of rows written per statement execution.
+        upserters (dict): BulkUpserter of every model written so far.
+
+    Methods:
+        write(page: dict, session) -> None:
+            Buffers the rows of every model in the page, flushing full chunks.
+        flush(session) -> int:
+            Writes the buffered rows of every model.
+    """
+
+    def __init__(self, chunk_size: int = UPSERT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.upserters = {}
+
+        # Child model -> (prune statement, ids of the parents written since the last flush)
+        self._children = {}
+
+    @staticmethod
+    def _prune_statement(model):
+        """
+        Builds the statement deleting the children of a parent older than the stored parent.
+        """
+        child = model.__table__
+        parent_key = child.columns[model.parent_key]
+        parent_id = next(iter(parent_key.foreign_keys)).column
+        parent = parent_id.table
+
+        stored = (
+            select(parent.columns["updated_at"])
+            .where(parent_id == bindparam("parent_id"))
+            .scalar_subquery()
+        )
+        version = child.columns["updated_at"]
+
+        return delete(child).where(
+            parent_key == bindparam("parent_id"),
+            stored.is_not(None),
+            or_(version.is_(None), version < stored),
+        )
+
+    def _track_parents(self, page: dict) -> None:
+        """
+        Records the parents of the child models in a page, including parents without rows.
+        """
+        for model, rows in page.items():
+            parent_key = getattr(model, "parent_key", None)
+            if parent_key is None:
+                continue
+
+            if model not in self._children:
+                self._children[model] = (self._prune_statement(model), set())
+            _, parents = self._children[model]
+
+            parents.update(row[parent_key] for row in rows)
+
+            parent_id = next(iter(model.__table__.columns[parent_key].foreign_keys)).column
+            for parent_model, parent_rows in page.items():
+                if parent_model.__table__ is parent_id.table:
+                    parents.update(row[parent_id.name] for row in parent_rows)
+
+    def write(self, page: dict, session) -> None:
+        """
+        Buffers the rows of every model in a page.
+
+        Args:
+            page (dict): Mapping of 'app.db_models' models to lists of mapped rows.
+            session: Database session to use when flushing.
+        """
+        for model, rows in page.items():
+            upserter = self.upserters.get(model)
+            if upserter is None:
+                upserter = self.upserters[model] = BulkUpserter(
+                    model,
+                    chunk_size=self.chunk_size,
+                    index_elements=list(getattr(model, "natural_key", ())) or None,
+                )
+
+            upserter.extend(rows, session)
+
+        self._track_parents(page)
+
+    def flush(self, session) -> int:
+        """
+        Writes the buffered rows of every model, then prunes outdated child rows.
+
+        Args:
+            session: Database session to use for the operation.
+
+        Returns:
+            int: Number of rows written.
+        """
+        written = sum(upserter.flush(session) for upserter in self.upserters.values())
+
+        for model, (prune, parents) in self._children.items():
+            if not parents:
+                continue
+
+            with METRICS.time("sync_prune_seconds", table=model.__tablename__):
+                session.execute(prune, [{"parent_id": parent} for parent in parents])
+            parents.clear()
+
+        return written
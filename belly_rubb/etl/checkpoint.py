@@ -0,0 +1,218 @@
+"""
+Module: checkpoint.py
+
+This module provides resumable sync runs. Sources yield SyncPage objects that carry the
+position to resume the listing after the page, and a SyncCheckpointer commits the stored rows
+together with that position every few pages.
+
+If a run crashes, the next run loads the checkpoint with its watermark and continues from the
+saved cursor instead of fetching everything again. Upserts are idempotent, so pages written
+after the last checkpoint are simply written again.
+
+Several checkpointers may share one session, each flushing its rows into the same open
+transaction. A checkpoint therefore writes inside a savepoint: if it fails, only that
+resource's statements are rolled back, and the rows other resources flushed since their last
+checkpoint are kept for their own commits.
+
+Classes:
+    SyncPage:
+        - Mapped rows of one page keyed by model, as written by a PageWriter.
+        - Carries the cursor of the next page and the page's latest 'updated_at'.
+    SyncCheckpointer:
+        - Writes pages through a PageWriter and commits a checkpoint every 'every' pages.
+        - Methods:
+            - write(page: dict, session) -> None: Buffers a page, checkpointing when due.
+            - checkpoint(session) -> None: Commits stored rows and the resume position.
+            - abort(session) -> None: Checkpoints a failed run, discarding only its own
+                statements if that fails.
+            - complete(session) -> datetime | None: Commits the finished run and advances the
+                watermark to the high-water mark.
+
+Functions:
+    latest_update(records: list) -> datetime | None:
+        Returns the latest 'updated_at' among Square records.
+
+Usage:
+    checkpointer = SyncCheckpointer(resource, watermark)
+    for page in source.extract(watermark):
+        checkpointer.write(page, session)
+    checkpointer.complete(session)
+"""
+
+from datetime import datetime
+
+from app.metrics import METRICS
+from loguru import logger
+
+from belly_rubb.config import CHECKPOINT_PAGES, UPSERT_CHUNK_SIZE
+from belly_rubb.etl.api_manager import APIManager
+from belly_rubb.etl.bulk_upsert import PageWriter
+from belly_rubb.etl.mappers import parse_timestamp
+from belly_rubb.etl.watermark import SyncWatermark
+
+
+def latest_update(records: list) -> datetime | None:
+    """
+    Returns the latest 'updated_at' among Square records.
+
+    Args:
+        records (list): Square records with an RFC 3339 'updated_at' field.
+
+    Returns:
+        datetime | None: The latest update, or None if there are no records.
+    """
+    return max((parse_timestamp(record.updated_at) for record in records), default=None)
+
+
+class SyncPage(dict):
+    """
+    SyncPage maps models to the mapped rows of one API page.
+
+    Attributes:
+        cursor (str | None): Position to resume the listing after this page, or None if
+            it is the last page.
+        high_water_mark (datetime | None): Latest 'updated_at' among the page's records.
+    """
+
+    def __init__(
+        self, rows: dict, cursor: str | None = None, high_water_mark: datetime | None = None
+    ):
+        super().__init__(rows)
+        self.cursor = cursor
+        self.high_water_mark = high_water_mark
+
+
+class SyncCheckpointer:
+    """
+    SyncCheckpointer writes the pages of one resource and periodically commits its progress.
+
+    Attributes:
+        resource (str): Name of the resource being synchronized.
+        writer (PageWriter): Buffers and upserts the rows of every page.
+        every (int): Number of pages between checkpoints. 0 only commits at the end.
+        cursor (str | None): Position to resume from after the last written page.
+        high_water_mark (datetime | None): Latest 'updated_at' written in this run,
+            including the pages of the run being resumed.
+        pages (int): Number of pages written in this run.
+        last_synced (datetime | None): Watermark the run started from, kept if the run
+            stores no records.
+
+    Methods:
+        write(page: dict, session) -> None:
+            Buffers a page and checkpoints every 'every' pages.
+        checkpoint(session) -> None:
+            Writes buffered rows and commits them with the resume position.
+        abort(session) -> None:
+            Checkpoints the pages written before a failure.
+        complete(session) -> datetime | None:
+            Writes buffered rows, advances the watermark to the high-water mark and clears
+            the checkpoint.
+    """
+
+    def __init__(
+        self,
+        resource: str,
+        watermark: SyncWatermark | None = None,
+        chunk_size: int = UPSERT_CHUNK_SIZE,
+        every: int = CHECKPOINT_PAGES,
+    ):
+        self.resource = resource
+        self.writer = PageWriter(chunk_size=chunk_size)
+        self.every = every
+        self.api_manager = APIManager()
+
+        self.cursor = watermark.cursor if watermark else None
+        self.high_water_mark = watermark.high_water_mark if watermark else None
+        self.last_synced = watermark.last_synced if watermark else None
+        self.pages = 0
+
+    def write(self, page: dict, session) -> None:
+        """
+        Buffers the rows of a page, checkpointing every 'every' pages.
+
+        Pages without rows are not written, but still advance the cursor, so a run resumes
+        after them.
+
+        Args:
+            page (dict): Mapping of models to rows. A SyncPage also advances the cursor
+                and the high-water mark.
+            session: Database session to write to.
+        """
+        if any(page.values()):
+            self.writer.write(page, session)
+        self.pages += 1
+        self.cursor = getattr(page, "cursor", None)
+
+        page_mark = getattr(page, "high_water_mark", None)
+        if page_mark is not None and (
+            self.high_water_mark is None or page_mark > self.high_water_mark
+        ):
+            self.high_water_mark = page_mark
+
+        if self.every and self.pages % self.every == 0:
+            self.checkpoint(session)
+
+    def checkpoint(self, session) -> None:
+        """
+        Writes buffered rows and commits them with the position to resume from.
+
+        The rows and the checkpoint are written inside a savepoint, so a failure rolls back
+        this resource's statements only.
+
+        Args:
+            session: Database session to write to.
+        """
+        with session.begin_nested():
+            self.writer.flush(session)
+            self.api_manager.save_checkpoint(
+                resource=self.resource,
+                session=session,
+                cursor=self.cursor,
+                high_water_mark=self.high_water_mark,
+            )
+        with METRICS.time("sync_commit_seconds", resource=self.resource):
+            session.commit()
+
+        logger.debug(f"Checkpointed {self.resource} after {self.pages} pages.")
+
+    def abort(self, session) -> None:
+        """
+        Checkpoints the pages written before a failure, so the next run resumes after them.
+
+        Errors are logged instead of raised, so they do not hide the failure of the run. The
+        session is not rolled back: the failed checkpoint's savepoint already discarded its
+        statements, and the uncommitted rows of other resources sharing the session stay in
+        the transaction.
+
+        Args:
+            session: Database session to write to.
+        """
+        try:
+            self.checkpoint(session)
+        except Exception as e:  # noqa: BLE001  # pylint: disable=broad-except
+            logger.error(f"Could not checkpoint {self.resource}: {e}")
+
+    def complete(self, session) -> datetime | None:
+        """
+        Writes buffered rows and commits the finished run.
+
+        The watermark becomes the latest 'updated_at' stored, never the wall clock, so
+        records updated while the run was in progress are read again by the next run.
+
+        Args:
+            session: Database session to write to.
+
+        Returns:
+            datetime | None: The new watermark, or None if nothing was ever stored.
+        """
+        marks = [mark for mark in (self.last_synced, self.high_water_mark) if mark is not None]
+        last_synced = max(marks) if marks else None
+
+        self.writer.flush(session)
+        self.api_manager.upsert_sync_state(
+            resource=self.resource, session=session, last_synced=last_synced
+        )
+        with METRICS.time("sync_commit_seconds", resource=self.resource):
+            session.commit()
+
+        return last_synced
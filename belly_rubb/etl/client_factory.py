@@ -0,0 +1,57 @@
+"""
+Module: client_factory.py
+
+This module hands out Square SDK clients that share the pooled HTTP transport from
+'app.http_client' instead of each opening their own connections.
+
+Functions:
+    square_client(merchant_id: str | None, token: str | None, base_url: str | None) -> Square:
+        Builds a Square client on the shared HTTP transport.
+
+Usage:
+    client = square_client(merchant_id="MERCHANT_ID")
+    client.payments.list(limit=100)
+"""
+
+from functools import partial
+
+from app.config import SQUARE_BASE_URL
+from app.http_client import get_http_client
+from app.rate_limit import RATE_LIMIT_KEY_HEADER
+from square import Square
+
+from belly_rubb.etl.token_provider import TokenProvider
+
+
+def square_client(
+    merchant_id: str | None = None, token: str | None = None, base_url: str | None = None
+) -> Square:
+    """
+    Builds a Square client on the shared HTTP transport.
+
+    When a merchant id is given the client reads the merchant's access token from the
+    token cache on every request, so tokens refreshed in the background are picked up
+    mid-sync. Requests of all clients for the same merchant share its rate limits.
+
+    Args:
+        merchant_id (str | None): Merchant whose cached access token authenticates requests.
+        token (str | None): Static access token, used when no merchant id is given.
+        base_url (str | None): Overrides the Square API URL, e.g. to target a local server.
+            Defaults to SQUARE_BASE_URL.
+
+    Returns:
+        Square: A Square client sharing the pooled connections.
+    """
+    if merchant_id is not None:
+        provider = TokenProvider()
+
+        # Warm the token cache so authentication errors surface immediately
+        provider.get_access_token(merchant_id=merchant_id)
+        token = partial(provider.get_access_token, merchant_id=merchant_id)
+
+    return Square(
+        token=token,
+        base_url=base_url or SQUARE_BASE_URL,
+        httpx_client=get_http_client(),
+        headers={RATE_LIMIT_KEY_HEADER: merchant_id or "default"},
+    )
@@ -9,41 +9,44 @@ Classes:
         - Provides methods to interact with customer data from the Square API.
         - Handles authentication, API requests, pagination, and database synchronization.
         - Methods:
-            - __init__(merchant_id: str): Initializes the API client and synchronization manager.
+            - __init__(merchant_id: str, client): Initializes the API client and
+                                                            synchronization manager.
             - _paginated_customers(page_limit: int): Retrieves customer records from the API.
-            - _store_customer_info(customer_info: dict): Inserts or updates customer data
-                                                            in the database.
+            - extract(watermark: SyncWatermark, page_limit: int): Generates mapped rows per page.
             - sync_customers(page_limit: int = 50): Synchronizes customer data between the API
                                                             and the database.
 
 Dependencies:
-    - dateutil.parser: For parsing ISO date strings.
+    - belly_rubb.etl.mappers.CUSTOMER_MAPPER: Maps Square customers to 'customers' rows.
     - square.Square: Square API client.
     - loguru.logger: Logging utility.
-    - sqlalchemy.dialects.sqlite.insert: For upsert operations in SQLite.
-    - app.db.Session: SQLAlchemy session for database operations.
+    - belly_rubb.etl.checkpoint.SyncCheckpointer: For chunked, resumable upserts in SQLite.
+    - app.db.ETLSession: SQLAlchemy session on the ETL engine for database operations.
+    - app.metrics.METRICS: Records page fetch and mapping times.
     - app.db_models.Customer: SQLAlchemy model for customer records.
-    - belly_rubb.etl.token_provider.TokenProvider: Provides API access tokens.
+    - app.db_models.GroupMembership: SQLAlchemy model for the groups of every customer.
+    - belly_rubb.etl.client_factory.square_client: Builds authenticated Square clients.
     - belly_rubb.etl.api_manager.APIManager: Manages API synchronization and record iteration.
 
 Usage:
     Instantiate CustomerAPI with a merchant ID and call sync_customers() to sync customer data.
 """
-import time
-from datetime import datetime, timezone
-from dateutil import parser
-from square import Square
-from square.core.api_error import ApiError
-from loguru import logger
+from functools import partial
 
-from sqlalchemy.dialects.sqlite import insert
+from app.db import ETLSession
+from app.db_models import Customer, GroupMembership
+from app.metrics import METRICS
+from loguru import logger
+from square.types.customer import Customer as SquareCustomer
 
-from app.pkce_flow import iso_to_utc
-from app.db import Session
-from app.db_models import Customer
-from belly_rubb.config import MAX_RETRIES, INITIAL_DELAY, DECAY_BASE
-from belly_rubb.etl.token_provider import TokenProvider
+from belly_rubb.config import PREFETCH_DEPTH, UPSERT_CHUNK_SIZE
 from belly_rubb.etl.api_manager import APIManager
+from belly_rubb.etl.checkpoint import SyncCheckpointer, SyncPage, latest_update
+from belly_rubb.etl.client_factory import square_client
+from belly_rubb.etl.mappers import CUSTOMER_MAPPER
+from belly_rubb.etl.pager import PrefetchPager, cursor_pager
+from belly_rubb.etl.watermark import SyncWatermark
+
 
 class CustomerAPI:
     """
@@ -52,147 +55,175 @@ class CustomerAPI:
     Downloaded records are synchronized with a local database.
 
     Attributes:
+        resource (str): Name of the synchronized resource in 'sync_states'.
+        record_type (Customer): Square SDK type of the synchronized records.
+        model (Customer): Model the mapped rows are written to.
         client (Square): Instance of the Square API client for making customer-related API requests.
         api_manager (APIManager): Manages API synchronization state and record iteration.
+        archive (PageArchive | None): Archive the raw records of every page are written to.
 
     Methods:
-        __init__(merchant_id: str):
+        __init__(merchant_id: str, client=None, archive=None):
             Initializes the CustomerAPI with the merchant ID, sets up authentication,
-                and prepares API clients.
+                and prepares API clients. A ready client can be passed instead.
         _paginated_customers(page_limit: int):
             Generates pages of customer records from the API yielding a list of Customers.
-        _store_customer_info(customer_info: dict) -> None:
-            Inserts or updates customer information in the database.
-                Handles conflicts by updating existing records.
+        _map_memberships(customer, updated_at) -> list:
+            Maps the 'group_ids' of a customer to 'group_memberships' rows.
+        map_page(records) -> dict:
+            Maps Square records to 'customers' and 'group_memberships' rows keyed by model.
+        extract(watermark: SyncWatermark, page_limit: int = 50):
+            Generates pages of mapped 'customers' and 'group_memberships' rows updated since
+                the watermark.
         sync_customers(page_limit: int = 50):
             Synchronizes customer data between the API and database, logging progress and results.
     """
+    resource = 'customers'
+    record_type = SquareCustomer
+    model = Customer
 
-    def __init__(self, merchant_id: str):
-        # Initialize token provider to get access token
-        provider = TokenProvider()
-        access_token = provider.get_access_token(merchant_id=merchant_id)
+    def __init__(self, merchant_id: str, client=None, archive=None):
+        if client is None:
+            # Square client on the shared connection pool, authenticated with the
+            # merchant's cached access token
+            client = square_client(merchant_id=merchant_id)
 
-        # Square client to make API requests
-        self.client = Square(token=access_token)
+        self.client = client
+        self.archive = archive
 
         # API Manager for handling synchronization state
         self.api_manager = APIManager()
 
-    def _paginated_customers(self, page_limit: int = 50):
+    def _paginated_customers(self, page_limit: int = 50, prefetch_depth: int = PREFETCH_DEPTH,
+                             updated_since: str | None = None, cursor: str | None = None):
         """
         Generates pages of customer records from the API.
 
-        Uses exponential delay to delay API requests in case of rate limit error.
+        Uses customers.search so Square only returns customers updated since 'updated_since'.
+        Pages after the first are fetched ahead on a background thread.
 
         Params:
             page_limit (int): Limit of records per page
+            prefetch_depth (int): Number of pages fetched ahead of the current one.
+            updated_since (str): RFC 3339 timestamp. If None, all customers are returned.
+            cursor (str): Cursor to resume the listing from. If None, starts at the beginning.
 
         Yields:
-            list: List of Customer objects from API.
+            tuple: List of Customer objects from API and the cursor of the next page.
+        """
+        # Filter on the server so only changed customers are downloaded
+        query = {'sort': {'field': 'CREATED_AT', 'order': 'ASC'}}
+        if updated_since is not None:
+            query['filter'] = {'updated_at': {'start_at': updated_since}}
+
+        # Every page request is rate limited and retried by the shared request scheduler
+        api_response = cursor_pager(
+            partial(self.client.customers.search, limit=page_limit, query=query),
+            items_field='customers',
+            cursor=cursor
+        )
+
+        # Fetch next pages in the background while the current one is stored
+        yield from PrefetchPager(api_response, depth=prefetch_depth, with_cursors=True)
+
+    @staticmethod
+    def _map_memberships(customer, updated_at) -> list:
         """
-        # Set initial values for exponential delay
-        delay = INITIAL_DELAY
-        base = DECAY_BASE
-        retries = 1
-
-        try:
-            api_response = self.client.customers.list(
-                limit=page_limit,
-                sort_field='CREATED_AT',
-                sort_order='DESC'
-            )
-        except ApiError as e:
-            if e.status_code == 429 and retries <= MAX_RETRIES:
-                logger.warning(f"Rate limit exceeded. Retrying after delay. Attempt {retries}")
-
-                # Retry logic for rate limit errors
-                delay = base ** retries  # Exponential backoff
-                time.sleep(delay)
-
-                retries += 1
-            else:
-                logger.error(f"Error fetching paginated customers: {e}")
-                return
-
-        for page in api_response.iter_pages():
-            yield page
-
-    def _store_customer_info(self, customer_info: dict, session) -> None:
+        Maps the groups of a customer to rows of the 'group_memberships' table.
+
+        Args:
+            customer (Customer): Square customer whose 'group_ids' are mapped.
+            updated_at (datetime): Version of the customer, copied onto every row.
+
+        Returns:
+            list: Mappings of 'group_memberships' column names to values.
         """
-        Inserts or updates customer information in the database.
+        return [
+            {'customer_id': customer.id, 'group_id': group_id, 'updated_at': updated_at}
+            for group_id in customer.group_ids or []
+        ]
 
-        If a customer with the given 'id' already exists, their record is updated
-        with the new information. Otherwise, a new customer record is created.
+    @classmethod
+    def map_page(cls, records) -> dict:
+        """
+        Maps Square customer records to rows of the 'customers' and 'group_memberships'
+        tables.
 
         Args:
-            customer_info (dict): A dictionary containing customer details. Expected keys:
-                - 'id' (str): Unique identifier for the customer.
-                - 'address' (dict): Dictionary with keys 'locality' and 'postal_code'.
-                - 'reference_id' (str): Reference identifier for the customer.
-                - 'note' (str): Additional notes about the customer.
-                - 'creation_source' (str,): Source of customer creation.
-            session: Database session to use for the operation.
+            records: Customer objects from the API or from a PageArchive.
 
         Returns:
-            None
+            dict: The mapped rows keyed by model.
         """
-        address = customer_info.get('address', {}) # Have default in case empty
-
-        # Attempt to insert Customer into table
-        stmt = insert(Customer).values(
-            id=customer_info.get('id'),
-            created_at=parser.isoparse(customer_info.get('created_at')),
-            updated_at=parser.isoparse(customer_info.get('updated_at')),
-            given_name=customer_info.get('given_name'),
-            family_name=customer_info.get('family_name'),
-            locality=address.get('locality'),
-            postal_code=address.get('postal_code'),
-            reference_id=customer_info.get('reference_id'),
-            note=customer_info.get('note'),
-            creation_source=customer_info.get('creation_source')
-        )
+        customers, memberships = [], []
+        for customer in records:
+            row = CUSTOMER_MAPPER.map(customer)
 
-        # Create dictionary mapping updated values to current entry in db
-        update_dict = {}
-        for col in Customer.__table__.columns:
-            if col.name not in ['id', 'created_at']:
-                update_dict[col.name] = stmt.excluded[col.name]
+            customers.append(row)
+            memberships.extend(cls._map_memberships(customer, row['updated_at']))
 
-        # Execute statement and update if conflict occurs
-        session.execute(stmt.on_conflict_do_update(index_elements=['id'], set_=update_dict))
+        return {cls.model: customers, GroupMembership: memberships}
 
-    def sync_customers(self, page_limit: int=50) -> None:
+    def extract(self, watermark: SyncWatermark, page_limit: int = 50):
+        """
+        Generates mapped customer rows updated since the watermark.
+
+        The watermark is pushed down to Square as an 'updated_at' filter, and an unfinished
+        run is resumed from its checkpointed cursor. Only reads from the API, so it can run
+        on a fetcher thread while another thread writes the rows.
+
+        Args:
+            watermark (SyncWatermark): Watermark loaded at the start of the run.
+            page_limit (int): The maximum number of records to retrieve per API request.
+
+        Yields:
+            SyncPage: Mapped 'customers' and 'group_memberships' rows of one page, keyed by model.
+        """
+        pages = self._paginated_customers(
+            page_limit=page_limit, updated_since=watermark.isoformat(), cursor=watermark.cursor)
+
+        for page, cursor in METRICS.timed(pages, "sync_fetch_seconds", resource=self.resource):
+            if self.archive is not None:
+                self.archive.write(self.resource, page)
+
+            with METRICS.time("sync_map_seconds", resource=self.resource):
+                rows = self.map_page(
+                    self.api_manager.iter_records(records=page, watermark=watermark))
+            yield SyncPage(rows, cursor=cursor, high_water_mark=latest_update(page))
+
+    def sync_customers(self, page_limit: int=50, chunk_size: int = UPSERT_CHUNK_SIZE) -> None:
         """
         Synchronizes customer data between the API and the database.
 
         Args:
             page_limit (int): The maximum number of records to retrieve per API request.
+            chunk_size (int): The number of records written per bulk upsert.
 
         Returns:    
             None
         """
         logger.info("Starting customer synchronization process.")
         count_of_records = 0
-        last_synced = iso_to_utc(datetime.now(timezone.utc))
-
-        with Session() as session_db:
-            # Loop through customer records
-            for page in self._paginated_customers(page_limit=page_limit):
-                # Loop through records in page
-                for record in self.api_manager.iter_records(records=page, resource='customers'):
-                    # Store customer data
-                    self._store_customer_info(record.dict(), session_db)
-
-                    count_of_records += 1
-
-                last_synced = iso_to_utc(datetime.now(timezone.utc))
 
-            # Upsert sync state
-            self.api_manager.upsert_sync_state(
-                resource='customers',
-                session=session_db,
-                last_synced=last_synced)
+        with ETLSession() as session_db:
+            # Load sync watermark and checkpoint once for the whole run
+            watermark = self.api_manager.load_watermark(resource=self.resource, session=session_db)
+            checkpointer = SyncCheckpointer(self.resource, watermark, chunk_size=chunk_size)
+            if watermark.cursor:
+                logger.info("Resuming customer synchronization from the last checkpoint.")
+
+            try:
+                # Loop through pages of mapped customer records
+                for page in self.extract(watermark=watermark, page_limit=page_limit):
+                    # Buffer customer data, committed at every checkpoint
+                    checkpointer.write(page, session_db)
+                    count_of_records += len(page[self.model])
+            except Exception:
+                checkpointer.abort(session_db)
+                raise
+
+            # Write remaining buffered customers and advance the watermark to the latest update
+            checkpointer.complete(session_db)
 
             logger.success(f"Customer synchronization process completed successfully. "
                             f"Stored {count_of_records} records.")
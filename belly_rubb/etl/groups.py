@@ -0,0 +1,185 @@
+"""
+Module: groups.py
+
+This module provides the GroupsAPI class for synchronizing customer groups
+between an external API (Square) and a local database.
+
+Classes:
+    GroupsAPI:
+        - Provides methods to interact with customer group data from the Square API.
+        - Handles API requests, pagination, and database synchronization.
+        - Methods:
+            - __init__(merchant_id: str, client): Initializes the API client and
+                                                            synchronization manager.
+            - _paginated_groups(page_limit: int): Retrieves customer group records from the API.
+            - extract(watermark: SyncWatermark, page_limit: int): Generates mapped rows per page.
+            - sync_groups(page_limit: int = 50): Synchronizes customer group data between the
+                                                            API and the database.
+
+Dependencies:
+    - loguru.logger: Logging utility.
+    - belly_rubb.etl.checkpoint.SyncCheckpointer: For chunked, resumable upserts in SQLite.
+    - app.db.ETLSession: SQLAlchemy session on the ETL engine for database operations.
+    - app.metrics.METRICS: Records page fetch and mapping times.
+    - app.db_models.Group: SQLAlchemy model for customer group records.
+    - belly_rubb.etl.mappers.GROUP_MAPPER: Maps Square customer groups to 'groups' rows.
+    - belly_rubb.etl.client_factory.square_client: Builds authenticated Square clients.
+    - belly_rubb.etl.api_manager.APIManager: Manages API synchronization and record iteration.
+
+Usage:
+    Instantiate GroupsAPI with a merchant ID and call sync_groups() to sync customer groups.
+"""
+
+from app.db import ETLSession
+from app.db_models import Group
+from app.metrics import METRICS
+from loguru import logger
+from square.types.customer_group import CustomerGroup
+
+from belly_rubb.config import PREFETCH_DEPTH, UPSERT_CHUNK_SIZE
+from belly_rubb.etl.api_manager import APIManager
+from belly_rubb.etl.checkpoint import SyncCheckpointer, SyncPage, latest_update
+from belly_rubb.etl.client_factory import square_client
+from belly_rubb.etl.mappers import GROUP_MAPPER
+from belly_rubb.etl.pager import PrefetchPager
+from belly_rubb.etl.watermark import SyncWatermark
+
+
+class GroupsAPI:
+    """
+    GroupsAPI provides methods to interact with customer group data from an external API.
+
+    Square cannot filter customer groups by update time, so every run lists all groups and
+    only the ones updated since the watermark are written. Merchants have few groups, so
+    the listing is a handful of requests.
+
+    Attributes:
+        resource (str): Name of the synchronized resource in 'sync_states'.
+        record_type (CustomerGroup): Square SDK type of the synchronized records.
+        model (Group): Model the mapped rows are written to.
+        client (Square): Instance of the Square API client.
+        api_manager (APIManager): Manages API synchronization state and record iteration.
+        archive (PageArchive | None): Archive the raw records of every page are written to.
+
+    Methods:
+        __init__(merchant_id: str, client=None, archive=None):
+            Initializes the GroupsAPI with the merchant ID. A ready client can be passed
+                instead.
+        _paginated_groups(page_limit: int):
+            Generates pages of customer group records from the API.
+        map_page(records) -> dict:
+            Maps Square records to 'groups' rows keyed by model.
+        extract(watermark: SyncWatermark, page_limit: int = 50):
+            Generates pages of mapped 'groups' rows updated since the watermark.
+        sync_groups(page_limit: int = 50):
+            Synchronizes customer groups between the API and database.
+    """
+
+    resource = "groups"
+    record_type = CustomerGroup
+    model = Group
+
+    def __init__(self, merchant_id: str, client=None, archive=None):
+        if client is None:
+            # Square client on the shared connection pool, authenticated with the
+            # merchant's cached access token
+            client = square_client(merchant_id=merchant_id)
+
+        self.client = client
+        self.archive = archive
+
+        # API Manager for handling synchronization state
+        self.api_manager = APIManager()
+
+    def _paginated_groups(
+        self, page_limit: int = 50, prefetch_depth: int = PREFETCH_DEPTH, cursor: str | None = None
+    ):
+        """
+        Generates pages of customer group records from the API.
+
+        Params:
+            page_limit (int): Limit of records per page
+            prefetch_depth (int): Number of pages fetched ahead of the current one.
+            cursor (str): Cursor to resume the listing from. If None, starts at the beginning.
+
+        Yields:
+            tuple: List of CustomerGroup objects from API and the cursor of the next page.
+        """
+        api_response = self.client.customers.groups.list(limit=page_limit, cursor=cursor)
+
+        yield from PrefetchPager(api_response, depth=prefetch_depth, with_cursors=True)
+
+    @classmethod
+    def map_page(cls, records) -> dict:
+        """
+        Maps Square customer group records to rows of the 'groups' table.
+
+        Args:
+            records: CustomerGroup objects from the API or from a PageArchive.
+
+        Returns:
+            dict: The mapped rows keyed by model.
+        """
+        return {cls.model: [GROUP_MAPPER.map(group) for group in records]}
+
+    def extract(self, watermark: SyncWatermark, page_limit: int = 50):
+        """
+        Generates mapped customer group rows updated since the watermark.
+
+        Args:
+            watermark (SyncWatermark): Watermark loaded at the start of the run.
+            page_limit (int): The maximum number of records to retrieve per API request.
+
+        Yields:
+            SyncPage: Mapped 'groups' rows of one page, keyed by model.
+        """
+        pages = self._paginated_groups(page_limit=page_limit, cursor=watermark.cursor)
+
+        for page, cursor in METRICS.timed(pages, "sync_fetch_seconds", resource=self.resource):
+            if self.archive is not None:
+                self.archive.write(self.resource, page)
+
+            with METRICS.time("sync_map_seconds", resource=self.resource):
+                rows = self.map_page(
+                    self.api_manager.iter_records(records=page, watermark=watermark)
+                )
+            yield SyncPage(rows, cursor=cursor, high_water_mark=latest_update(page))
+
+    def sync_groups(self, page_limit: int = 50, chunk_size: int = UPSERT_CHUNK_SIZE) -> None:
+        """
+        Synchronizes customer group data between the API and the database.
+
+        Args:
+            page_limit (int): The maximum number of records to retrieve per API request.
+            chunk_size (int): The number of records written per bulk upsert.
+
+        Returns:
+            None
+        """
+        logger.info("Starting customer group synchronization process.")
+        count_of_records = 0
+
+        with ETLSession() as session_db:
+            # Load sync watermark and checkpoint once for the whole run
+            watermark = self.api_manager.load_watermark(resource=self.resource, session=session_db)
+            checkpointer = SyncCheckpointer(self.resource, watermark, chunk_size=chunk_size)
+
+            try:
+                for page in self.extract(watermark=watermark, page_limit=page_limit):
+                    checkpointer.write(page, session_db)
+                    count_of_records += len(page[self.model])
+            except Exception:
+                checkpointer.abort(session_db)
+                raise
+
+            logger.success(
+                f"Customer group synchronization process completed. "
+                f"Total records processed: {count_of_records}"
+            )
+
+            checkpointer.complete(session_db)
+
+
+if __name__ == "__main__":
+    group_sync = GroupsAPI(merchant_id="MLW4W4RYAASNM")
+    group_sync.sync_groups()
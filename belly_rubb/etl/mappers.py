@@ -0,0 +1,211 @@
+"""
+Module: mappers.py
+
+This module provides declarative mappers that turn Square SDK records into table rows.
+
+A mapper is declared as a list of fields, each naming a column, the attribute path of its value
+in the Square record and an optional converter. The fields are compiled once into an
+'operator.attrgetter' for the record's own attributes and a list of lookups for nested ones,
+which read the SDK object's attributes directly. Mapping a record then costs a few attribute
+lookups instead of a pydantic '.dict()' dump, chains of '.get()' calls and a dateutil parse per
+timestamp.
+
+Classes:
+    Field:
+        - Maps the value at an attribute path of a record to a column.
+    RecordMapper:
+        - Compiles fields into attribute lookups shared by all fields.
+        - Methods:
+            - map(record) -> dict: Maps a record to a row.
+
+Functions:
+    parse_timestamp(value: str) -> datetime:
+        Parses an RFC 3339 timestamp from Square.
+
+Attributes:
+    CUSTOMER_MAPPER, PAYMENT_MAPPER, ORDER_MAPPER, LINE_ITEM_MAPPER, GROUP_MAPPER (RecordMapper):
+        Mappers of the synchronized Square records.
+
+Usage:
+    rows = [PAYMENT_MAPPER.map(payment) for payment in page]
+"""
+
+from collections.abc import Callable
+from datetime import datetime
+from operator import attrgetter
+from typing import NamedTuple
+
+from dateutil import parser
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parses an RFC 3339 timestamp from Square.
+
+    'datetime.fromisoformat' is several times faster than dateutil but, before Python 3.11,
+    rejects the 'Z' suffix and fractions that are not 3 or 6 digits long. The suffix is
+    rewritten and anything else it rejects falls back to dateutil.
+
+    Args:
+        value (str): The timestamp, e.g. '2024-01-01T00:00:00.000Z'.
+
+    Returns:
+        datetime: The timezone-aware timestamp.
+    """
+    try:
+        return datetime.fromisoformat(value[:-1] + "+00:00" if value[-1:] == "Z" else value)
+    except ValueError:
+        return parser.isoparse(value)
+
+
+class Field(NamedTuple):
+    """
+    Field maps the value at an attribute path of a record to a column.
+
+    Attributes:
+        column (str): Column the value is written to.
+        path (str): Dotted attribute path in the Square record, e.g. 'amount_money.amount'.
+            Missing intermediate objects give None.
+        convert (Callable | None): Applied to the value unless it is None.
+    """
+
+    column: str
+    path: str
+    convert: Callable | None = None
+
+
+class RecordMapper:
+    """
+    RecordMapper compiles fields into a function mapping a record to a row.
+
+    Every attribute path is read once, and a shared prefix such as 'card_details' in
+    'card_details.card.card_brand' is looked up a single time for all fields using it. The
+    record's own attributes are read together by a single 'operator.attrgetter' call.
+
+    Attributes:
+        fields (tuple): Fields of the mapped rows.
+        map (Callable): Compiled function mapping a record to a row dict.
+    """
+
+    def __init__(self, fields: list):
+        self.fields = tuple(fields)
+        self.map = self._compile(self.fields)
+
+    @staticmethod
+    def _compile(fields: tuple) -> Callable:
+        """
+        Plans the attribute lookups of the fields and returns the mapping function.
+
+        Values are kept in a list: first the record's attributes, then every nested lookup,
+        each reading an attribute of a value earlier in the list.
+        """
+        paths = []
+        for field in fields:
+            path = tuple(field.path.split("."))
+            if not all(name.isidentifier() for name in path):
+                raise ValueError(f"Invalid attribute path for column {field.column}: {field.path}")
+            paths.append(path)
+
+        # Position of every path's value, record attributes first
+        positions = {}
+        for path in paths:
+            positions.setdefault(path[:1], len(positions))
+
+        nested = []
+        for path in paths:
+            for depth in range(2, len(path) + 1):
+                if path[:depth] not in positions:
+                    nested.append((positions[path[: depth - 1]], path[depth - 1]))
+                    positions[path[:depth]] = len(positions)
+
+        # attrgetter returns a bare value, not a tuple, for a single attribute
+        names = [path[0] for path in positions if len(path) == 1]
+        read_record = (
+            attrgetter(*names) if len(names) > 1 else (lambda record: (getattr(record, names[0]),))
+        )
+
+        columns = [
+            (field.column, positions[path], field.convert) for field, path in zip(fields, paths)
+        ]
+
+        def map_record(record) -> dict:
+            values = list(read_record(record))
+            for parent, name in nested:
+                value = values[parent]
+                values.append(getattr(value, name) if value is not None else None)
+
+            return {
+                column: (
+                    values[position]
+                    if convert is None or values[position] is None
+                    else convert(values[position])
+                )
+                for column, position, convert in columns
+            }
+
+        return map_record
+
+
+CUSTOMER_MAPPER = RecordMapper(
+    [
+        Field("id", "id"),
+        Field("created_at", "created_at", parse_timestamp),
+        Field("updated_at", "updated_at", parse_timestamp),
+        Field("given_name", "given_name"),
+        Field("family_name", "family_name"),
+        Field("locality", "address.locality"),
+        Field("postal_code", "address.postal_code"),
+        Field("reference_id", "reference_id"),
+        Field("note", "note"),
+        Field("creation_source", "creation_source"),
+    ]
+)
+
+PAYMENT_MAPPER = RecordMapper(
+    [
+        Field("id", "id"),
+        Field("created_at", "created_at", parse_timestamp),
+        Field("updated_at", "updated_at", parse_timestamp),
+        Field("status", "status"),
+        Field("amount", "amount_money.amount"),
+        Field("total_money", "total_money.amount"),
+        Field("approved_money", "approved_money.amount"),
+        Field("currency", "amount_money.currency"),
+        Field("card_brand", "card_details.card.card_brand"),
+        Field("location_id", "location_id"),
+        Field("order_id", "order_id"),
+        Field("square_product", "application_details.square_product"),
+    ]
+)
+
+ORDER_MAPPER = RecordMapper(
+    [
+        Field("id", "id"),
+        Field("location_id", "location_id"),
+        Field("created_at", "created_at", parse_timestamp),
+        Field("updated_at", "updated_at", parse_timestamp),
+        Field("customer_id", "customer_id"),
+    ]
+)
+
+# The order's 'order_id' and 'created_at' are added by OrdersAPI
+LINE_ITEM_MAPPER = RecordMapper(
+    [
+        Field("uid", "uid"),
+        Field("catalog_object_id", "catalog_object_id"),
+        Field("name", "name"),
+        Field("variation_name", "variation_name"),
+        Field("quantity", "quantity", float),
+        Field("gross_sales_money", "gross_sales_money.amount"),
+        Field("currency", "gross_sales_money.currency"),
+    ]
+)
+
+GROUP_MAPPER = RecordMapper(
+    [
+        Field("id", "id"),
+        Field("name", "name"),
+        Field("created_at", "created_at", parse_timestamp),
+        Field("updated_at", "updated_at", parse_timestamp),
+    ]
+)
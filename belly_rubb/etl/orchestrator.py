@@ -0,0 +1,263 @@
+"""
+Module: orchestrator.py
+
+This module provides the SyncOrchestrator class for synchronizing several resources at once.
+
+Each resource is fetched on its own thread from a pool of fetchers. Fetchers only talk to the
+Square API and put pages of mapped rows on a bounded queue. A single writer thread owns the
+database session and performs every upsert, so SQLite never sees competing writers. A run takes
+roughly as long as the slowest resource instead of the sum of all of them. The writer
+checkpoints every resource as it goes, so a failed run resumes where it stopped. At the end
+of a run, the timings and counts every stage recorded in 'app.metrics' are logged as JSON.
+
+Classes:
+    SyncOrchestrator:
+        - Loads a watermark per resource, then runs fetchers and the writer concurrently.
+        - Methods:
+            - run() -> dict: Synchronizes all sources and returns stored record counts.
+
+Functions:
+    sync_all(merchant_id: str, resources: tuple, page_limit: int, archive: PageArchive) -> dict:
+        Builds the API sources for a merchant and synchronizes them concurrently.
+
+Usage:
+    Call sync_all(merchant_id) for the nightly sync.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+import queue
+import threading
+
+from app.db import ETLSession
+from app.metrics import METRICS
+from loguru import logger
+
+from belly_rubb.config import CHECKPOINT_PAGES, SYNC_QUEUE_SIZE, UPSERT_CHUNK_SIZE
+from belly_rubb.etl.api_manager import APIManager
+from belly_rubb.etl.checkpoint import SyncCheckpointer
+from belly_rubb.etl.customers import CustomerAPI
+from belly_rubb.etl.groups import GroupsAPI
+from belly_rubb.etl.orders import OrdersAPI
+from belly_rubb.etl.payments import PaymentAPI
+
+# Resource names mapped to the API classes that synchronize them
+SOURCES = {
+    CustomerAPI.resource: CustomerAPI,
+    GroupsAPI.resource: GroupsAPI,
+    PaymentAPI.resource: PaymentAPI,
+    OrdersAPI.resource: OrdersAPI,
+}
+
+# Message kinds passed from fetchers to the writer
+_ROWS = "rows"
+_DONE = "done"
+_FAILED = "failed"
+
+
+class SyncOrchestrator:
+    """
+    SyncOrchestrator runs several resource syncs concurrently with a single database writer.
+
+    A source is any object with a 'resource' name, a 'model' to write to, and an
+    'extract(watermark, page_limit)' generator yielding pages of mapped rows keyed by model,
+    such as CustomerAPI, GroupsAPI, PaymentAPI or OrdersAPI.
+
+    Attributes:
+        sources (list): Sources to synchronize.
+        page_limit (int): The maximum number of records to retrieve per API request.
+        chunk_size (int): The number of records written per bulk upsert.
+        queue_size (int): The number of pages fetchers may queue ahead of the writer.
+        max_workers (int): Number of fetcher threads. Defaults to one per source.
+        checkpoint_pages (int): Number of pages of a resource between checkpoints.
+        metrics (dict): Summary of the stage timings and counts recorded by the last run,
+            as returned by 'app.metrics.METRICS.summary()'. Also logged as JSON.
+
+    Methods:
+        run() -> dict:
+            Synchronizes every source and returns the number of records stored per resource.
+    """
+
+    def __init__(
+        self,
+        sources: list,
+        page_limit: int = 50,
+        chunk_size: int = UPSERT_CHUNK_SIZE,
+        queue_size: int = SYNC_QUEUE_SIZE,
+        max_workers: int | None = None,
+        checkpoint_pages: int = CHECKPOINT_PAGES,
+    ):
+        self.sources = sources
+        self.page_limit = page_limit
+        self.chunk_size = chunk_size
+        self.checkpoint_pages = checkpoint_pages
+        self.max_workers = max_workers or len(sources)
+        self.api_manager = APIManager()
+
+        self.metrics = {}
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+
+    def _put(self, message: tuple) -> bool:
+        """
+        Puts a message on the queue, giving up if the writer has stopped.
+
+        Returns:
+            bool: True if the message was queued, False if the run was stopped.
+        """
+        while not self._stop.is_set():
+            try:
+                self._queue.put(message, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _fetch(self, source, watermark) -> None:
+        """
+        Fetches pages for a source and hands the mapped rows to the writer.
+
+        Args:
+            source: The source to fetch.
+            watermark (SyncWatermark): Watermark loaded at the start of the run.
+        """
+        logger.info(f"Fetching {source.resource}...")
+
+        try:
+            for page in source.extract(watermark=watermark, page_limit=self.page_limit):
+                # Pages without rows still advance the checkpoint's cursor
+                if not self._put((source.resource, _ROWS, page)):
+                    return
+        except Exception as e:  # noqa: BLE001  # pylint: disable=broad-except
+            logger.error(f"Error fetching {source.resource}: {e}")
+            self._put((source.resource, _FAILED, e))
+            return
+
+        self._put((source.resource, _DONE, None))
+
+    def _write(self, counts: dict, failures: dict, watermarks: dict) -> None:
+        """
+        Writes queued rows until every source has finished or failed.
+
+        Sync state is only advanced for sources that finished without errors. Failed
+        sources keep a checkpoint after their last stored page.
+
+        Args:
+            counts (dict): Filled with the number of records stored per resource.
+            failures (dict): Filled with the exception of every failed resource.
+            watermarks (dict): Watermark of every resource, loaded at the start of the run.
+        """
+        models = {source.resource: source.model for source in self.sources}
+        pending = set(models)
+
+        try:
+            with ETLSession() as session_db:
+                checkpointers = {
+                    resource: SyncCheckpointer(
+                        resource,
+                        watermarks[resource],
+                        chunk_size=self.chunk_size,
+                        every=self.checkpoint_pages,
+                    )
+                    for resource in models
+                }
+
+                while pending:
+                    resource, kind, payload = self._queue.get()
+
+                    if kind == _ROWS:
+                        checkpointers[resource].write(payload, session_db)
+                        counts[resource] += len(payload.get(models[resource], ()))
+                        continue
+
+                    # Source finished, write its remaining rows
+                    pending.discard(resource)
+
+                    if kind == _DONE:
+                        checkpointers[resource].complete(session_db)
+                        logger.success(f"Synchronized {counts[resource]} {resource} records.")
+                    else:
+                        failures[resource] = payload
+                        checkpointers[resource].abort(session_db)
+        except Exception as e:  # noqa: BLE001  # pylint: disable=broad-except
+            logger.error(f"Error writing synchronized records: {e}")
+            failures.update({resource: e for resource in pending})
+        finally:
+            # Release fetchers blocked on a full queue if the writer stops early
+            self._stop.set()
+
+    def run(self) -> dict:
+        """
+        Synchronizes all sources concurrently.
+
+        Returns:
+            dict: Number of records stored per resource.
+
+        Raises:
+            RuntimeError: If one or more sources failed. Rows stored before the failure
+                are kept and checkpointed, but the sync state of failed sources is not
+                advanced.
+        """
+        counts = {source.resource: 0 for source in self.sources}
+        failures = {}
+        snapshot = METRICS.snapshot()
+
+        # Load every watermark before fetchers start so only the writer touches the database
+        with ETLSession() as session_db:
+            watermarks = {
+                source.resource: self.api_manager.load_watermark(source.resource, session_db)
+                for source in self.sources
+            }
+
+        writer = threading.Thread(
+            target=self._write,
+            args=(counts, failures, watermarks),
+            name="sync-writer",
+            daemon=True,
+        )
+        writer.start()
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="sync-fetcher"
+        ) as executor:
+            for source in self.sources:
+                executor.submit(self._fetch, source, watermarks[source.resource])
+
+        writer.join()
+
+        self.metrics = METRICS.summary(since=snapshot)
+        logger.info(f"Sync metrics: {json.dumps(self.metrics, sort_keys=True)}")
+
+        if failures:
+            raise RuntimeError(f"Synchronization failed for: {', '.join(sorted(failures))}")
+
+        return counts
+
+
+def sync_all(
+    merchant_id: str, resources: tuple = tuple(SOURCES), page_limit: int = 50, archive=None
+) -> dict:
+    """
+    Synchronizes several resources of a merchant concurrently.
+
+    Args:
+        merchant_id (str): The unique identifier of the merchant.
+        resources (tuple): Names of the resources to synchronize. Defaults to all of them.
+        page_limit (int): The maximum number of records to retrieve per API request.
+        archive (PageArchive | None): Archive the raw records of every page are written to,
+            for offline replays with 'belly_rubb.etl.archive.replay'.
+
+    Returns:
+        dict: Number of records stored per resource.
+    """
+    sources = [
+        SOURCES[resource](merchant_id=merchant_id, archive=archive) for resource in resources
+    ]
+
+    return SyncOrchestrator(sources, page_limit=page_limit).run()
+
+
+if __name__ == "__main__":
+    sync_all(merchant_id="MLW4W4RYAASNM")
@@ -1,37 +1,137 @@
-import os
-from dotenv import load_dotenv
+"""
+Module: orders.py
+
+This module provides the OrdersAPI class for synchronizing order data
+between an external API (Square) and a local database.
+
+Classes:
+    OrdersAPI:
+        - Provides methods to interact with order data from the Square API.
+        - Handles authentication, API requests, pagination, and database synchronization.
+        - Methods:
+            - __init__(merchant_id: str, client, location_ids: list): Initializes the API client
+                                                            and synchronization manager.
+            - get_location_ids() -> list: Retrieves the location ids to search orders in.
+            - get_order_ids(location_ids: list, updated_since: str): Generates pages of order ids.
+            - _batch_retrieve(order_ids: list) -> list: Retrieves full orders in batches.
+            - _paginated_orders(page_limit: int): Retrieves order records from the API.
+            - _map_line_items(order, created_at: datetime, updated_at: datetime): Maps order
+                                                            line items to 'order_line_items' rows.
+            - extract(watermark: SyncWatermark, page_limit: int): Generates mapped rows per page.
+            - sync_orders(page_limit: int = 100): Synchronizes order data between the API
+                                                            and the database.
+
+Dependencies:
+    - belly_rubb.etl.mappers: Maps Square orders and line items to rows.
+    - square.Square: Square API client.
+    - loguru.logger: Logging utility.
+    - belly_rubb.etl.checkpoint.SyncCheckpointer: For chunked, resumable upserts in SQLite.
+    - app.db.ETLSession: SQLAlchemy session on the ETL engine for database operations.
+    - app.metrics.METRICS: Records page fetch and mapping times.
+    - app.db_models.Order: SQLAlchemy model for order records.
+    - app.db_models.OrderLineItem: SQLAlchemy model for order line item records.
+    - belly_rubb.etl.client_factory.square_client: Builds authenticated Square clients.
+    - belly_rubb.etl.api_manager.APIManager: Manages API synchronization and record iteration.
+
+Usage:
+    Instantiate OrdersAPI with a merchant ID and call sync_orders() to sync order data.
+"""
 from datetime import datetime
-from square import Square
-from sqlalchemy import select, func
+from functools import partial
+import os
 
-from app.db import Session
-from app.db_models.order import Order
+from app.db import ETLSession
+from app.db_models import Order, OrderLineItem
+from app.metrics import METRICS
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy import func, select
+from square.types.order import Order as SquareOrder
 
+from belly_rubb.config import PREFETCH_DEPTH, UPSERT_CHUNK_SIZE
 from belly_rubb.etl.api_manager import APIManager
-from belly_rubb.etl.token_provider import TokenProvider
+from belly_rubb.etl.checkpoint import SyncCheckpointer, SyncPage, latest_update
+from belly_rubb.etl.client_factory import square_client
+from belly_rubb.etl.mappers import LINE_ITEM_MAPPER, ORDER_MAPPER
+from belly_rubb.etl.pager import PrefetchPager, cursor_pager
+from belly_rubb.etl.watermark import SyncWatermark
 
 load_dotenv()
 LOCATION_ID = os.getenv(key="BELLY_RUBB_LOCATION_ID")
 
+# Square limits on orders.search and orders.batch_get requests
+MAX_SEARCH_LOCATIONS = 10
+MAX_BATCH_RETRIEVE = 100
+
 class OrdersAPI:
-    def __init__(self, merchant_id: str):
-        # Initialize the token provider
-        provider = TokenProvider()
-        access_token = provider.get_access_token(merchant_id=merchant_id)
+    """
+    OrdersAPI provides methods to interact with order data from an external API.
+
+    Downloaded records are synchronized with a local database. Orders are streamed page
+    by page from orders.search, so memory stays constant regardless of order history size.
+
+    Attributes:
+        resource (str): Name of the synchronized resource in 'sync_states'.
+        record_type (Order): Square SDK type of the synchronized records.
+        model (Order): Model the mapped rows are written to.
+        client (Square): Instance of the Square API client for making order-related API requests.
+        api_manager (APIManager): Manages API synchronization state and record iteration.
+        archive (PageArchive | None): Archive the raw records of every page are written to.
+        location_ids (list): Location ids to search orders in. Looked up when first needed
+            if not given and BELLY_RUBB_LOCATION_ID is not set.
 
-        # Square client to make API requests
-        self.client = Square(token=access_token)
+    Methods:
+        __init__(merchant_id: str, client=None, location_ids: list = None, archive=None):
+            Initializes the OrdersAPI with the merchant ID, sets up authentication,
+                and prepares API clients. A ready client can be passed instead.
+        get_location_ids() -> list:
+            Retrieves the location ids to search orders in.
+        _search_pages(location_ids: list, page_limit: int, updated_since: str, ...):
+            Generates pages of orders.search results, 10 location ids at a time.
+        get_order_ids(location_ids: list, updated_since: str, page_limit: int = 500):
+            Generates pages of ids of orders updated since a timestamp.
+        _batch_retrieve(order_ids: list) -> list:
+            Retrieves full orders in batches of 100 ids.
+        _paginated_orders(page_limit: int, updated_since: str, hydrate: bool):
+            Generates pages of order records from the API yielding a list of Orders.
+        _map_line_items(order, created_at: datetime, updated_at: datetime) -> list:
+            Maps the line items of an order to rows of the 'order_line_items' table.
+        map_page(records) -> dict:
+            Maps Square records to 'orders' and 'order_line_items' rows keyed by model.
+        extract(watermark: SyncWatermark, page_limit: int = 100, hydrate: bool = False):
+            Generates pages of mapped 'orders' and 'order_line_items' rows updated since
+                the watermark.
+        sync_orders(page_limit: int = 100):
+            Synchronizes order data between the API and database, logging progress and results.
+    """
+    resource = 'orders'
+    record_type = SquareOrder
+    model = Order
+
+    def __init__(self, merchant_id: str, client=None, location_ids: list | None = None,
+                 archive=None):
+        if client is None:
+            # Square client on the shared connection pool, authenticated with the
+            # merchant's cached access token
+            client = square_client(merchant_id=merchant_id)
+
+        self.client = client
+        self.archive = archive
 
         # API Manager for handling synchronization
         self.api_manager = APIManager()
 
+        if location_ids is None and LOCATION_ID:
+            location_ids = [LOCATION_ID]
+        self.location_ids = location_ids
+
     def _get_latest_order(self, session) -> datetime:
         """
         Retrieves the latest order's updated_at timestamp from the database.
 
         Params:
             session: Database session to use for the operation.
-        
+
         Returns:
             result (datetime): The latest order's updated_at timestamp.
         """
@@ -40,24 +140,257 @@ class OrdersAPI:
 
         return result
 
-    def get_order_ids(self, location_ids: list, return_entries: bool = False, page_limit: int = 500):
-        
+    def get_location_ids(self) -> list:
+        """
+        Retrieves the location ids to search orders in.
+
+        Uses the configured location ids, otherwise lists the merchant's locations once.
+
+        Returns:
+            list: Location ids of the merchant.
+        """
+        if self.location_ids is None:
+            response = self.client.locations.list()
+            self.location_ids = [location.id for location in response.locations or []]
+            logger.debug(f"Searching orders in locations: {self.location_ids}")
+
+        return self.location_ids
+
+    def _search_pages(self, location_ids: list, page_limit: int, updated_since: str | None,
+                      return_entries: bool, prefetch_depth: int = PREFETCH_DEPTH,
+                      position: str | None = None):
+        """
+        Generates pages of orders.search results across all location ids.
+
+        Orders are filtered on 'updated_at' by Square and sorted oldest first. Location ids
+        are searched in groups of 10, the most orders.search accepts.
+
+        Each page comes with the position to resume after it, formatted as
+        '<offset of the location group>:<cursor within the group>'.
+
+        Params:
+            location_ids (list): Location ids to search orders in.
+            page_limit (int): Limit of records per page.
+            updated_since (str): RFC 3339 timestamp. If None, all orders are returned.
+            return_entries (bool): If True, pages contain order entries instead of orders.
+            prefetch_depth (int): Number of pages fetched ahead of the current one.
+            position (str): Position to resume from. If None, starts at the beginning.
+
+        Yields:
+            tuple: Orders, or order entries if 'return_entries' is set, of one page and the
+                position after the page.
+        """
+        query = {'sort': {'sort_field': 'UPDATED_AT', 'sort_order': 'ASC'}}
+        if updated_since is not None:
+            query['filter'] = {'date_time_filter': {'updated_at': {'start_at': updated_since}}}
+
+        start, cursor = 0, None
+        if position:
+            offset, _, cursor = position.partition(':')
+            start, cursor = int(offset), cursor or None
+
+        for i in range(start, len(location_ids), MAX_SEARCH_LOCATIONS):
+            search = partial(
+                self.client.orders.search,
+                location_ids=location_ids[i:i + MAX_SEARCH_LOCATIONS],
+                limit=page_limit,
+                query=query,
+                return_entries=return_entries
+            )
+            items_field = 'order_entries' if return_entries else 'orders'
+            pager = cursor_pager(
+                search, items_field=items_field, cursor=cursor if i == start else None)
+
+            # Fetch next pages in the background while the current one is stored
+            prefetched = PrefetchPager(pager, depth=prefetch_depth, with_cursors=True)
+            for items, next_cursor in prefetched:
+                if next_cursor is not None:
+                    yield items, f"{i}:{next_cursor}"
+                elif i + MAX_SEARCH_LOCATIONS < len(location_ids):
+                    yield items, f"{i + MAX_SEARCH_LOCATIONS}:"
+                else:
+                    yield items, None
+
+    def get_order_ids(self, location_ids: list | None = None,
+                      updated_since: str | None = None, page_limit: int = 500):
+        """
+        Generates pages of ids of orders updated since a timestamp.
+
+        Uses orders.search with 'return_entries', which is much lighter than returning
+        full orders.
+
+        Params:
+            location_ids (list): Location ids to search. Defaults to get_location_ids().
+            updated_since (str): RFC 3339 timestamp. If None, all order ids are returned.
+            page_limit (int): Limit of ids per page.
+
+        Yields:
+            list: Order ids of one page.
+        """
+        if location_ids is None:
+            location_ids = self.get_location_ids()
+
+        pages = self._search_pages(location_ids, page_limit, updated_since, return_entries=True)
+        for entries, _ in pages:
+            yield [entry.order_id for entry in entries]
+
+    def _batch_retrieve(self, order_ids: list) -> list:
+        """
+        Retrieves full orders by id in batches of 100, the most orders.batch_get accepts.
+
+        Params:
+            order_ids (list): Ids of the orders to retrieve.
+
+        Returns:
+            list: Order objects from API.
+        """
+        orders = []
+        for i in range(0, len(order_ids), MAX_BATCH_RETRIEVE):
+            response = self.client.orders.batch_get(
+                order_ids=order_ids[i:i + MAX_BATCH_RETRIEVE])
+            orders.extend(response.orders or [])
+
+        return orders
+
+    def _paginated_orders(self, page_limit: int = 100, updated_since: str | None = None,
+                          hydrate: bool = False, position: str | None = None):
+        """
+        Generates pages of order records from the API.
+
+        Params:
+            page_limit (int): Limit of records per page.
+            updated_since (str): RFC 3339 timestamp. If None, all orders are returned.
+            hydrate (bool): If True, pages of order ids are searched first and full orders
+                are retrieved with orders.batch_get.
+            position (str): Position to resume from. If None, starts at the beginning.
+
+        Yields:
+            tuple: List of Order objects from API and the position after the page.
+        """
+        pages = self._search_pages(
+            self.get_location_ids(), page_limit, updated_since,
+            return_entries=hydrate, position=position)
+
+        if not hydrate:
+            yield from pages
+            return
+
+        for entries, next_position in pages:
+            yield self._batch_retrieve([entry.order_id for entry in entries]), next_position
+
+    @staticmethod
+    def _map_line_items(order, created_at: datetime, updated_at: datetime) -> list:
+        """
+        Maps the line items of an order to rows of the 'order_line_items' table.
+
+        Args:
+            order (Order): Square order whose line items are mapped.
+            created_at (datetime): Creation timestamp of the order, copied onto every row.
+            updated_at (datetime): Version of the order, copied onto every row.
+
+        Returns:
+            list: Mappings of 'order_line_items' column names to values.
+        """
+        rows = []
+        for line_item in order.line_items or []:
+            row = LINE_ITEM_MAPPER.map(line_item)
+            row['order_id'] = order.id
+            row['created_at'] = created_at
+            row['updated_at'] = updated_at
+            rows.append(row)
+
+        return rows
+
+    @classmethod
+    def map_page(cls, records) -> dict:
+        """
+        Maps Square orders to rows of the 'orders' and 'order_line_items' tables.
+
+        Args:
+            records: Order objects from the API or from a PageArchive.
+
+        Returns:
+            dict: The mapped rows keyed by model.
+        """
+        orders, line_items = [], []
+        for order in records:
+            order_row = ORDER_MAPPER.map(order)
+
+            orders.append(order_row)
+            line_items.extend(cls._map_line_items(order, order_row['created_at'],
+                                                  order_row['updated_at']))
+
+        return {cls.model: orders, OrderLineItem: line_items}
+
+    def extract(self, watermark: SyncWatermark, page_limit: int = 100, hydrate: bool = False):
+        """
+        Generates mapped order rows updated since the watermark.
+
+        The watermark is pushed down to Square as an 'updated_at' filter, and an unfinished
+        run is resumed from its checkpointed position. Only reads from the API, so it can
+        run on a fetcher thread while another thread writes the rows.
+
+        Args:
+            watermark (SyncWatermark): Watermark loaded at the start of the run.
+            page_limit (int): The maximum number of records to retrieve per API request.
+            hydrate (bool): If True, full orders are retrieved in batches by id.
+
+        Yields:
+            SyncPage: Mapped 'orders' and 'order_line_items' rows of one page, keyed by model.
+        """
+        pages = self._paginated_orders(
+            page_limit=page_limit, updated_since=watermark.isoformat(), hydrate=hydrate,
+            position=watermark.cursor)
+
+        for page, position in METRICS.timed(pages, "sync_fetch_seconds", resource=self.resource):
+            if self.archive is not None:
+                self.archive.write(self.resource, page)
+
+            with METRICS.time("sync_map_seconds", resource=self.resource):
+                rows = self.map_page(
+                    self.api_manager.iter_records(records=page, watermark=watermark))
+            yield SyncPage(rows, cursor=position, high_water_mark=latest_update(page))
+
+    def sync_orders(self, page_limit: int = 100, chunk_size: int = UPSERT_CHUNK_SIZE,
+                    hydrate: bool = False) -> None:
+        """
+        Synchronizes order data between the API and the database.
+
+        Args:
+            page_limit (int): The maximum number of records to retrieve per API request.
+            chunk_size (int): The number of records written per bulk upsert.
+            hydrate (bool): If True, full orders are retrieved in batches by id.
+
+        Returns:
+            None
+        """
+        logger.info("Starting order synchronization process...")
+        count_of_records = 0
+
+        with ETLSession() as session_db:
+            # Load sync watermark and checkpoint once for the whole run
+            watermark = self.api_manager.load_watermark(resource=self.resource, session=session_db)
+            checkpointer = SyncCheckpointer(self.resource, watermark, chunk_size=chunk_size)
+            if watermark.cursor:
+                logger.info("Resuming order synchronization from the last checkpoint.")
 
-        response = self.client.orders.search(
-            return_entries=return_entries,
-            limit=page_limit,
-            location_ids=location_ids
-        )
+            try:
+                # Loop through pages of mapped order records
+                for page in self.extract(watermark=watermark, page_limit=page_limit,
+                                         hydrate=hydrate):
+                    # Buffer order data, committed at every checkpoint
+                    checkpointer.write(page, session_db)
+                    count_of_records += len(page[self.model])
+            except Exception:
+                checkpointer.abort(session_db)
+                raise
 
-    def _paginated_orders(self, page_limit: int = 50):
-        pass
+            logger.success(f"Order synchronization process completed. " \
+                            f"Total records processed: {count_of_records}")
 
-    def sync_orders(self):
-        with Session() as session_db:
-            print(self._get_latest_order(session_db))
+            # Write remaining buffered orders and advance the watermark to the latest update
+            checkpointer.complete(session_db)
 
 if __name__ == "__main__":
     orders_sync = OrdersAPI(merchant_id="MLW4W4RYAASNM")
     orders_sync.sync_orders()
-    # Example usage to get order IDs
-    # print(orders_sync.get_order_ids(location_ids=[LOCATION_ID], return_entries=True, page_limit=100))
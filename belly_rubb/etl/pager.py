@@ -0,0 +1,183 @@
+"""
+Module: pager.py
+
+This module provides the PrefetchPager class for overlapping Square API page downloads with
+the processing of already downloaded pages.
+
+Square's SyncPager only requests page N+1 once page N has been fully consumed, so the network
+sits idle while records are stored and the database sits idle while the next page downloads.
+PrefetchPager walks the pager on a background thread and keeps up to 'depth' pages ready.
+
+Functions:
+    cursor_pager(fetch: Callable, items_field: str) -> SyncPager:
+        Wraps a cursor-paginated search endpoint in a SyncPager.
+    page_cursor(page: SyncPager) -> str | None:
+        Returns the cursor of the page after the given one.
+
+Classes:
+    PrefetchPager:
+        - Fetches pages ahead on a background thread into a bounded queue.
+        - Re-raises fetch errors in the consuming thread.
+        - Stops the background thread when iteration ends early.
+        - Optionally yields the cursor of the next page with every page, so a sync can
+            checkpoint its position.
+
+Usage:
+    for items in PrefetchPager(client.payments.list(limit=100), depth=2):
+        store(items)
+"""
+
+from collections.abc import Callable
+import queue
+import threading
+
+from loguru import logger
+from square.core.pagination import SyncPager
+
+from belly_rubb.config import PREFETCH_DEPTH
+
+# Marks the end of the pages
+_END = object()
+
+
+def cursor_pager(fetch: Callable, items_field: str, cursor: str | None = None) -> SyncPager:
+    """
+    Wraps a cursor-paginated endpoint, such as customers.search, in a SyncPager.
+
+    Search endpoints return a single response with a 'cursor' instead of a pager, so this
+    makes them usable with PrefetchPager like the list endpoints.
+
+    Args:
+        fetch (Callable): Calls the endpoint. Receives 'cursor' as a keyword argument
+            for every page after the first.
+        items_field (str): Name of the response field holding the records.
+        cursor (str): Cursor of the page to fetch. None fetches the first page.
+
+    Returns:
+        SyncPager: Pager whose next pages are fetched lazily.
+    """
+    response = fetch(cursor=cursor) if cursor else fetch()
+    next_cursor = getattr(response, "cursor", None)
+
+    return SyncPager(
+        has_next=next_cursor is not None,
+        items=getattr(response, items_field, None) or [],
+        get_next=lambda: cursor_pager(fetch, items_field, next_cursor),
+        response=response,
+    )
+
+
+def page_cursor(page: SyncPager) -> str | None:
+    """
+    Returns the cursor of the page after the given one.
+
+    Args:
+        page (SyncPager): A page of a Square listing or of a cursor_pager().
+
+    Returns:
+        str | None: The cursor, or None on the last page.
+    """
+    if not page.has_next:
+        return None
+
+    return getattr(page.response, "cursor", None) or None
+
+
+class PrefetchPager:
+    """
+    PrefetchPager iterates the items of each page of a Square pager while fetching ahead.
+
+    At most 'depth' pages wait in memory, plus the one being downloaded, so memory stays
+    bounded no matter how many pages the listing has.
+
+    Attributes:
+        pager: The first page of a Square SyncPager.
+        depth (int): Number of pages fetched ahead. 0 fetches pages in lockstep.
+        with_cursors (bool): If True, yields (items, cursor) tuples where 'cursor' resumes
+            the listing after the page.
+
+    Methods:
+        __iter__():
+            Yields the list of items of every page.
+    """
+
+    def __init__(self, pager, depth: int = PREFETCH_DEPTH, with_cursors: bool = False):
+        if depth < 0:
+            raise ValueError("depth must not be negative.")
+
+        self.pager = pager
+        self.depth = depth
+        self.with_cursors = with_cursors
+
+    def _iter_pages(self):
+        """
+        Walks the pager the same way SyncPager.iter_pages() does, yielding only items.
+
+        Yields:
+            list | tuple: Items of one page, with the cursor of the next page if
+                'with_cursors' is set.
+        """
+        page = self.pager
+        while page is not None:
+            yield (page.items or [], page_cursor(page)) if self.with_cursors else page.items or []
+
+            if not page.has_next or page.get_next is None:
+                return
+
+            page = page.get_next()
+            if page is None or not page.items:
+                return
+
+    def _produce(self, pages: queue.Queue, stop: threading.Event) -> None:
+        """
+        Fetches pages into the queue until the pager ends, fails, or iteration stops.
+
+        Args:
+            pages (queue.Queue): Bounded queue shared with the consumer.
+            stop (threading.Event): Set by the consumer when it stops iterating.
+        """
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            for items in self._iter_pages():
+                if not put(items):
+                    return
+        except Exception as e:  # noqa: BLE001  # pylint: disable=broad-except
+            logger.debug(f"Prefetching page failed: {e}")
+            put(e)
+            return
+
+        put(_END)
+
+    def __iter__(self):
+        if self.depth == 0:
+            yield from self._iter_pages()
+            return
+
+        pages = queue.Queue(maxsize=self.depth)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce, args=(pages, stop), name="page-prefetch", daemon=True
+        )
+        producer.start()
+
+        try:
+            while True:
+                item = pages.get()
+
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+
+                yield item
+        finally:
+            stop.set()
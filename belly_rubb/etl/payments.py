@@ -9,44 +9,46 @@ Classes:
         - Provides methods to interact with payment data from the Square API.
         - Handles authentication, API requests, pagination, and database synchronization.
         - Methods:
-            - __init__(merchant_id: str): Initializes the API client and synchronization manager.
+            - __init__(merchant_id: str, client): Initializes the API client and
+                                                            synchronization manager.
             - _paginated_payments(page_limit: int): Retrieves payment records from the API.
-            - _store_payment_info(payment_info: dict): Inserts or updates payment data
-                                                            in the database.
+            - extract(watermark: SyncWatermark, page_limit: int): Generates mapped rows per page.
             - get_most_recent_payment(session) -> datetime: Retrieves the most recent payment
                                                             timestamp from the database.
             - sync_payments(page_limit: int = 50): Synchronizes payment data between the API
                                                             and the database.
 
 Dependencies:
-    - dateutil.parser: For parsing ISO date strings.
+    - belly_rubb.etl.mappers.PAYMENT_MAPPER: Maps Square payments to 'payments' rows.
     - square.Square: Square API client.
     - loguru.logger: Logging utility.
-    - sqlalchemy.dialects.sqlite.insert: For upsert operations in SQLite.
-    - app.db.Session: SQLAlchemy session for database operations.
-    - app.db_models.Customer: SQLAlchemy model for customer records.
-    - belly_rubb.etl.token_provider.TokenProvider: Provides API access tokens.
+    - belly_rubb.etl.checkpoint.SyncCheckpointer: For chunked, resumable upserts in SQLite.
+    - app.db.ETLSession: SQLAlchemy session on the ETL engine for database operations.
+    - app.metrics.METRICS: Records page fetch and mapping times.
+    - app.db_models.Payment: SQLAlchemy model for payment records.
+    - belly_rubb.etl.client_factory.square_client: Builds authenticated Square clients.
     - belly_rubb.etl.api_manager.APIManager: Manages API synchronization and record iteration.
 
 Usage:
     Instantiate PaymentAPI with a merchant ID and call sync_payments() to sync payment data.
 """
-import time
-from datetime import datetime, timezone
-from dateutil import parser
-from loguru import logger
-from square import Square
-from square.core.api_error import ApiError
-
-from sqlalchemy import select, func
-from sqlalchemy.dialects.sqlite import insert
+from datetime import datetime
 
-from app.pkce_flow import iso_to_utc
-from app.db import Session
+from app.db import ETLSession
 from app.db_models import Payment
-from belly_rubb.config import MAX_RETRIES, INITIAL_DELAY, DECAY_BASE
-from belly_rubb.etl.token_provider import TokenProvider
+from app.metrics import METRICS
+from loguru import logger
+from sqlalchemy import func, select
+from square.types.payment import Payment as SquarePayment
+
+from belly_rubb.config import PREFETCH_DEPTH, UPSERT_CHUNK_SIZE
 from belly_rubb.etl.api_manager import APIManager
+from belly_rubb.etl.checkpoint import SyncCheckpointer, SyncPage, latest_update
+from belly_rubb.etl.client_factory import square_client
+from belly_rubb.etl.mappers import PAYMENT_MAPPER
+from belly_rubb.etl.pager import PrefetchPager
+from belly_rubb.etl.watermark import SyncWatermark
+
 
 class PaymentAPI:
     """
@@ -55,129 +57,112 @@ class PaymentAPI:
     Downloaded records are synchronized with a local database.
 
     Attributes:
+        resource (str): Name of the synchronized resource in 'sync_states'.
+        record_type (Payment): Square SDK type of the synchronized records.
+        model (Payment): Model the mapped rows are written to.
         client (Square): Instance of the Square API client for making payment-related API requests.
         api_manager (APIManager): Manages API synchronization state and record iteration.
+        archive (PageArchive | None): Archive the raw records of every page are written to.
 
     Methods:
-        __init__(merchant_id: str):
+        __init__(merchant_id: str, client=None, archive=None):
             Initializes the PaymentAPI with the merchant ID, sets up authentication,
-                and prepares API clients.
+                and prepares API clients. A ready client can be passed instead.
         _paginated_payments(page_limit: int):
             Generates pages of payment records from the API yielding a list of Payments.
-        _store_payment_info(payment_info: dict) -> None:
-            Inserts or updates payment information in the database.
-                Handles conflicts by updating existing records.
+        map_page(records) -> dict:
+            Maps Square records to 'payments' rows keyed by model.
+        extract(watermark: SyncWatermark, page_limit: int = 50):
+            Generates pages of mapped 'payments' rows updated since the watermark.
         get_most_recent_payment(session) -> datetime:
             Retrieves the most recent payment timestamp from the database.
         sync_payments(page_limit: int = 50):
             Synchronizes payment data between the API and database, logging progress and results.
     """
-    def __init__(self, merchant_id: str):
-        # Initialize token provider to get access token
-        token_provider = TokenProvider()
-        token = token_provider.get_access_token(merchant_id=merchant_id)
+    resource = 'payments'
+    record_type = SquarePayment
+    model = Payment
+
+    def __init__(self, merchant_id: str, client=None, archive=None):
+        if client is None:
+            # Square client on the shared connection pool, authenticated with the
+            # merchant's cached access token
+            client = square_client(merchant_id=merchant_id)
 
-        # Initialize Square client to make API requests
-        self.client = Square(token=token)
+        self.client = client
+        self.archive = archive
 
         # Initialize API Manager for handling synchronization
         self.api_manager = APIManager()
 
-    def _paginated_payments(self, page_limit: int = 50):
+    def _paginated_payments(self, page_limit: int = 50, prefetch_depth: int = PREFETCH_DEPTH,
+                            updated_since: str | None = None, cursor: str | None = None):
         """
         Generates pages of payment records from the API.
 
-        Uses exponential delay to delay API requests in case of rate limit error.
+        Square only returns payments updated since 'updated_since', oldest first.
+        Pages after the first are fetched ahead on a background thread.
 
         Params:
             page_limit (int): Limit of records per page
+            prefetch_depth (int): Number of pages fetched ahead of the current one.
+            updated_since (str): RFC 3339 timestamp. If None, all payments are returned.
+            cursor (str): Cursor to resume the listing from. If None, starts at the beginning.
 
         Yields:
-            list: List of Payment objects from API.
+            tuple: List of Payment objects from API and the cursor of the next page.
         """
-        # Set initial values for exponential delay
-        delay = INITIAL_DELAY
-        retries = 1
-        base = DECAY_BASE
-
-        try:
-            api_response = self.client.payments.list(
-                limit=page_limit,
-                sort_field='UPDATED_AT',
-                sort_order='DESC'
-            )
-        except ApiError as e:
-            if e.status_code == 429 and retries <= MAX_RETRIES:
-                logger.warning(f"Rate limit exceeded. Retrying after delay. Attempt {retries}")
-
-                # Retry logic for rate limit errors
-                delay = base ** retries  # Exponential backoff
-                time.sleep(delay)
-
-                retries += 1
-            else:
-                logger.error(f"Error fetching paginated payments: {e}")
-                return
-
-        for page in api_response.iter_pages():
-            yield page
-
-    def _store_payment_info(self, payment_info: dict, session) -> None:
-        """
-        Inserts or updates payment information in the database.
+        # Every page request is rate limited and retried by the shared request scheduler
+        api_response = self.client.payments.list(
+            limit=page_limit,
+            sort_field='UPDATED_AT',
+            sort_order='ASC',
+            updated_at_begin_time=updated_since,
+            cursor=cursor
+        )
+
+        # Fetch next pages in the background while the current one is stored
+        yield from PrefetchPager(api_response, depth=prefetch_depth, with_cursors=True)
 
-        If a payment with the given 'id' already exists, their record is updated
-        with the new information. Otherwise, a new payment record is created.
+    @classmethod
+    def map_page(cls, records) -> dict:
+        """
+        Maps Square payment records to rows of the 'payments' table.
 
         Args:
-            payment_info (dict): A dictionary containing customer details. Expected keys:
-                - 'id' (str): Unique identifier for the payment.
-                - 'created_at' (str): Timestamp when the payment was created.
-                - 'updated_at' (str): Timestamp when the payment was last updated.
-                - 'status' (str): Current status of the payment.
-                - 'amount' (float): Amount of the payment.
-                - 'total_money' (float): Total money involved in the payment.
-                - 'approved_money' (float): Amount of money approved for the payment.
-                - 'currency' (str): Currency code for the payment.
-                - 'card_brand' (str): Brand of the card used for the payment.
-                - 'location_id' (str): Identifier for the location where the payment was made.
-                - 'order_id' (str): Foreign key referencing the associated order.
-                - 'square_product' (str): Product identifier from Square.
-            session: Database session to use for the operation.
+            records: Payment objects from the API or from a PageArchive.
 
         Returns:
-            None
+            dict: The mapped rows keyed by model.
         """
-        amount_money = payment_info.get('amount_money', {})
-        total_money = payment_info.get('total_money', {})
-        card_details = payment_info.get('card_details', {})
-        card = card_details.get('card', {})
-        approved_money = payment_info.get('approved_money', {})
-
-        # Attempt to insert Payment into table
-        stmt = insert(Payment).values(
-            id=payment_info.get('id'),
-            created_at=parser.isoparse(payment_info.get('created_at')),
-            updated_at=parser.isoparse(payment_info.get('updated_at')),
-            status=card_details.get('status'),
-            amount=amount_money.get('amount'),
-            total_money=total_money.get('total_money'),
-            approved_money=approved_money.get('approved_money'),
-            currency=amount_money.get('currency'),
-            card_brand=card.get('card_brand'),
-            location_id=payment_info.get('location_id'),
-            order_id=payment_info.get('order_id'),
-            square_product=payment_info.get('square_product')
-        )
+        return {cls.model: [PAYMENT_MAPPER.map(payment) for payment in records]}
+
+    def extract(self, watermark: SyncWatermark, page_limit: int = 50):
+        """
+        Generates mapped payment rows updated since the watermark.
 
-        # Create dictionary mapping updated values to current entry in db
-        update_dict = {}
-        for col in Payment.__table__.columns:
-            if col.name not in ['id', 'created_at']:
-                update_dict[col.name] = stmt.excluded[col.name]
+        The watermark is pushed down to Square as 'updated_at_begin_time', and an
+        unfinished run is resumed from its checkpointed cursor. Only reads from the API, so
+        it can run on a fetcher thread while another thread writes the rows.
 
-        # Execute statement and update if conflict occurs
-        session.execute(stmt.on_conflict_do_update(index_elements=['id'], set_=update_dict))
+        Args:
+            watermark (SyncWatermark): Watermark loaded at the start of the run.
+            page_limit (int): The maximum number of records to retrieve per API request.
+
+        Yields:
+            SyncPage: Mapped 'payments' rows of one page, keyed by model.
+        """
+        pages = self._paginated_payments(
+            page_limit=page_limit, updated_since=watermark.isoformat(), cursor=watermark.cursor)
+
+        for page, cursor in METRICS.timed(pages, "sync_fetch_seconds", resource=self.resource):
+            if self.archive is not None:
+                self.archive.write(self.resource, page)
+
+            with METRICS.time("sync_map_seconds", resource=self.resource):
+                rows = self.map_page(
+                    self.api_manager.iter_records(records=page, watermark=watermark))
+            yield SyncPage(rows, cursor=cursor, high_water_mark=latest_update(page))
 
     def get_most_recent_payment(self, session) -> datetime:
         """
@@ -195,44 +180,44 @@ class PaymentAPI:
 
         return result
 
-    def sync_payments(self, page_limit: int = 50):
+    def sync_payments(self, page_limit: int = 50, chunk_size: int = UPSERT_CHUNK_SIZE):
         """
         Synchronizes payment data between the API and the database.
 
         Args:
             page_limit (int): The maximum number of records to retrieve per API request.
+            chunk_size (int): The number of records written per bulk upsert.
 
         Returns:    
             None
         """
         logger.info("Starting payment synchronization process...")
         count_of_records = 0
-        last_synced = iso_to_utc(datetime.now(timezone.utc))
-
-        with Session() as session_db:
-            # Loop through payment records.
-            for page in self._paginated_payments(page_limit=page_limit):
-                # Loop through records on page
-                for payment in self.api_manager.iter_records(
-                    records=page, resource='payments', sorted_by_updated=True):
-                    # Store payment data
-                    self._store_payment_info(payment.dict(), session=session_db)
 
-                    count_of_records += 1
+        with ETLSession() as session_db:
+            # Load sync watermark and checkpoint once for the whole run
+            watermark = self.api_manager.load_watermark(resource=self.resource, session=session_db)
+            checkpointer = SyncCheckpointer(self.resource, watermark, chunk_size=chunk_size)
+            if watermark.cursor:
+                logger.info("Resuming payment synchronization from the last checkpoint.")
+
+            try:
+                # Loop through pages of mapped payment records
+                for page in self.extract(watermark=watermark, page_limit=page_limit):
+                    # Buffer payment data, committed at every checkpoint
+                    checkpointer.write(page, session_db)
+                    count_of_records += len(page[self.model])
+            except Exception:
+                checkpointer.abort(session_db)
+                raise
 
             logger.success(f"Payment synchronization process completed. " \
                             f"Total records processed: {count_of_records}")
-            last_synced = iso_to_utc(datetime.now(timezone.utc))
 
-            # Upsert sync state
-            self.api_manager.upsert_sync_state(
-                resource='payments',
-                last_synced=last_synced,
-                session=session_db
-            )
-            session_db.commit()
+            # Write remaining buffered payments and advance the watermark to the latest update
+            checkpointer.complete(session_db)
 
 if __name__ == "__main__":
     payment_sync = PaymentAPI(merchant_id="MLW4W4RYAASNM")
     payment_sync.sync_payments()
-    print(payment_sync.get_most_recent_payment(session=Session()))
+    print(payment_sync.get_most_recent_payment(session=ETLSession()))
@@ -2,7 +2,7 @@
 This class provides functionality for retrieving, validating, refreshing, and updating
 OAuth access tokens in the database. It interacts with an OAuth API client and the
 database to ensure that merchants have valid access tokens for authentication.
-from the database. 
+from the database.
 
     Raises InvalidTokenException if no valid token is found.
     Checks whether the provided access token has expired. Raises InvalidTokenException
@@ -14,25 +14,193 @@ from the database.
     InvalidTokenException if the token is None, invalid, or cannot be refreshed.
     Retrieves a valid access token for the specified merchant, refreshing it if
         necessary. Returns the access token string.
+
+Tokens are kept in a process-wide TokenCache keyed by merchant. The cache refreshes each
+token in the background shortly before it expires, and a per-merchant lock ensures only
+one refresh request runs at a time, so sync workers read tokens without touching the
+database.
 """
+
+from collections.abc import Callable
 from datetime import datetime, timezone
+import threading
+
+from app.config import POST_TOKEN_URL, SQUARE_APPLICATION_ID
+from app.db import Session
+from app.db_models import AccessToken
+from app.exceptions import InvalidTokenException
+from app.http_client import get_http_client
 from dateutil import parser
-import requests
-from sqlalchemy import select, update
 from loguru import logger
+from sqlalchemy import select, update
+
+from belly_rubb.config import TOKEN_EXPIRY_SKEW, TOKEN_REFRESH_MARGIN, TOKEN_REFRESH_RETRY
+
+
+class TokenCache:
+    """
+    TokenCache keeps access tokens in memory until shortly before they expire.
+
+    Reading a token is a dictionary lookup for as long as it has not expired. After every
+    load a background timer reloads the token once it enters the refresh margin, so callers
+    only load a token themselves when it is missing or expired. Loading happens under a
+    per-merchant lock, so concurrent callers wait for a single load instead of each
+    querying the database and refreshing over HTTP.
+
+    Attributes:
+        margin (timedelta): How long before expiry a token is refreshed in the background.
+        retry (timedelta): Delay before retrying a failed background refresh.
+        skew (timedelta): How long before expiry a cached token stops being served.
+
+    Methods:
+        get(merchant_id: str, load: Callable) -> str:
+            Returns the cached token, loading it if missing or expired.
+        refresh(merchant_id: str, load: Callable, force: bool = False) -> str:
+            Loads the token for a merchant under its single-flight lock.
+        clear():
+            Drops every cached token and cancels pending background refreshes.
+    """
+
+    def __init__(
+        self, margin=TOKEN_REFRESH_MARGIN, retry=TOKEN_REFRESH_RETRY, skew=TOKEN_EXPIRY_SKEW
+    ):
+        self.margin = margin
+        self.retry = retry
+        self.skew = skew
+
+        # merchant_id -> (access_token, expires_at)
+        self._tokens = {}
+        self._locks = {}
+        self._timers = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, merchant_id: str) -> threading.Lock:
+        """
+        Returns the single-flight lock of a merchant, creating it on first use.
+        """
+        with self._guard:
+            return self._locks.setdefault(merchant_id, threading.Lock())
+
+    def _valid(self, entry: tuple | None) -> bool:
+        """
+        Checks whether a cached entry holds a token that can still be served.
+        """
+        return entry is not None and datetime.now(timezone.utc) < entry[1] - self.skew
+
+    def _refresh_at(self, expires_at: datetime) -> datetime:
+        """
+        Computes when a token should next be reloaded.
+
+        A token that is already inside the refresh margin, because it could not be
+        refreshed, is retried periodically until it expires.
+        """
+        now = datetime.now(timezone.utc)
+        refresh_at = expires_at - self.margin
+
+        if refresh_at <= now:
+            refresh_at = min(expires_at, now + self.retry)
+
+        return refresh_at
+
+    def _schedule(self, merchant_id: str, delay: float, load: Callable) -> None:
+        """
+        Schedules a background refresh of a merchant's token, replacing any pending one.
+        """
+        timer = threading.Timer(max(delay, 0), self._background_refresh, args=(merchant_id, load))
+        timer.daemon = True
+
+        with self._guard:
+            previous = self._timers.pop(merchant_id, None)
+            if previous is not None:
+                previous.cancel()
+            self._timers[merchant_id] = timer
+
+        timer.start()
+
+    def _background_refresh(self, merchant_id: str, load: Callable) -> None:
+        """
+        Refreshes a token from the background timer, retrying later on failure.
+        """
+        try:
+            self.refresh(merchant_id, load, force=True)
+        except Exception as e:  # noqa: BLE001  # pylint: disable=broad-exception-caught
+            logger.error(f"Background token refresh for merchant {merchant_id} failed: {e}")
+            self._schedule(merchant_id, self.retry.total_seconds(), load)
+
+    def get(self, merchant_id: str, load: Callable) -> str:
+        """
+        Returns the cached access token of a merchant, loading it if missing or expired.
+
+        Tokens inside the refresh margin are still served; the background timer replaces
+        them before they expire.
+
+        Args:
+            merchant_id (str): The unique identifier of the merchant.
+            load (Callable): Called with the merchant id to load a token, returning a
+                tuple of (access_token, expires_at).
+
+        Returns:
+            str: The access token.
+        """
+        entry = self._tokens.get(merchant_id)
+
+        if self._valid(entry):
+            return entry[0]
+
+        return self.refresh(merchant_id, load)
+
+    def refresh(self, merchant_id: str, load: Callable, force: bool = False) -> str:
+        """
+        Loads the access token of a merchant under its single-flight lock.
+
+        Callers that wait on the lock reuse the token loaded by the caller holding it.
+
+        Args:
+            merchant_id (str): The unique identifier of the merchant.
+            load (Callable): Called with the merchant id to load a token, returning a
+                tuple of (access_token, expires_at).
+            force (bool): Reload even if the cached token has not expired.
+
+        Returns:
+            str: The access token.
+        """
+        with self._lock(merchant_id):
+            entry = self._tokens.get(merchant_id)
+
+            if not force and self._valid(entry):
+                return entry[0]
+
+            access_token, expires_at = load(merchant_id)
+            self._tokens[merchant_id] = (access_token, expires_at)
+
+        refresh_at = self._refresh_at(expires_at)
+        delay = (refresh_at - datetime.now(timezone.utc)).total_seconds()
+        self._schedule(merchant_id, delay, load)
+
+        return access_token
+
+    def clear(self) -> None:
+        """
+        Drops every cached token and cancels pending background refreshes.
+        """
+        with self._guard:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            self._tokens.clear()
+
+
+# Process-wide cache shared by every TokenProvider
+TOKEN_CACHE = TokenCache()
 
-from app.exceptions import InvalidTokenException
-from app.db_models import AccessToken
-from app.db import Session
-from app.config import POST_TOKEN_URL, SQUARE_APPLICATION_ID
 
 class TokenProvider:
     """
     TokenProvider is responsible for managing OAuth access tokens for merchants.
-    
+
     Functionality includes access token retrieval, validation, refreshing,
     and updating tokens in the database.
-        
+
     Methods:
         _pull_token(merchant_id: str, session) -> AccessToken:
             Retrieves the most recently created access token for the specified merchant
@@ -41,13 +209,20 @@ class TokenProvider:
             Checks whether the provided access token has expired.
         _can_refresh(token: AccessToken) -> bool:
             Checks whether the provided access token can be refreshed using its refresh token.
-        _update_token(token_info: dict, merchant_id: str) -> AccessToken:
+        _update_token(token_info: dict, merchant_id: str, session) -> AccessToken:
             Updates the access token in the database with new token information.
-        _refresh_token(token: AccessToken, merchant_id: str) -> AccessToken:
+        _refresh_token(token: AccessToken, merchant_id: str, session) -> AccessToken:
             Refreshes the access token using the refresh token if possible.
+        _load_token(merchant_id: str) -> tuple:
+            Reads a merchant's token from the database, refreshing it if it is about to
+            expire.
         get_access_token(merchant_id: str) -> str:
-            Retrieves a valid access token for the specified merchant, refreshing it if necessary.
+            Retrieves a valid access token for the specified merchant from the token cache.
     """
+
+    def __init__(self, cache: TokenCache | None = None):
+        self.cache = cache or TOKEN_CACHE
+
     def _pull_token(self, merchant_id: str, session) -> AccessToken:
         """
         Retrieves the most recently created access token for the specified merchant.
@@ -91,7 +266,7 @@ class TokenProvider:
         if not token:
             raise InvalidTokenException("No valid token found.")
 
-        return parser.isoparse(token.expires_at) <= datetime.now(timezone.utc)
+        return token.expires_at <= datetime.now(timezone.utc)
 
     def _can_refresh(self, token: AccessToken) -> bool:
         """
@@ -109,9 +284,9 @@ class TokenProvider:
         if not token:
             raise InvalidTokenException("No valid token found.")
 
-        return parser.isoparse(token.refresh_token_expires_at) > datetime.now(timezone.utc)
+        return token.refresh_token_expires_at > datetime.now(timezone.utc)
 
-    def _update_token(self, token_info: dict, merchant_id: str, session) -> None:
+    def _update_token(self, token_info: dict, merchant_id: str, session) -> AccessToken:
         """
         Updates the access token in the database.
 
@@ -134,12 +309,15 @@ class TokenProvider:
                 refresh_token=token_info.get("refresh_token"),
                 short_lived=token_info.get("short_lived", False),
                 refresh_token_expires_at=parser.isoparse(
-                    token_info.get("refresh_token_expires_at"))
+                    token_info.get("refresh_token_expires_at")
+                ),
             )
         )
 
         session.execute(stmt)
 
+        return self._pull_token(merchant_id, session)
+
     def _refresh_token(self, token: AccessToken, merchant_id: str, session) -> AccessToken:
         """
         Refreshes the access token using the refresh token.
@@ -149,6 +327,9 @@ class TokenProvider:
             merchant_id (str): The unique identifier of the merchant.
             session: The database session to use for the refresh request.
 
+        Returns:
+            AccessToken: The refreshed access token.
+
         Raises:
             InvalidTokenException: If the token is None or invalid.
         """
@@ -159,49 +340,67 @@ class TokenProvider:
         # Check if can use refresh token
         if self._can_refresh(token):
             logger.info("Refreshing access token using refresh token.")
-            print(token.refresh_token)
             # Make API request to refresh token
-            response = requests.post(
+            response = get_http_client().post(
                 POST_TOKEN_URL,
-                headers={
-                    'Content-Type': 'application/json'
-                },
+                headers={"Content-Type": "application/json"},
                 json={
-                   'client_id': SQUARE_APPLICATION_ID,
-                   'refresh_token': token.refresh_token,
-                   'grant_type': 'refresh_token'
+                    "client_id": SQUARE_APPLICATION_ID,
+                    "refresh_token": token.refresh_token,
+                    "grant_type": "refresh_token",
                 },
-                timeout=30
             )
-            print(response.json())
+            if not response.is_success:
+                logger.error(f"Access token refresh failed with status {response.status_code}.")
+                raise InvalidTokenException("Failed to refresh access token.")
+
             return self._update_token(response.json(), merchant_id, session)
 
         logger.error("Failed to refresh access token, please re-authenticate with /auth.")
         raise InvalidTokenException("Failed to refresh access token.")
 
-    def get_access_token(self, merchant_id: str) -> str:
+    def _load_token(self, merchant_id: str) -> tuple:
         """
-        Retrieves the access token for the current user.
+        Reads the access token of a merchant from the database.
+
+        Tokens within the refresh margin of their expiry are refreshed. A token that
+        cannot be refreshed is still returned until it actually expires.
 
         Args:
             merchant_id (str): The unique identifier of the merchant.
 
         Returns:
-            str: The access token for the current user.
+            tuple: The access token and its expiry as a timezone-aware datetime.
+
+        Raises:
+            InvalidTokenException: If no token exists or it expired and cannot be refreshed.
         """
-        with Session() as session:
-            with session.begin():
-                # Get the most recent access token for the merchant
-                token = self._pull_token(merchant_id, session)
+        with Session() as session, session.begin():
+            # Get the most recent access token for the merchant
+            token = self._pull_token(merchant_id, session)
+
+            if token.expires_at - self.cache.margin <= datetime.now(timezone.utc):
+                if self._is_expired(token) or self._can_refresh(token):
+                    token = self._refresh_token(token, merchant_id, session)
+                else:
+                    logger.warning(
+                        "Access token expires soon and cannot be refreshed, "
+                        "please re-authenticate with /auth."
+                    )
 
-                # Check if token is expired
-                if self._is_expired(token):
-                    # Try to refresh token
-                    self._refresh_token(token, merchant_id, session)
+            return token.access_token, token.expires_at
+
+    def get_access_token(self, merchant_id: str) -> str:
+        """
+        Retrieves the access token for the current user.
 
-                    # Get new token
-                    token = self._pull_token(merchant_id, session)
+        The token is served from the token cache, which only reads the database when the
+        token is missing or due for a refresh.
 
-                access_token = token.access_token
+        Args:
+            merchant_id (str): The unique identifier of the merchant.
 
-            return access_token
+        Returns:
+            str: The access token for the current user.
+        """
+        return self.cache.get(merchant_id, self._load_token)
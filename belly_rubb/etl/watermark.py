@@ -0,0 +1,154 @@
+"""
+Module: watermark.py
+
+This module provides the SyncWatermark class, an in-memory snapshot of a resource's
+synchronization state that is loaded once per sync run. It includes the checkpoint of an
+unfinished run, so the next run resumes where that one stopped.
+
+The watermark is the latest 'updated_at' stored by the previous run, not the time that run
+finished, so records updated while a sync is running are picked up by the next one. Each run
+re-reads an overlap window before the watermark to absorb records Square indexes late; upserts
+are idempotent, so re-reading them is harmless.
+
+Classes:
+    SyncWatermark:
+        - Loads the 'sync_states' row for a resource a single time.
+        - Compares record timestamps against the loaded watermark without touching the database.
+        - Methods:
+            - load(resource: str, session) -> SyncWatermark: Builds a watermark from the database.
+            - since() -> datetime | None: The watermark minus the overlap window.
+            - is_recent(record_date: datetime) -> bool: Checks a record against the watermark.
+            - isoformat() -> str | None: Formats since() for server-side API filters.
+
+Usage:
+    Load a watermark at the start of a sync run and pass it to APIManager.iter_records().
+"""
+
+from datetime import datetime, timedelta
+
+from app.db_models import SyncState
+from app.pkce_flow import iso_to_utc
+from sqlalchemy import select
+
+from belly_rubb.config import SYNC_OVERLAP_WINDOW
+
+
+class SyncWatermark:
+    """
+    SyncWatermark holds the last synchronization timestamp for a resource.
+
+    The watermark is read from the database once and then reused for every record in the
+    run, so filtering a record costs a datetime comparison instead of a query.
+
+    Attributes:
+        resource (str): Name of the resource the watermark belongs to.
+        last_synced (datetime | None): Latest 'updated_at' stored by the last completed sync,
+            or None if the resource has never been synchronized.
+        overlap (timedelta): How far before 'last_synced' each run starts reading.
+        cursor (str | None): Position to resume an unfinished sync from.
+        high_water_mark (datetime | None): Latest 'updated_at' stored by the unfinished sync.
+
+    Methods:
+        load(resource: str, session) -> SyncWatermark:
+            Reads the sync state for a resource.
+        since() -> datetime | None:
+            Returns the timestamp the run reads from.
+        is_recent(record_date: datetime) -> bool:
+            Checks if a record was updated after the watermark.
+        isoformat() -> str | None:
+            Formats since() as an RFC 3339 UTC timestamp.
+    """
+
+    def __init__(
+        self,
+        resource: str,
+        last_synced: datetime | None = None,
+        cursor: str | None = None,
+        high_water_mark: datetime | None = None,
+        overlap: timedelta = timedelta(0),
+    ):
+        self.resource = resource
+        self.last_synced = last_synced
+        self.overlap = overlap
+        self.cursor = cursor
+        self.high_water_mark = high_water_mark
+
+    @classmethod
+    def load(
+        cls, resource: str, session, overlap: timedelta = SYNC_OVERLAP_WINDOW
+    ) -> "SyncWatermark":
+        """
+        Loads the synchronization state of a resource from the database.
+
+        Args:
+            resource (str): The resource to load the watermark for.
+            session: Database session to use for the query.
+            overlap (timedelta): How far before the watermark the run starts reading.
+
+        Returns:
+            SyncWatermark: The watermark for the resource. Its 'last_synced' is None
+                if no sync state exists yet.
+        """
+        stmt = select(SyncState).where(SyncState.resource == resource)
+        state = session.execute(stmt).scalar_one_or_none()
+
+        if state is None:
+            return cls(resource, overlap=overlap)
+
+        return cls(
+            resource,
+            last_synced=state.last_synced,
+            cursor=state.cursor,
+            high_water_mark=state.high_water_mark,
+            overlap=overlap,
+        )
+
+    def since(self) -> datetime | None:
+        """
+        Returns the timestamp the run reads from, the watermark minus the overlap window.
+
+        Returns:
+            datetime | None: The start of the run, or None if no watermark exists.
+        """
+        if self.last_synced is None:
+            return None
+
+        return self.last_synced - self.overlap
+
+    def is_recent(self, record_date: datetime) -> bool:
+        """
+        Determines if a record's timestamp falls within the run, at or after since().
+
+        Records at the watermark itself count as recent, because another record may share
+        the timestamp of the last one stored.
+
+        Args:
+            record_date (datetime): The timestamp of the record.
+
+        Returns:
+            bool: True if the record is not older than since() or no watermark exists,
+                False otherwise.
+        """
+        # If resource was never synced assume record is recent
+        if self.last_synced is None:
+            return True
+
+        return record_date >= self.last_synced - self.overlap
+
+    def isoformat(self) -> str | None:
+        """
+        Formats since() as an RFC 3339 UTC timestamp for API filters.
+
+        Returns:
+            str | None: The formatted timestamp, or None if no watermark exists.
+        """
+        if self.last_synced is None:
+            return None
+
+        return iso_to_utc(self.since())
+
+    def __repr__(self):
+        return (
+            f"<SyncWatermark(resource={self.resource}, last_synced={self.last_synced}, "
+            f"cursor={self.cursor})>"
+        )
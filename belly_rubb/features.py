@@ -1,28 +1,310 @@
+"""
+Standardizes the menu item names and variations of order line items.
+
+Item names changed spelling and wording across menu versions, and some exports carry the
+variation in the name, e.g. 'BEEF BACK RIBS (FULL RACK)'. 'references/item_synonyms.json'
+lists the aliases and variation aliases of every menu item. It is compiled into lowercase
+alias -> base name and variation alias -> base variation maps, cached in memory and on disk by
+'belly_rubb.utils.load_compiled_config'.
+
+Line items repeat a few hundred distinct names and variations, so only the unique
+(name, variation) pairs are standardized, with vectorized string operations on the unique
+values. Every row then picks up its pair's result through integer codes, which takes
+milliseconds even for millions of rows, instead of a 'DataFrame.apply(axis=1)' call per row.
+
+A pair is standardized the way notebook 1.01 does it:
+
+    - a name that is a known alias maps to its base name and its variation through the
+      variation map,
+    - otherwise text in parentheses is read as the variation and removed from the name, e.g.
+      'wings (6 pcs)' becomes 'chicken wings' and '6 pcs'. When the name is an alias and
+      variation alias of the same menu item, the variation is resolved within that item,
+    - names and variations without a match are kept lowercased.
+
+Classes:
+    SynonymIndex:
+        - Compiled alias, variation and parenthesized name maps of the synonyms.
+    ItemStandardizer:
+        - Standardizes item names and variations with a SynonymIndex.
+        - Methods:
+            - standardize_values(names, variations) -> pd.DataFrame: Standardizes pairs.
+            - unique_pairs(df) -> tuple: Unique pairs of a frame and the pair of every row.
+            - standardize(df) -> pd.DataFrame: Adds standardized name and variation columns.
+
+Functions:
+    compile_synonyms(synonyms: dict) -> SynonymIndex:
+        Compiles the contents of 'item_synonyms.json'.
+    load_synonym_index(path: Path, cache_dir: Path) -> SynonymIndex:
+        Loads the compiled synonyms through the memory and disk caches.
+
+Usage:
+    standardizer = ItemStandardizer.from_file()
+    orders = standardizer.standardize(orders)
+"""
+
 from pathlib import Path
+from typing import NamedTuple
 
 from loguru import logger
-from tqdm import tqdm
+import numpy as np
+import pandas as pd
 import typer
 
-from belly_rubb.config import PROCESSED_DATA_DIR
+from belly_rubb.config import ITEM_SYNONYMS, ORDERS_PARQUET_DIR, PROCESSED_DATA_DIR
+from belly_rubb.utils import load_compiled_config
 
 app = typer.Typer()
 
+# Text between the first '(' and the following ')' of a name
+PARENTHESES = r"\((.*?)\)"
+
+
+class SynonymIndex(NamedTuple):
+    """
+    SynonymIndex holds the compiled reverse maps of 'item_synonyms.json'.
+
+    Attributes:
+        alias_to_base (dict): Lowercase item alias to the key of its menu item.
+        variation_map (dict): Lowercase variation alias to its base variation.
+        parenthesized (dict): Lowercase 'alias (variation alias)' names to the key of their
+            menu item and base variation, resolving the variation within its own item.
+    """
+
+    alias_to_base: dict
+    variation_map: dict
+    parenthesized: dict
+
+
+def compile_synonyms(synonyms: dict) -> SynonymIndex:
+    """
+    Compiles menu items into alias, variation and parenthesized name reverse maps.
+
+    Args:
+        synonyms (dict): Contents of 'item_synonyms.json', menu items by name, each with a
+            list of 'aliases' and its 'variations' as base variation -> list of aliases.
+
+    Returns:
+        SynonymIndex: The compiled maps.
+    """
+    alias_to_base = {}
+    variation_map = {}
+    parenthesized = {}
+
+    for base_name, item in synonyms.items():
+        for alias in item["aliases"]:
+            alias_to_base[alias.lower()] = base_name
+
+        for base_variation, aliases in item["variations"].items():
+            for alias in aliases:
+                variation_map[alias.lower()] = base_variation
+
+                for item_alias in item["aliases"]:
+                    name = f"{item_alias} ({alias})".lower()
+                    parenthesized[name] = (base_name, base_variation)
+
+    return SynonymIndex(alias_to_base, variation_map, parenthesized)
+
+
+def _decode_synonyms(compiled: list) -> SynonymIndex:
+    """
+    Rebuilds a SynonymIndex from its cached JSON form.
+    """
+    alias_to_base, variation_map, parenthesized = compiled
+
+    return SynonymIndex(
+        alias_to_base, variation_map, {name: tuple(match) for name, match in parenthesized.items()}
+    )
+
+
+def load_synonym_index(path: Path = ITEM_SYNONYMS, cache_dir: Path | None = None) -> SynonymIndex:
+    """
+    Loads the compiled synonyms, compiling them only when the file changed.
+
+    The index is shared by all callers of the process: treat it as read-only.
+
+    Args:
+        path (Path): Path to the JSON synonyms file.
+        cache_dir (Path | None): Directory of the compiled JSON cache. Defaults to the
+            interim data directory.
+
+    Returns:
+        SynonymIndex: The compiled synonyms.
+    """
+    return load_compiled_config(path, compile_synonyms, _decode_synonyms, cache_dir)
+
+
+def _factorize(values: pd.Series) -> tuple:
+    """
+    Encodes values as integer codes, missing values included as the last unique value.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy(dtype=np.int64)
+        uniques = values.cat.categories.astype(object).to_numpy()
+    else:
+        codes, uniques = pd.factorize(values)
+        codes = codes.astype(np.int64)
+        uniques = np.asarray(uniques, dtype=object)
+
+    if (codes < 0).any():
+        codes[codes < 0] = len(uniques)
+    uniques = np.append(uniques, None)
+
+    return codes, uniques
+
+
+class ItemStandardizer:
+    """
+    ItemStandardizer maps item names and variations to their base names and variations.
+
+    Attributes:
+        index (SynonymIndex): The compiled synonyms.
+
+    Methods:
+        from_file(path: Path = ITEM_SYNONYMS) -> ItemStandardizer:
+            Creates a standardizer from a synonyms file.
+        standardize_values(names: pd.Series, variations: pd.Series) -> pd.DataFrame:
+            Standardizes aligned names and variations with vectorized string operations.
+        unique_pairs(df: pd.DataFrame, name_column: str, variation_column: str) -> tuple:
+            Returns the unique (name, variation) pairs of a frame and the pair of every row.
+        standardize(df: pd.DataFrame, name_column: str, variation_column: str) -> pd.DataFrame:
+            Adds categorical 'std_name' and 'std_variation' columns to a frame.
+    """
+
+    def __init__(self, index: SynonymIndex):
+        self.index = index
+
+    @classmethod
+    def from_file(cls, path: Path = ITEM_SYNONYMS) -> "ItemStandardizer":
+        """
+        Creates a standardizer from a synonyms file, through the compiled index cache.
+
+        Args:
+            path (Path): Path to the JSON synonyms file.
+
+        Returns:
+            ItemStandardizer: The standardizer.
+        """
+        return cls(load_synonym_index(path))
+
+    def standardize_values(self, names: pd.Series, variations: pd.Series) -> pd.DataFrame:
+        """
+        Standardizes aligned names and variations with vectorized string operations.
+
+        Meant for unique values: its cost grows with the number of values passed.
+
+        Args:
+            names (pd.Series): Item names.
+            variations (pd.Series): Item variations, aligned with the names.
+
+        Returns:
+            pd.DataFrame: 'std_name' and 'std_variation' columns, indexed like the names.
+                Missing names and variations stay missing.
+        """
+        alias_to_base, variation_map = self.index.alias_to_base, self.index.variation_map
+
+        names = names.astype(object).str.lower()
+        variations = pd.Series(variations.to_numpy(dtype=object), index=names.index).str.lower()
+
+        known = names.isin(alias_to_base.keys())
+        parenthesized = names.str.extract(PARENTHESES, expand=False)
+        split = ~known & parenthesized.fillna("").ne("")
+
+        base_names = names.where(
+            ~split, names.str.replace(PARENTHESES, "", regex=True).str.strip()
+        )
+        std_names = base_names.map(alias_to_base).fillna(base_names)
+
+        std_variations = variations.map(variation_map).fillna(variations)
+        named_variations = parenthesized.map(variation_map)
+        std_variations = std_variations.where(
+            ~(split & named_variations.notna()), named_variations
+        )
+
+        # Known 'alias (variation)' names resolve the variation within their own menu item
+        listed = names[split].map(self.index.parenthesized).dropna()
+        std_names.loc[listed.index] = [name for name, _ in listed]
+        std_variations.loc[listed.index] = [variation for _, variation in listed]
+
+        return pd.DataFrame({"std_name": std_names, "std_variation": std_variations})
+
+    def unique_pairs(
+        self,
+        df: pd.DataFrame,
+        name_column: str = "Item Name",
+        variation_column: str = "Item Variation",
+    ) -> tuple:
+        """
+        Finds the unique (name, variation) pairs of a frame through integer codes.
+
+        Args:
+            df (pd.DataFrame): Frame holding the names and variations.
+            name_column (str): Column of the item names.
+            variation_column (str): Column of the item variations.
+
+        Returns:
+            tuple: A frame of the unique pairs, with the name and variation columns, and an
+                array giving the position of every row's pair in it.
+        """
+        name_codes, name_uniques = _factorize(df[name_column])
+        variation_codes, variation_uniques = _factorize(df[variation_column])
+
+        pair_codes, pair_uniques = pd.factorize(
+            name_codes * len(variation_uniques) + variation_codes
+        )
+        pairs = pd.DataFrame(
+            {
+                name_column: name_uniques[pair_uniques // len(variation_uniques)],
+                variation_column: variation_uniques[pair_uniques % len(variation_uniques)],
+            }
+        )
+
+        return pairs, pair_codes
+
+    def standardize(
+        self,
+        df: pd.DataFrame,
+        name_column: str = "Item Name",
+        variation_column: str = "Item Variation",
+    ) -> pd.DataFrame:
+        """
+        Adds the standardized name and variation of every row to a frame.
+
+        Args:
+            df (pd.DataFrame): Frame holding the names and variations.
+            name_column (str): Column of the item names.
+            variation_column (str): Column of the item variations.
+
+        Returns:
+            pd.DataFrame: A copy of the frame with categorical 'std_name' and
+                'std_variation' columns.
+        """
+        pairs, pair_codes = self.unique_pairs(df, name_column, variation_column)
+        standardized = self.standardize_values(pairs[name_column], pairs[variation_column])
+
+        columns = {}
+        for column in ("std_name", "std_variation"):
+            codes, categories = pd.factorize(standardized[column])
+            columns[column] = pd.Categorical.from_codes(codes[pair_codes], categories=categories)
+
+        logger.debug(f"Standardized {len(df):,} rows through {len(pairs):,} unique pairs.")
+
+        return df.assign(**columns)
+
 
 @app.command()
 def main(
-    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
-    input_path: Path = PROCESSED_DATA_DIR / "dataset.csv",
-    output_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    # -----------------------------------------
+    input_path: Path = ORDERS_PARQUET_DIR,
+    output_path: Path = PROCESSED_DATA_DIR / "orders_standardized.parquet",
+    synonyms_path: Path = ITEM_SYNONYMS,
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Generating features from dataset...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Features generation complete.")
-    # -----------------------------------------
+    logger.info(f"Standardizing item names of {input_path}...")
+    orders = pd.read_parquet(input_path).dropna(subset=["Item Name"])
+
+    orders = ItemStandardizer.from_file(synonyms_path).standardize(orders)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    orders.to_parquet(output_path, index=False)
+    logger.success(f"Standardized {len(orders):,} line items into {output_path}.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,256 @@
+"""
+Quality report of the item standardization, used to maintain 'item_synonyms.json'.
+
+Every distinct (raw, standardized) name and variation pair is scored with rapidfuzz's
+'token_set_ratio', like the notebook's 'name_is_fuzzy_match' and 'variation_is_fuzzy_match',
+and flagged when the score is at most the threshold. Low scores are either a menu rename
+or a wrong alias. Names that match no menu item get the nearest canonical names as
+suggestions for a new alias.
+
+Only unique pairs are scored, in one batched call on all cores, and scores are cached on
+disk across runs, so a run only scores the pairs new exports introduced.
+
+Classes:
+    ScoreCache:
+        - Scores of string pairs, persisted to a JSON file.
+        - Methods:
+            - scores(raw: list, standardized: list) -> np.ndarray: Cached or computed scores.
+            - save() -> None: Writes the cache.
+
+Functions:
+    suggest_canonical(names: list, index: SynonymIndex, limit: int) -> list:
+        Nearest canonical menu item names for each name.
+    match_report(df: pd.DataFrame, standardizer: ItemStandardizer, cache: ScoreCache,
+                 threshold: float) -> pd.DataFrame:
+        Scores the standardized pairs of line items.
+
+Usage:
+    python -m belly_rubb.item_qa --output-path reports/item_standardization_qa.csv
+"""
+
+import json
+import os
+from pathlib import Path
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+import typer
+
+from belly_rubb.config import (
+    FUZZY_MATCH_THRESHOLD,
+    ITEM_MATCH_CACHE,
+    ITEM_SYNONYMS,
+    ORDERS_PARQUET_DIR,
+    REPORTS_DIR,
+)
+from belly_rubb.features import ItemStandardizer, SynonymIndex
+
+app = typer.Typer()
+
+
+class ScoreCache:
+    """
+    ScoreCache holds fuzzy match scores of string pairs across runs.
+
+    The cache is tied to the scorer: a file written with another scorer is ignored.
+
+    Attributes:
+        path (Path): JSON file holding the scores.
+        scorer (Callable): rapidfuzz scorer of the pairs.
+
+    Methods:
+        scores(raw: list, standardized: list) -> np.ndarray:
+            Scores aligned pairs, computing only those missing from the cache.
+        save() -> None:
+            Writes the cache if new scores were computed.
+    """
+
+    def __init__(self, path: Path = ITEM_MATCH_CACHE, scorer=fuzz.token_set_ratio):
+        self.path = Path(path)
+        self.scorer = scorer
+        self._scores = {}
+        self._dirty = False
+
+        if self.path.exists():
+            cached = json.loads(self.path.read_text())
+            if cached.get("scorer") == scorer.__name__:
+                self._scores = {(a, b): score for a, b, score in cached["scores"]}
+
+    def __len__(self):
+        return len(self._scores)
+
+    def scores(self, raw: list, standardized: list) -> np.ndarray:
+        """
+        Scores aligned pairs of strings, computing the missing ones in one batch.
+
+        Args:
+            raw (list): Left strings of the pairs.
+            standardized (list): Right strings of the pairs.
+
+        Returns:
+            np.ndarray: Score of every pair, from 0 to 100.
+        """
+        pairs = list(zip(raw, standardized))
+        missing = list(dict.fromkeys(pair for pair in pairs if pair not in self._scores))
+
+        if missing:
+            left, right = zip(*missing)
+            computed = process.cpdist(left, right, scorer=self.scorer, workers=-1)
+            self._scores.update(zip(missing, computed.tolist()))
+            self._dirty = True
+            logger.debug(f"Scored {len(missing):,} new pairs.")
+
+        return np.array([self._scores[pair] for pair in pairs], dtype=float)
+
+    def save(self) -> None:
+        """
+        Writes the cache, through a temporary file, if new scores were computed.
+        """
+        if not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "scorer": self.scorer.__name__,
+                    "scores": [[a, b, score] for (a, b), score in self._scores.items()],
+                }
+            )
+        )
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+def suggest_canonical(names: list, index: SynonymIndex, limit: int = 3) -> list:
+    """
+    Finds the menu items nearest to each name, comparing against their names and aliases.
+
+    Args:
+        names (list): Lowercase names matching no menu item.
+        index (SynonymIndex): The compiled synonyms.
+        limit (int): Suggestions per name.
+
+    Returns:
+        list: For every name, a list of (menu item, score) tuples, best first.
+    """
+    if not names:
+        return []
+
+    choices = {base: base for base in index.alias_to_base.values()}
+    choices.update(index.alias_to_base)
+    bases = pd.Index(list(choices.values()))
+
+    scores = process.cdist(names, list(choices), scorer=fuzz.token_set_ratio, workers=-1)
+    # Best score of every menu item over its name and aliases
+    best = pd.DataFrame(scores.T, index=bases).groupby(level=0).max()
+
+    suggestions = []
+    for column in best.columns:
+        top = best[column].nlargest(limit)
+        suggestions.append([(base, round(float(score), 1)) for base, score in top.items()])
+
+    return suggestions
+
+
+def _pair_table(raw: pd.Series, standardized: pd.Series, counts: np.ndarray) -> pd.DataFrame:
+    """
+    Sums line items per unique lowercase (raw, standardized) pair.
+    """
+    table = pd.DataFrame(
+        {
+            "raw": raw.astype(object).str.lower(),
+            "standardized": standardized.astype(object),
+            "line_items": counts,
+        }
+    )
+
+    return (
+        table.dropna(subset=["raw", "standardized"])
+        .groupby(["raw", "standardized"], as_index=False, sort=False)["line_items"]
+        .sum()
+    )
+
+
+def match_report(
+    df: pd.DataFrame,
+    standardizer: ItemStandardizer,
+    cache: ScoreCache,
+    threshold: float = FUZZY_MATCH_THRESHOLD,
+) -> pd.DataFrame:
+    """
+    Scores the distinct standardized names and variations of line items.
+
+    Args:
+        df (pd.DataFrame): Line items with 'Item Name' and 'Item Variation' columns.
+        standardizer (ItemStandardizer): Standardizer under review.
+        cache (ScoreCache): Scores of previous runs, updated with the new pairs.
+        threshold (float): Scores above it are fuzzy matches.
+
+    Returns:
+        pd.DataFrame: One row per distinct pair with its 'kind' (name or variation), 'raw'
+            and 'standardized' values, number of 'line_items', 'score', 'fuzzy_match',
+            whether the result is 'in_synonyms' and, for names matching no menu item,
+            'suggestions'. Sorted by kind, then with unmatched and frequent pairs first.
+    """
+    pairs, pair_codes = standardizer.unique_pairs(df)
+    standardized = standardizer.standardize_values(pairs["Item Name"], pairs["Item Variation"])
+    counts = np.bincount(pair_codes, minlength=len(pairs))
+
+    index = standardizer.index
+    tables = []
+    for kind, raw, column, canonical in (
+        ("name", pairs["Item Name"], "std_name", set(index.alias_to_base.values())),
+        ("variation", pairs["Item Variation"], "std_variation", set(index.variation_map.values())),
+    ):
+        table = _pair_table(raw, standardized[column], counts)
+        table.insert(0, "kind", kind)
+        table["in_synonyms"] = table["standardized"].isin(canonical)
+        tables.append(table)
+
+    report = pd.concat(tables, ignore_index=True)
+    report["score"] = cache.scores(report["raw"].tolist(), report["standardized"].tolist())
+    report["fuzzy_match"] = report["score"] > threshold
+
+    unmatched = (report["kind"] == "name") & ~report["in_synonyms"]
+    suggestions = suggest_canonical(report.loc[unmatched, "raw"].tolist(), standardizer.index)
+    report["suggestions"] = None
+    report.loc[unmatched, "suggestions"] = [
+        "; ".join(f"{base} ({score:g})" for base, score in suggestion)
+        for suggestion in suggestions
+    ]
+
+    return report.sort_values(
+        ["kind", "in_synonyms", "fuzzy_match", "line_items"],
+        ascending=[True, True, True, False],
+        ignore_index=True,
+    )
+
+
+@app.command()
+def main(
+    input_path: Path = ORDERS_PARQUET_DIR,
+    output_path: Path = REPORTS_DIR / "item_standardization_qa.csv",
+    synonyms_path: Path = ITEM_SYNONYMS,
+    cache_path: Path = ITEM_MATCH_CACHE,
+    threshold: float = FUZZY_MATCH_THRESHOLD,
+):
+    logger.info(f"Reviewing item standardization of {input_path}...")
+    orders = pd.read_parquet(input_path, columns=["Item Name", "Item Variation"])
+
+    cache = ScoreCache(cache_path)
+    report = match_report(orders, ItemStandardizer.from_file(synonyms_path), cache, threshold)
+    cache.save()
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    report.to_csv(output_path, index=False)
+
+    flagged = report[~report["in_synonyms"] | ~report["fuzzy_match"]]
+    logger.success(f"Wrote {len(report):,} pairs to {output_path}, {len(flagged):,} to review.")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,211 @@
+"""
+Analytical queries over the synchronized Square data.
+
+Item popularity is answered in SQL from the 'order_line_items' table and its indexes instead
+of a pandas pass over the raw order CSV exports. Every query here is served by the indexes
+declared on 'app.db_models'; 'tests/test_query_plans.py' fails if one falls back to a scan.
+
+Functions:
+    item_counts(session, start: datetime, end: datetime) -> list:
+        Number of line items per item name, most popular first.
+    item_variation_counts(session, start: datetime, end: datetime) -> list:
+        Number of line items per item name and variation, most popular first.
+    customer_payments(session, customer_id: str) -> list:
+        Payments for the orders of a customer, newest first.
+    location_sales(session, location_id: str, start: datetime, end: datetime) -> list:
+        Number and total of payments per currency at a location.
+    group_customers(session, group_id: str) -> list:
+        Customers belonging to a group.
+    customer_groups(session, customer_id: str) -> list:
+        Groups a customer belongs to.
+"""
+
+import csv
+from datetime import datetime
+from pathlib import Path
+
+from app.db import Session
+from app.db_models import Customer, Group, GroupMembership, Order, OrderLineItem, Payment
+from loguru import logger
+from sqlalchemy import desc, func, select
+import typer
+
+from belly_rubb.config import REPORTS_DIR
+
+app = typer.Typer()
+
+
+def _item_counts_query(columns: list, start: datetime | None, end: datetime | None):
+    """
+    Builds a count of line items grouped by the given columns within an order date range.
+    """
+    count = func.count().label("count")
+    stmt = select(*columns, count).group_by(*columns).order_by(desc(count))
+
+    if start is not None:
+        stmt = stmt.where(OrderLineItem.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(OrderLineItem.created_at < end)
+
+    return stmt
+
+
+def item_counts(session, start: datetime | None = None, end: datetime | None = None) -> list:
+    """
+    Counts line items per item name, most popular first.
+
+    Args:
+        session: Database session to use for the query.
+        start (datetime): Only count orders created at or after this timestamp.
+        end (datetime): Only count orders created before this timestamp.
+
+    Returns:
+        list: Rows of (name, count).
+    """
+    stmt = _item_counts_query([OrderLineItem.name], start, end)
+
+    return session.execute(stmt).all()
+
+
+def item_variation_counts(
+    session, start: datetime | None = None, end: datetime | None = None
+) -> list:
+    """
+    Counts line items per item name and variation, most popular first.
+
+    Args:
+        session: Database session to use for the query.
+        start (datetime): Only count orders created at or after this timestamp.
+        end (datetime): Only count orders created before this timestamp.
+
+    Returns:
+        list: Rows of (name, variation_name, count).
+    """
+    stmt = _item_counts_query([OrderLineItem.name, OrderLineItem.variation_name], start, end)
+
+    return session.execute(stmt).all()
+
+
+def customer_payments(session, customer_id: str) -> list:
+    """
+    Lists the payments for the orders of a customer, newest first.
+
+    Args:
+        session: Database session to use for the query.
+        customer_id (str): The customer whose payments are listed.
+
+    Returns:
+        list: Payment objects.
+    """
+    stmt = (
+        select(Payment)
+        .join(Order, Payment.order_id == Order.id)
+        .where(Order.customer_id == customer_id)
+        .order_by(desc(Payment.created_at))
+    )
+
+    return session.execute(stmt).scalars().all()
+
+
+def location_sales(
+    session, location_id: str, start: datetime | None = None, end: datetime | None = None
+) -> list:
+    """
+    Counts and totals the payments at a location per currency.
+
+    Args:
+        session: Database session to use for the query.
+        location_id (str): The location whose payments are totalled.
+        start (datetime): Only count payments created at or after this timestamp.
+        end (datetime): Only count payments created before this timestamp.
+
+    Returns:
+        list: Rows of (currency, count, total_money).
+    """
+    stmt = (
+        select(
+            Payment.currency,
+            func.count().label("count"),
+            func.sum(Payment.total_money).label("total_money"),
+        )
+        .where(Payment.location_id == location_id)
+        .group_by(Payment.currency)
+    )
+
+    if start is not None:
+        stmt = stmt.where(Payment.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Payment.created_at < end)
+
+    return session.execute(stmt).all()
+
+
+def group_customers(session, group_id: str) -> list:
+    """
+    Lists the customers belonging to a group.
+
+    Args:
+        session: Database session to use for the query.
+        group_id (str): The group whose customers are listed.
+
+    Returns:
+        list: Customer objects.
+    """
+    stmt = (
+        select(Customer)
+        .join(GroupMembership, GroupMembership.customer_id == Customer.id)
+        .where(GroupMembership.group_id == group_id)
+    )
+
+    return session.execute(stmt).scalars().all()
+
+
+def customer_groups(session, customer_id: str) -> list:
+    """
+    Lists the groups a customer belongs to.
+
+    Args:
+        session: Database session to use for the query.
+        customer_id (str): The customer whose groups are listed.
+
+    Returns:
+        list: Group objects.
+    """
+    stmt = (
+        select(Group)
+        .join(GroupMembership, GroupMembership.group_id == Group.id)
+        .where(GroupMembership.customer_id == customer_id)
+    )
+
+    return session.execute(stmt).scalars().all()
+
+
+@app.command()
+def main(
+    output_dir: Path = REPORTS_DIR,
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    logger.info("Counting item popularity...")
+
+    # Synced names are not standardized, so the curated 'item_*counts.csv' are left alone
+    with Session() as session:
+        reports = {
+            "synced_item_counts.csv": (["Item Name", "count"], item_counts(session, start, end)),
+            "synced_item_variation_counts.csv": (
+                ["Item Name", "Item Variation", "count"],
+                item_variation_counts(session, start, end),
+            ),
+        }
+
+    for file_name, (header, rows) in reports.items():
+        with open(output_dir / file_name, mode="w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    logger.success(f"Item popularity reports saved to {output_dir}.")
+
+
+if __name__ == "__main__":
+    app()
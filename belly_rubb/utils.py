@@ -1,5 +1,38 @@
+"""
+Shared helpers for loading reference files.
+
+Reference files that are compiled before use, such as 'item_synonyms.json', are compiled once
+and cached twice: in memory per process, checked against the file's mtime and size on every
+call, and as JSON on disk, named after the SHA-256 of the file's content and of the compiling
+function's code and constants. A new process reuses the compiled form as long as neither
+changed, and later calls return it for the cost of a 'stat'. The disk cache is plain JSON, so a file planted in
+the cache directory can at worst give wrong maps, never run code.
+
+Functions:
+    load_config_file(file_path: Path) -> dict:
+        Loads a JSON configuration file.
+    load_compiled_config(path: Path, compiler: Callable, decode: Callable, cache_dir: Path):
+        Loads a JSON configuration file compiled by 'compiler' through the memory and disk
+        caches.
+"""
+
+from collections.abc import Callable
+import hashlib
 import json
+import os
 from pathlib import Path
+import threading
+from types import CodeType
+
+from loguru import logger
+
+from belly_rubb.config import INTERIM_DATA_DIR
+
+# Compiled configurations by file path and compiling function, with the file stamp they
+# were compiled from
+_COMPILED = {}
+_COMPILED_LOCK = threading.Lock()
+
 
 def load_config_file(file_path: Path):
     """
@@ -16,7 +49,139 @@ def load_config_file(file_path: Path):
         json.JSONDecodeError: If the file is not valid JSON.
     """
 
-    with open(file_path, mode='r', encoding='utf-8') as f:
+    with open(file_path, mode="r", encoding="utf-8") as f:
         config_file = json.load(f)
 
     return config_file
+
+
+def _stamp(path: Path) -> tuple:
+    """
+    Identifies a version of a file by its modification time and size.
+    """
+    stat = os.stat(path)
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cache_prefix(path: Path, compiler: Callable) -> str:
+    """
+    Names the disk caches of a file compiled by a function, for every version of both.
+    """
+    return f"{path.stem}.{compiler.__name__}"
+
+
+def _hash_code(digest, code: CodeType) -> None:
+    """
+    Adds a function's bytecode, the names it uses and its constants to a digest.
+
+    Bytecode only refers to constants and names by position, so editing a literal or a
+    called function leaves it unchanged. Nested functions and comprehensions are code
+    constants and are hashed the same way, since their repr holds a memory address.
+    """
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            _hash_code(digest, const)
+        elif isinstance(const, frozenset):
+            # Set literals iterate in hash order, which changes between processes
+            digest.update(repr(sorted(map(repr, const))).encode())
+        else:
+            digest.update(repr(const).encode())
+
+
+def _cache_file(path: Path, compiler: Callable, cache_dir: Path, content: bytes) -> Path:
+    """
+    Names the disk cache of a file's content compiled by a version of a function.
+    """
+    digest = hashlib.sha256(content)
+    _hash_code(digest, compiler.__code__)
+
+    return cache_dir / f"{_cache_prefix(path, compiler)}.{digest.hexdigest()[:16]}.json"
+
+
+def _write_compiled(cache_file: Path, prefix: str, compiled) -> None:
+    """
+    Writes a compiled form through a temporary file and removes the outdated ones.
+
+    A read-only cache directory is only logged.
+    """
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(compiled), encoding="utf-8")
+        os.replace(tmp, cache_file)
+
+        for outdated in cache_file.parent.glob(f"{prefix}.*.json"):
+            if outdated != cache_file:
+                outdated.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Could not cache {cache_file.name}: {e}")
+
+
+def _load_compiled(path: Path, compiler: Callable, decode: Callable, cache_dir: Path):
+    """
+    Loads the compiled form of a file from disk if it was cached, else compiles it.
+    """
+    content = path.read_bytes()
+    cache_file = _cache_file(path, compiler, cache_dir, content)
+
+    try:
+        return decode(json.loads(cache_file.read_text(encoding="utf-8")))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable compiled cache {cache_file}: {e}")
+
+    compiled = compiler(json.loads(content))
+    logger.debug(f"Compiled {path} with {compiler.__name__}")
+    _write_compiled(cache_file, _cache_prefix(path, compiler), compiled)
+
+    return compiled
+
+
+def load_compiled_config(
+    path: Path, compiler: Callable, decode: Callable, cache_dir: Path | None = None
+):
+    """
+    Loads a JSON configuration file compiled by a function, compiling it only when needed.
+
+    The compiled form is shared by all callers of the process: treat it as read-only.
+
+    Args:
+        path (Path): Path to the JSON configuration file.
+        compiler (Callable): Compiles the file's contents. Its result is cached on disk as
+            JSON, so it must consist of JSON types, tuples and named tuples.
+        decode (Callable): Rebuilds the compiled form from its JSON, turning lists back into
+            tuples where needed.
+        cache_dir (Path | None): Directory of the disk cache. Defaults to the interim data
+            directory.
+
+    Returns:
+        The compiled configuration.
+
+    Raises:
+        FileNotFoundError: If the configuration file does not exist.
+        json.JSONDecodeError: If the configuration file is not valid JSON.
+    """
+    path = Path(path)
+    stamp = _stamp(path)
+    key = (path, compiler)
+
+    cached = _COMPILED.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with _COMPILED_LOCK:
+        cached = _COMPILED.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        compiled = _load_compiled(
+            path, compiler, decode, Path(cache_dir) if cache_dir is not None else INTERIM_DATA_DIR
+        )
+        _COMPILED[key] = (stamp, compiled)
+
+    return compiled
@@ -0,0 +1,38 @@
+"""
+Benchmarks for the ETL hot paths.
+
+Importing this package points DB_PATH at a throwaway SQLite file, or at BENCH_DB_PATH when it
+is set, so benchmarks never write to the application database. Run a benchmark from the
+repository root, e.g. `python -m benchmarks.bench_watermark`.
+"""
+from datetime import datetime, timedelta, timezone
+import os
+import tempfile
+
+os.environ["DB_PATH"] = os.getenv(
+    "BENCH_DB_PATH", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+)
+
+
+def payment_rows(records: int) -> list:
+    """
+    Generates mapped 'payments' rows.
+    """
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        dict(
+            id=f"PAYMENT{i:09d}",
+            created_at=(start + timedelta(minutes=i)).isoformat(),
+            updated_at=(start + timedelta(minutes=i, seconds=30)).isoformat(),
+            status="CAPTURED",
+            amount=1250.0,
+            total_money=1250.0,
+            approved_money=1250.0,
+            currency="USD",
+            card_brand="VISA",
+            location_id="LOCATION",
+            order_id=f"ORDER{i:09d}",
+            square_product="SQUARE_POS"
+        )
+        for i in range(records)
+    ]
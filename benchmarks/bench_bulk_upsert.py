@@ -0,0 +1,71 @@
+"""
+Benchmark for writing payment rows to SQLite.
+
+Compares the previous per-row path, which built and executed one INSERT ... ON CONFLICT
+statement per record, with BulkUpserter writing chunks through one compiled statement.
+
+Usage:
+    python -m benchmarks.bench_bulk_upsert --records 20000 --chunk-size 500
+"""
+import time
+
+from loguru import logger
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+import typer
+
+from app.db import ETLSession, init_db
+from app.db_models import Payment
+from belly_rubb.etl.bulk_upsert import BulkUpserter
+from benchmarks import payment_rows
+
+app = typer.Typer()
+
+
+def _per_row(rows: list, session, chunk_size: int) -> None:
+    """
+    Writes rows the way _store_payment_info did: one statement per record.
+    """
+    for row in rows:
+        stmt = insert(Payment).values(**row)
+
+        update_dict = {}
+        for col in Payment.__table__.columns:
+            if col.name not in ['id', 'created_at']:
+                update_dict[col.name] = stmt.excluded[col.name]
+
+        session.execute(stmt.on_conflict_do_update(index_elements=['id'], set_=update_dict))
+
+
+def _bulk(rows: list, session, chunk_size: int) -> None:
+    """
+    Writes rows in chunks with BulkUpserter.
+    """
+    upserter = BulkUpserter(Payment, chunk_size=chunk_size)
+    upserter.extend(rows, session)
+    upserter.flush(session)
+
+
+@app.command()
+def main(records: int = 20_000, chunk_size: int = 500):
+    init_db()
+    rows = payment_rows(records)
+
+    for name, strategy in (("per-row", _per_row), ("bulk", _bulk)):
+        with ETLSession() as session:
+            session.execute(delete(Payment))
+            session.commit()
+
+            # Insert pass followed by an update pass over the same ids
+            start = time.perf_counter()
+            for _ in range(2):
+                strategy(rows, session, chunk_size)
+                session.commit()
+            elapsed = time.perf_counter() - start
+
+        logger.info(f"{name:>8}: {elapsed:8.3f}s for {2 * records} upserts, "
+                    f"{2 * records / elapsed:10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,266 @@
+"""
+End-to-end benchmark of the sync entry points.
+
+Runs 'sync_payments', 'sync_customers' and 'sync_orders' against a FakeSquareClient holding
+generated records, each case in a fresh process with its own database. Every case reports:
+
+    - records/s over the whole sync, from the first API call to the last commit,
+    - the peak RSS of the process and how much the sync added on top of its input,
+    - the time spent in SQLite executing writes and committing them.
+
+Generated SDK records take several KiB each, so cases are synchronized in incremental runs
+over batches of at most '--batch-size' newer records. This keeps 1M record cases under 1 GiB.
+By default cases of 1k and 10k records run, in well under a minute; larger cases are opt-in
+with '--records' or '--large', which adds 100k and 1M record cases.
+
+Results can be saved as baselines, together with the machine they were recorded on: OS,
+architecture, CPU model and count, and Python version. Later runs on a matching machine fail
+when a case is slower, or uses more memory, than its baseline by more than the tolerance, so
+regressions in the ETL hot path show up in CI. On another machine the comparison is only
+logged, since its timings say nothing about the code.
+
+Usage:
+    python -m benchmarks.bench_etl
+    python -m benchmarks.bench_etl --large
+    python -m benchmarks.bench_etl --save-baseline
+    python -m benchmarks.bench_etl --records 1000 --records 100000 --tolerance 0.3
+"""
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import platform
+import resource
+import sys
+import time
+from typing import List
+
+from loguru import logger
+from sqlalchemy import event
+import typer
+
+from app.db import ETLSession, etl_engine, init_db
+from belly_rubb.etl import CustomerAPI, OrdersAPI, PaymentAPI
+from tests.fakes.fake_square import FakeSquareClient, generate_customers, generate_orders, \
+    generate_payments
+
+app = typer.Typer()
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "bench_etl.json"
+
+# Resource name mapped to its record generator, API class and sync entry point
+CASES = {
+    "payments": (generate_payments, PaymentAPI, "sync_payments"),
+    "customers": (generate_customers, CustomerAPI, "sync_customers"),
+    "orders": (generate_orders, OrdersAPI, "sync_orders"),
+}
+
+# Baseline metrics checked for regressions, and whether larger values are better
+CHECKED_METRICS = {"records_per_sec": True, "peak_rss_mb": False}
+
+# Records per case of the default and the '--large' runs
+DEFAULT_RECORDS = [1_000, 10_000]
+LARGE_RECORDS = [100_000, 1_000_000]
+
+
+def machine_info() -> dict:
+    """
+    Describes the machine results are recorded on, to tell whether baselines apply to it.
+    """
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            cpu = next((line.split(":", 1)[1].strip() for line in f
+                        if line.startswith("model name")), cpu)
+    except OSError:
+        pass
+
+    return dict(
+        system=platform.system(),
+        machine=platform.machine(),
+        cpu=cpu,
+        cpu_count=os.cpu_count(),
+        python=".".join(platform.python_version_tuple()[:2]),
+    )
+
+
+def _peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of this process in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Reported in bytes on macOS and in KiB elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _time_sqlite_writes() -> dict:
+    """
+    Accumulates the time the ETL engine spends executing writes and committing them.
+    """
+    timings = {"seconds": 0.0}
+    started = {}
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            started[id(cursor)] = time.perf_counter()
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        start = started.pop(id(cursor), None)
+        if start is not None:
+            timings["seconds"] += time.perf_counter() - start
+
+    def before_commit(conn):
+        started["commit"] = time.perf_counter()
+
+    def after_commit(session):
+        start = started.pop("commit", None)
+        if start is not None:
+            timings["seconds"] += time.perf_counter() - start
+
+    event.listen(etl_engine, "before_cursor_execute", before_execute)
+    event.listen(etl_engine, "after_cursor_execute", after_execute)
+    event.listen(etl_engine, "commit", before_commit)
+    event.listen(ETLSession, "after_commit", after_commit)
+
+    return timings
+
+
+def run_case(name: str, records: int, page_limit: int, batch_size: int) -> dict:
+    """
+    Synchronizes generated records of a resource into an empty database.
+
+    Runs in its own process, so the peak RSS and database belong to this case alone.
+    Generated SDK records take several KiB each, so cases larger than 'batch_size' are
+    synchronized as consecutive incremental runs over batches of newer records. Only the
+    syncs are timed, not generating their input.
+
+    Args:
+        name (str): Resource to synchronize.
+        records (int): Number of generated records.
+        page_limit (int): Records per fake API page.
+        batch_size (int): Most records held by the fake client at once.
+
+    Returns:
+        dict: Metrics of the run.
+    """
+    generate, api_class, entry_point = CASES[name]
+
+    init_db()
+    sqlite = _time_sqlite_writes()
+    elapsed, input_rss = 0.0, 0.0
+
+    for first in range(0, records, batch_size):
+        batch = generate(min(batch_size, records - first), first=first)
+        client = FakeSquareClient(**{name: batch})
+        api = api_class(merchant_id="BENCH", client=client)
+        input_rss = max(input_rss, _peak_rss_mb())
+
+        start = time.perf_counter()
+        getattr(api, entry_point)(page_limit=page_limit)
+        elapsed += time.perf_counter() - start
+
+        del batch, client, api
+
+    peak_rss = _peak_rss_mb()
+
+    return dict(
+        seconds=round(elapsed, 3),
+        records_per_sec=round(records / elapsed),
+        peak_rss_mb=round(peak_rss, 1),
+        sync_rss_mb=round(peak_rss - input_rss, 1),
+        sqlite_seconds=round(sqlite["seconds"], 3),
+    )
+
+
+def regressions(results: dict, baselines: dict, tolerance: float) -> list:
+    """
+    Compares results with their baselines.
+
+    Args:
+        results (dict): Metrics per case, keyed like 'payments-1000'.
+        baselines (dict): Baseline metrics per case. Cases without one are skipped.
+        tolerance (float): Allowed relative change, e.g. 0.25 for 25%.
+
+    Returns:
+        list: A description of every regression.
+    """
+    found = []
+    for case, metrics in results.items():
+        baseline = baselines.get(case)
+        if baseline is None:
+            continue
+
+        for metric, higher_is_better in CHECKED_METRICS.items():
+            expected, actual = baseline[metric], metrics[metric]
+            limit = expected * (1 - tolerance if higher_is_better else 1 + tolerance)
+
+            if (actual < limit) if higher_is_better else (actual > limit):
+                found.append(f"{case} {metric}: {actual:,} against a baseline of {expected:,}")
+
+    return found
+
+
+@app.command()
+def main(
+    records: List[int] = typer.Option(DEFAULT_RECORDS, help="Records per case."),
+    large: bool = typer.Option(False, help="Also run the 100k and 1M record cases."),
+    resources: List[str] = typer.Option(list(CASES), "--resource", help="Resources to sync."),
+    page_limit: int = 100,
+    batch_size: int = 100_000,
+    baseline: Path = BASELINE_PATH,
+    save_baseline: bool = False,
+    tolerance: float = 0.25,
+):
+    results = {}
+    spawn = multiprocessing.get_context("spawn")
+    if large:
+        records = sorted(set(records) | set(LARGE_RECORDS))
+
+    for count in records:
+        for name in resources:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                metrics = executor.submit(run_case, name, count, page_limit, batch_size).result()
+
+            results[f"{name}-{count}"] = metrics
+            logger.info(f"{name:>9} {count:>9,}: {metrics['seconds']:8.2f}s, "
+                        f"{metrics['records_per_sec']:>9,} records/s, "
+                        f"peak RSS {metrics['peak_rss_mb']:7.1f} MiB "
+                        f"(+{metrics['sync_rss_mb']:.1f} syncing), "
+                        f"SQLite writes {metrics['sqlite_seconds']:.2f}s")
+
+    machine = machine_info()
+    saved = json.loads(baseline.read_text()) if baseline.exists() else {}
+    same_machine = saved.get("machine") == machine
+    baselines = saved.get("cases", {})
+
+    if save_baseline:
+        # Baselines of another machine are replaced, not mixed with these results
+        cases = {**baselines, **results} if same_machine else results
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_text(json.dumps(dict(machine=machine, cases=cases), indent=2,
+                                       sort_keys=True) + "\n")
+        logger.success(f"Saved {len(results)} baselines to {baseline}.")
+        return
+
+    found = regressions(results, baselines, tolerance)
+
+    if not same_machine:
+        logger.warning(f"Baselines were recorded on {saved.get('machine')}, not on {machine}. "
+                       "Differences are informational only.")
+        for regression in found:
+            logger.info(f"Beyond baseline: {regression}")
+        return
+
+    for regression in found:
+        logger.error(f"Regression: {regression}")
+
+    if found:
+        raise typer.Exit(code=1)
+
+    logger.success(f"No regressions beyond {tolerance:.0%} against {baseline}.")
+
+
+if __name__ == "__main__":
+    app()
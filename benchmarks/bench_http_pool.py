@@ -0,0 +1,84 @@
+"""
+Benchmark for connection reuse across Square SDK clients.
+
+Starts a local HTTP/1.1 stand-in for the Square API that counts new connections and delays
+each one to simulate the TCP/TLS handshake. The same number of requests is then sent once
+with a new Square client per request and once with clients from the shared factory.
+
+The stand-in never throttles, so the request scheduler's rate limit is lifted unless
+SQUARE_RATE_LIMIT is set explicitly.
+
+Usage:
+    python -m benchmarks.bench_http_pool --requests 200 --handshake 0.01
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
+
+os.environ.setdefault("SQUARE_RATE_LIMIT", "100000")
+os.environ.setdefault("SQUARE_RATE_BURST", "100000")
+
+from loguru import logger  # noqa: E402
+from square import Square  # noqa: E402
+import typer  # noqa: E402
+
+from belly_rubb.etl.client_factory import square_client  # noqa: E402
+
+app = typer.Typer()
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers every GET with an empty location list over keep-alive connections.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    handshake = 0.0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+        time.sleep(self.handshake)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        body = b'{"locations": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+@app.command()
+def main(requests: int = 200, handshake: float = 0.01):
+    _StandInHandler.handshake = handshake
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    clients = (
+        ("client per request", lambda: Square(token="TOKEN", base_url=base_url)),
+        ("shared pool", lambda: square_client(token="TOKEN", base_url=base_url)),
+    )
+
+    try:
+        for name, make_client in clients:
+            _StandInHandler.connections = 0
+            start = time.perf_counter()
+            for _ in range(requests):
+                make_client().locations.list()
+            elapsed = time.perf_counter() - start
+
+            logger.info(f"{name:>18}: {elapsed:8.3f}s for {requests} requests, "
+                        f"{_StandInHandler.connections} connections opened")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    app()
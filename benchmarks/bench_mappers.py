@@ -0,0 +1,110 @@
+"""
+Benchmark for mapping Square SDK records to table rows.
+
+Compares the previous path, which dumped every record with pydantic's '.dict()' and read it
+back with '.get()' chains and dateutil, with the compiled mappers from
+'belly_rubb.etl.mappers' reading the SDK attributes directly.
+
+Usage:
+    python -m benchmarks.bench_mappers --records 5000
+"""
+import time
+
+from dateutil import parser
+from loguru import logger
+import typer
+
+from tests.fakes.fake_square import generate_customers, generate_orders, generate_payments
+from belly_rubb.etl.mappers import CUSTOMER_MAPPER, ORDER_MAPPER, PAYMENT_MAPPER
+
+app = typer.Typer()
+
+
+def _dict_payment(payment) -> dict:
+    """
+    Maps a payment the way _map_payment_info did.
+    """
+    payment_info = payment.dict()
+    amount_money = payment_info.get('amount_money', {})
+    total_money = payment_info.get('total_money', {})
+    card_details = payment_info.get('card_details', {})
+    card = card_details.get('card', {})
+    approved_money = payment_info.get('approved_money', {})
+
+    return dict(
+        id=payment_info.get('id'),
+        created_at=parser.isoparse(payment_info.get('created_at')),
+        updated_at=parser.isoparse(payment_info.get('updated_at')),
+        status=card_details.get('status'),
+        amount=amount_money.get('amount'),
+        total_money=total_money.get('amount'),
+        approved_money=approved_money.get('amount'),
+        currency=amount_money.get('currency'),
+        card_brand=card.get('card_brand'),
+        location_id=payment_info.get('location_id'),
+        order_id=payment_info.get('order_id'),
+        square_product=payment_info.get('square_product')
+    )
+
+
+def _dict_customer(customer) -> dict:
+    """
+    Maps a customer the way _map_customer_info did.
+    """
+    customer_info = customer.dict()
+    address = customer_info.get('address', {})
+
+    return dict(
+        id=customer_info.get('id'),
+        created_at=parser.isoparse(customer_info.get('created_at')),
+        updated_at=parser.isoparse(customer_info.get('updated_at')),
+        given_name=customer_info.get('given_name'),
+        family_name=customer_info.get('family_name'),
+        locality=address.get('locality'),
+        postal_code=address.get('postal_code'),
+        reference_id=customer_info.get('reference_id'),
+        note=customer_info.get('note'),
+        creation_source=customer_info.get('creation_source')
+    )
+
+
+def _dict_order(order) -> dict:
+    """
+    Maps an order the way _map_order_info did.
+    """
+    order_info = order.dict()
+
+    return dict(
+        id=order_info.get('id'),
+        location_id=order_info.get('location_id'),
+        created_at=parser.isoparse(order_info.get('created_at')),
+        updated_at=parser.isoparse(order_info.get('updated_at')),
+        customer_id=order_info.get('customer_id')
+    )
+
+
+@app.command()
+def main(records: int = 5_000):
+    cases = (
+        ("payments", generate_payments(records), _dict_payment, PAYMENT_MAPPER.map),
+        ("customers", generate_customers(records), _dict_customer, CUSTOMER_MAPPER.map),
+        ("orders", generate_orders(records), _dict_order, ORDER_MAPPER.map),
+    )
+
+    for resource, sdk_records, *strategies in cases:
+        rates = []
+        for name, strategy in zip(("dict", "compiled"), strategies):
+            start = time.perf_counter()
+            for record in sdk_records:
+                strategy(record)
+            elapsed = time.perf_counter() - start
+
+            rates.append(records / elapsed)
+            logger.info(f"{resource:>9} {name:>8}: {elapsed:8.3f}s, "
+                        f"{rates[-1]:12,.0f} records/s")
+
+        logger.info(f"{resource:>9} speedup: {rates[1] / rates[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,66 @@
+"""
+Benchmark for overlapping page downloads with database writes.
+
+Simulates a paginated Square listing with a fixed network latency per page and stores every
+page in SQLite, once with pages fetched in lockstep and once with PrefetchPager reading ahead.
+
+Usage:
+    python -m benchmarks.bench_prefetch --pages 50 --page-size 1000 --latency 0.015
+"""
+import time
+
+from loguru import logger
+from square.core.pagination import SyncPager
+from sqlalchemy import delete
+import typer
+
+from app.db import ETLSession, init_db
+from app.db_models import Payment
+from belly_rubb.etl.bulk_upsert import BulkUpserter
+from belly_rubb.etl.pager import PrefetchPager
+from benchmarks import payment_rows
+
+app = typer.Typer()
+
+
+def _slow_pager(pages: list, latency: float, index: int = 0) -> SyncPager:
+    """
+    Builds a SyncPager whose next page takes 'latency' seconds to arrive.
+    """
+    def get_next():
+        time.sleep(latency)
+        return _slow_pager(pages, latency, index + 1)
+
+    return SyncPager(
+        has_next=index + 1 < len(pages),
+        items=pages[index],
+        get_next=get_next,
+        response=None,
+    )
+
+
+@app.command()
+def main(pages: int = 50, page_size: int = 1000, latency: float = 0.015, depth: int = 2):
+    init_db()
+    rows = payment_rows(pages * page_size)
+    page_rows = [rows[i:i + page_size] for i in range(0, len(rows), page_size)]
+
+    for name, prefetch_depth in (("lockstep", 0), (f"prefetch={depth}", depth)):
+        with ETLSession() as session:
+            session.execute(delete(Payment))
+            session.commit()
+
+            upserter = BulkUpserter(Payment, chunk_size=page_size)
+            start = time.perf_counter()
+            for items in PrefetchPager(_slow_pager(page_rows, latency), depth=prefetch_depth):
+                upserter.extend(items, session)
+                upserter.flush(session)
+                session.commit()
+            elapsed = time.perf_counter() - start
+
+        logger.info(f"{name:>12}: {elapsed:8.3f}s for {pages} pages "
+                    f"({pages * latency:.2f}s of simulated network latency)")
+
+
+if __name__ == "__main__":
+    app()
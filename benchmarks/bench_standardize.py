@@ -0,0 +1,91 @@
+"""
+Benchmark for standardizing item names and variations.
+
+Compares the notebook's 'standardize_name_vars', applied with 'DataFrame.apply(axis=1)',
+with ItemStandardizer, which standardizes unique pairs only. Line items are drawn from the
+aliases of 'item_synonyms.json', a share of them with the variation in parentheses.
+
+The row-wise path is timed on a sample of '--apply-rows' rows and its rate reported, since
+millions of rows take it minutes.
+
+Usage:
+    python -m benchmarks.bench_standardize --records 5000000
+"""
+import re
+import time
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import typer
+
+from belly_rubb.features import ItemStandardizer
+
+app = typer.Typer()
+
+
+def line_items(standardizer: ItemStandardizer, records: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates line items named after the aliases of the synonyms.
+    """
+    rng = np.random.default_rng(seed)
+    aliases = [alias.upper() for alias in standardizer.index.alias_to_base]
+    variations = [variation.title() for variation in standardizer.index.variation_map]
+
+    names = np.array(aliases + [f"{alias} ({variation})" for alias, variation
+                                in zip(aliases, variations)], dtype=object)
+    return pd.DataFrame({
+        "Item Name": names[rng.integers(0, len(names), records)],
+        "Item Variation": np.array(variations, dtype=object)[
+            rng.integers(0, len(variations), records)],
+    })
+
+
+def _row_wise(df: pd.DataFrame, standardizer: ItemStandardizer) -> pd.DataFrame:
+    """
+    Standardizes rows the way notebook 1.01 did: one Python call per row.
+    """
+    alias_to_base, var_map = standardizer.index.alias_to_base, standardizer.index.variation_map
+
+    def standardize_name_vars(row: pd.Series):
+        item_name = row['Item Name'].lower()
+        item_variation = row['Item Variation'].lower()
+
+        if item_name in alias_to_base:
+            row['std_name'] = alias_to_base.get(item_name, item_name)
+            row['std_variation'] = var_map.get(item_variation, item_variation)
+        else:
+            start = item_name.find('(') + 1
+            end = item_name.find(')', start)
+            var = item_name[start:end] if end != -1 else None
+
+            if var:
+                item_name = re.sub(r"\((.*?)\)", "", string=item_name).strip().lower()
+            row['std_name'] = alias_to_base.get(item_name, item_name)
+            row['std_variation'] = var_map.get(var, item_variation)
+
+        return row
+
+    return df.apply(standardize_name_vars, axis=1)
+
+
+@app.command()
+def main(records: int = 5_000_000, apply_rows: int = 20_000):
+    standardizer = ItemStandardizer.from_file()
+    df = line_items(standardizer, records)
+
+    start = time.perf_counter()
+    _row_wise(df.head(apply_rows), standardizer)
+    elapsed = time.perf_counter() - start
+    logger.info(f"  row-wise: {apply_rows / elapsed:12,.0f} rows/s, "
+                f"{records / (apply_rows / elapsed):8.1f}s estimated for {records:,} rows")
+
+    start = time.perf_counter()
+    standardizer.standardize(df)
+    elapsed = time.perf_counter() - start
+    logger.info(f"vectorized: {records / elapsed:12,.0f} rows/s, "
+                f"{elapsed:8.1f}s for {records:,} rows")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,180 @@
+"""
+Benchmark for the SQLite storage profiles of 'app.storage'.
+
+Every profile gets its own database file, since WAL mode persists in the file, and runs
+two phases:
+
+    - write throughput: payment rows upserted in chunks by BulkUpserter, committing every
+      chunk like sync checkpoints do,
+    - reader/writer concurrency: one writer process keeps upserting and committing chunks
+      while reader processes run the 'location_sales' report, each through its own engine.
+      Reports completed queries, their latency and how many failed with 'database is locked',
+      alongside the writer's throughput under that load.
+
+Usage:
+    python -m benchmarks.bench_storage --records 50000 --readers 2 --seconds 10
+    python -m benchmarks.bench_storage --profile default --profile etl-bulk
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+from pathlib import Path
+import statistics
+import tempfile
+import time
+from typing import List
+
+from loguru import logger
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+import typer
+
+from app.db import Base
+from app.db_models import Payment
+from app.storage import STORAGE_PROFILES, apply_storage_profile
+from belly_rubb.etl.bulk_upsert import BulkUpserter
+from belly_rubb.queries import location_sales
+from benchmarks import payment_rows
+
+app = typer.Typer()
+
+# Seconds given to spawned processes to import the application before the phase starts
+STARTUP_DELAY = 3.0
+
+
+def _sessionmaker(url: str, profile: str):
+    """
+    Creates a session factory on its own engine, with the profile applied.
+    """
+    engine = create_engine(url)
+    apply_storage_profile(engine, profile)
+
+    return sessionmaker(bind=engine)
+
+
+def _write_throughput(url: str, profile: str, records: int, chunk_size: int) -> float:
+    """
+    Upserts generated payment rows into an empty table, committing every chunk.
+
+    Returns:
+        float: Rows written per second.
+    """
+    Session = _sessionmaker(url, profile)
+    Base.metadata.create_all(Session.kw["bind"])
+    rows = payment_rows(records)
+
+    start = time.perf_counter()
+    with Session() as session:
+        upserter = BulkUpserter(Payment, chunk_size=chunk_size)
+        for first in range(0, records, chunk_size):
+            upserter.extend(rows[first:first + chunk_size], session)
+            upserter.flush(session)
+            session.commit()
+
+    return records / (time.perf_counter() - start)
+
+
+def _writer(url: str, profile: str, records: int, chunk_size: int, start_at: float,
+            seconds: float) -> dict:
+    """
+    Upserts and commits chunks of payment rows until the phase ends.
+    """
+    Session = _sessionmaker(url, profile)
+    rows = payment_rows(records)
+    written, locked = 0, 0
+
+    time.sleep(max(0.0, start_at - time.time()))
+    with Session() as session:
+        upserter = BulkUpserter(Payment, chunk_size=chunk_size)
+        while time.time() < start_at + seconds:
+            first = written % records
+            try:
+                upserter.extend(rows[first:first + chunk_size], session)
+                upserter.flush(session)
+                session.commit()
+                written += len(rows[first:first + chunk_size])
+            except OperationalError:
+                session.rollback()
+                locked += 1
+
+    return dict(rows=written, locked=locked)
+
+
+def _reader(url: str, profile: str, start_at: float, seconds: float) -> dict:
+    """
+    Runs the location sales report until the phase ends.
+    """
+    Session = _sessionmaker(url, profile)
+    latencies, locked = [], 0
+
+    time.sleep(max(0.0, start_at - time.time()))
+    while time.time() < start_at + seconds:
+        start = time.perf_counter()
+        try:
+            with Session() as session:
+                location_sales(session, "LOCATION")
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            locked += 1
+
+    return dict(latencies=latencies, locked=locked)
+
+
+def run_profile(profile: str, records: int, chunk_size: int, readers: int,
+                seconds: float) -> dict:
+    """
+    Benchmarks a profile on a fresh database file.
+
+    Returns:
+        dict: Metrics of both phases.
+    """
+    path = Path(tempfile.mkdtemp()) / f"{profile}.db"
+    url = f"sqlite:///{path}"
+    spawn = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+        write_rate = executor.submit(_write_throughput, url, profile, records, chunk_size).result()
+
+    start_at = time.time() + STARTUP_DELAY
+    with ProcessPoolExecutor(max_workers=readers + 1, mp_context=spawn) as executor:
+        writer = executor.submit(_writer, url, profile, records, chunk_size, start_at, seconds)
+        reads = [executor.submit(_reader, url, profile, start_at, seconds)
+                 for _ in range(readers)]
+        writer, reads = writer.result(), [read.result() for read in reads]
+
+    latencies = sorted(latency for read in reads for latency in read["latencies"])
+    os.remove(path)
+
+    return dict(
+        write_rows_per_sec=round(write_rate),
+        concurrent_rows_per_sec=round(writer["rows"] / seconds),
+        writer_locked=writer["locked"],
+        reads_per_sec=round(len(latencies) / seconds, 1),
+        read_p50_ms=round(1000 * statistics.median(latencies), 2) if latencies else None,
+        read_max_ms=round(1000 * latencies[-1], 2) if latencies else None,
+        reader_locked=sum(read["locked"] for read in reads),
+    )
+
+
+@app.command()
+def main(
+    profiles: List[str] = typer.Option(list(STORAGE_PROFILES), "--profile",
+                                       help="Storage profiles to compare."),
+    records: int = 50_000,
+    chunk_size: int = 500,
+    readers: int = 2,
+    seconds: float = 10.0,
+):
+    for profile in profiles:
+        metrics = run_profile(profile, records, chunk_size, readers, seconds)
+
+        logger.info(f"{profile:>14}: {metrics['write_rows_per_sec']:>8,} rows/s alone, "
+                    f"{metrics['concurrent_rows_per_sec']:>8,} rows/s with {readers} readers "
+                    f"({metrics['writer_locked']} locked), "
+                    f"{metrics['reads_per_sec']:>7} reads/s, p50 {metrics['read_p50_ms']} ms, "
+                    f"max {metrics['read_max_ms']} ms ({metrics['reader_locked']} locked)")
+
+
+if __name__ == "__main__":
+    app()
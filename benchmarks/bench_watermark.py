@@ -0,0 +1,68 @@
+"""
+Benchmark for per-record sync filtering.
+
+Compares the previous filter, which ran a 'sync_states' query and parsed the stored
+timestamp for every record, with a SyncWatermark loaded once per run.
+
+Usage:
+    python -m benchmarks.bench_watermark --records 50000
+"""
+from datetime import datetime, timedelta, timezone
+import time
+
+from loguru import logger
+from sqlalchemy import select
+import typer
+
+from app.db import ETLSession, init_db
+from app.db_models import SyncState
+from app.pkce_flow import iso_to_utc
+from belly_rubb.etl.watermark import SyncWatermark
+
+app = typer.Typer()
+
+LAST_SYNCED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _per_record_query(record_dates: list, session) -> int:
+    """
+    Filters records the way iter_records did before watermarks: one query per record.
+    """
+    recent = 0
+    for record_date in record_dates:
+        stmt = select(SyncState).where(SyncState.resource == "payments")
+        sync_state = session.execute(stmt).scalars().first()
+        if not sync_state or record_date > sync_state.last_synced:
+            recent += 1
+    return recent
+
+
+def _watermark(record_dates: list, session) -> int:
+    """
+    Filters records against a watermark loaded once.
+    """
+    watermark = SyncWatermark.load("payments", session, overlap=timedelta(0))
+    return sum(1 for record_date in record_dates if watermark.is_recent(record_date))
+
+
+@app.command()
+def main(records: int = 50_000):
+    init_db()
+    record_dates = [LAST_SYNCED + timedelta(seconds=i - records // 2) for i in range(records)]
+
+    with ETLSession() as session:
+        session.merge(SyncState(resource="payments", last_synced=iso_to_utc(LAST_SYNCED)))
+        session.commit()
+
+        for name, strategy in (("per-record query", _per_record_query),
+                               ("watermark", _watermark)):
+            start = time.perf_counter()
+            recent = strategy(record_dates, session)
+            elapsed = time.perf_counter() - start
+
+            logger.info(f"{name:>16}: {elapsed:8.3f}s total, "
+                        f"{elapsed / records * 1e6:8.2f}us/record, {recent} recent")
+
+
+if __name__ == "__main__":
+    app()
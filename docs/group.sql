@@ -1,4 +1,6 @@
 CREATE TABLE groups (
     id VARCHAR PRIMARY KEY,
-    name VARCHAR
+    name VARCHAR,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
 );
\ No newline at end of file
@@ -1,5 +1,9 @@
 CREATE TABLE group_membership (
     id INT PRIMARY KEY,
     customer_id VARCHAR FOREIGN KEY REFERENCES customers(id),
-    group_id VARCHAR FOREIGN KEY REFERENCES groups(id)
-);
\ No newline at end of file
+    group_id VARCHAR FOREIGN KEY REFERENCES groups(id),
+    updated_at TIMESTAMP
+);
+CREATE INDEX ix_group_memberships_customer_id ON group_memberships (customer_id);
+CREATE INDEX ix_group_memberships_group_id ON group_memberships (group_id);
+CREATE UNIQUE INDEX ix_group_memberships_customer_id_group_id ON group_memberships (customer_id, group_id);
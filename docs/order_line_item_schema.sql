@@ -0,0 +1,16 @@
+CREATE TABLE order_line_items (
+    order_id VARCHAR REFERENCES orders(id),
+    uid VARCHAR,
+    catalog_object_id VARCHAR,
+    name VARCHAR,
+    variation_name VARCHAR,
+    quantity FLOAT,
+    gross_sales_money INTEGER,
+    currency VARCHAR,
+    created_at VARCHAR,
+    updated_at VARCHAR,
+    PRIMARY KEY (order_id, uid)
+);
+CREATE INDEX ix_order_line_items_name_created_at ON order_line_items (name, created_at);
+CREATE INDEX ix_order_line_items_catalog_object_id_created_at ON order_line_items (catalog_object_id, created_at);
+CREATE INDEX ix_order_line_items_created_at ON order_line_items (created_at);
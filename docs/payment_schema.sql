@@ -11,4 +11,8 @@ CREATE TABLE payments (
     location_id VARCHAR,
     order_id VARCHAR REFERENCES orders(id),
     square_product VARCHAR
-)
\ No newline at end of file
+);
+
+CREATE INDEX ix_payments_updated_at ON payments (updated_at);
+CREATE INDEX ix_payments_order_id ON payments (order_id);
+CREATE INDEX ix_payments_location_id_created_at ON payments (location_id, created_at)
\ No newline at end of file
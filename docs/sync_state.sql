@@ -1,4 +1,7 @@
 CREATE TABLE sync_states (
     resource VARCHAR PRIMARY KEY,
-    last_synced VARCHAR
-);
\ No newline at end of file
+    last_synced TIMESTAMP,
+    cursor VARCHAR,
+    high_water_mark TIMESTAMP,
+    checkpointed_at TIMESTAMP
+);
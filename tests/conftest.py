@@ -0,0 +1,28 @@
+"""
+Shared pytest fixtures.
+
+The application engine is bound to DB_PATH at import time, so the variable is pointed at a
+throwaway SQLite file before any 'app' module is imported.
+"""
+import os
+import tempfile
+
+os.environ["DB_PATH"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+
+import pytest  # noqa: E402
+
+from app.db import Base, Session, engine, init_db  # noqa: E402
+
+
+@pytest.fixture
+def session_db():
+    """
+    Yields a database session on the application tables and empties them afterwards.
+    """
+    init_db()
+    with Session() as session:
+        yield session
+
+    with engine.begin() as conn:
+        for table in Base.metadata.tables.values():
+            conn.execute(table.delete())
@@ -0,0 +1,7 @@
+"""
+Test doubles of the Square API shared by the tests and benchmarks.
+
+Modules:
+    fake_square: In-process fake of the Square client and record generators.
+    fake_square_server: Serves the fake's records over HTTP for the real Square client.
+"""
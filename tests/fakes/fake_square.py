@@ -0,0 +1,526 @@
+"""
+Module: fake_square.py
+
+This module provides an in-process stand-in for the Square client so sync paths can be
+exercised without live credentials or network access.
+
+The fake mirrors the parts of the Square SDK the ETL uses: it returns the SDK's own
+record types, pages with cursors, and applies the same server-side filters Square does.
+Every call is recorded so tests can assert which filters were pushed down.
+
+Classes:
+    FakeSquareClient:
+        - Exposes 'customers', 'customers.groups', 'payments', 'orders' and 'locations'
+            endpoints backed by in-memory records.
+        - Records every call in 'calls' as (endpoint, kwargs) tuples.
+
+Functions:
+    generate_customers(
+        count: int, start: datetime, step: timedelta, first: int, groups: int
+    ) -> list:
+        Generates Square customer records with increasing timestamps.
+    generate_groups(count: int, start: datetime, step: timedelta, first: int) -> list:
+        Generates Square customer group records with increasing timestamps.
+    generate_payments(count: int, start: datetime, step: timedelta, first: int) -> list:
+        Generates Square payment records with increasing timestamps.
+    generate_orders(count: int, start: datetime, step: timedelta, first: int) -> list:
+        Generates Square order records with line items and increasing timestamps.
+
+Usage:
+    client = FakeSquareClient(payments=generate_payments(1000))
+    PaymentAPI(merchant_id="FAKE", client=client).sync_payments()
+"""
+
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+from app.pkce_flow import iso_to_utc
+from dateutil import parser
+from square.core.pagination import SyncPager
+from square.types.batch_get_orders_response import BatchGetOrdersResponse
+from square.types.customer import Customer
+from square.types.customer_group import CustomerGroup
+from square.types.list_customer_groups_response import ListCustomerGroupsResponse
+from square.types.list_customers_response import ListCustomersResponse
+from square.types.list_locations_response import ListLocationsResponse
+from square.types.list_payments_response import ListPaymentsResponse
+from square.types.location import Location
+from square.types.order import Order
+from square.types.order_entry import OrderEntry
+from square.types.payment import Payment
+from square.types.search_customers_response import SearchCustomersResponse
+from square.types.search_orders_response import SearchOrdersResponse
+
+DEFAULT_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+LOCATION_ID = "LOCATION"
+MENU = [
+    ("Brisket Sandwich", "Regular", 1450),
+    ("Pulled Pork Plate", "Large", 1895),
+    ("Mac and Cheese", "Side", 550),
+]
+
+
+def generate_customers(
+    count: int,
+    start: datetime = DEFAULT_START,
+    step: timedelta = timedelta(minutes=1),
+    first: int = 0,
+    groups: int = 0,
+) -> list:
+    """
+    Generates Square customer records with increasing timestamps.
+
+    Args:
+        count (int): Number of customers to generate.
+        start (datetime): Timestamp of the first customer.
+        step (timedelta): Time between consecutive customers.
+        first (int): Index of the first record. Batches generated with consecutive
+            indexes have distinct ids and increasing timestamps.
+        groups (int): Number of groups from 'generate_groups' the customers are spread
+            over. If 0, customers belong to no group.
+
+    Returns:
+        list: Customer records as returned by the Square SDK.
+    """
+    return [
+        Customer(
+            id=f"CUSTOMER{i:09d}",
+            created_at=iso_to_utc(start + step * i),
+            updated_at=iso_to_utc(start + step * i),
+            given_name=f"Given{i}",
+            family_name=f"Family{i}",
+            address={"locality": "Los Angeles", "postal_code": "90001"},
+            creation_source="DIRECTORY",
+            group_ids=[f"GROUP{i % groups:09d}"] if groups else None,
+        )
+        for i in range(first, first + count)
+    ]
+
+
+def generate_groups(
+    count: int,
+    start: datetime = DEFAULT_START,
+    step: timedelta = timedelta(minutes=1),
+    first: int = 0,
+) -> list:
+    """
+    Generates Square customer group records with increasing timestamps.
+
+    Args:
+        count (int): Number of groups to generate.
+        start (datetime): Timestamp of the first group.
+        step (timedelta): Time between consecutive groups.
+        first (int): Index of the first record. Batches generated with consecutive
+            indexes have distinct ids and increasing timestamps.
+
+    Returns:
+        list: CustomerGroup records as returned by the Square SDK.
+    """
+    return [
+        CustomerGroup(
+            id=f"GROUP{i:09d}",
+            name=f"Group {i}",
+            created_at=iso_to_utc(start + step * i),
+            updated_at=iso_to_utc(start + step * i),
+        )
+        for i in range(first, first + count)
+    ]
+
+
+def generate_payments(
+    count: int,
+    start: datetime = DEFAULT_START,
+    step: timedelta = timedelta(minutes=1),
+    first: int = 0,
+) -> list:
+    """
+    Generates Square payment records with increasing timestamps.
+
+    Args:
+        count (int): Number of payments to generate.
+        start (datetime): Timestamp of the first payment.
+        step (timedelta): Time between consecutive payments.
+        first (int): Index of the first record. Batches generated with consecutive
+            indexes have distinct ids and increasing timestamps.
+
+    Returns:
+        list: Payment records as returned by the Square SDK.
+    """
+    return [
+        Payment(
+            id=f"PAYMENT{i:09d}",
+            created_at=iso_to_utc(start + step * i),
+            updated_at=iso_to_utc(start + step * i),
+            amount_money={"amount": 1250, "currency": "USD"},
+            total_money={"amount": 1250, "currency": "USD"},
+            approved_money={"amount": 1250, "currency": "USD"},
+            card_details={"status": "CAPTURED", "card": {"card_brand": "VISA"}},
+            location_id="LOCATION",
+            order_id=f"ORDER{i:09d}",
+            status="COMPLETED",
+        )
+        for i in range(first, first + count)
+    ]
+
+
+def generate_orders(
+    count: int,
+    start: datetime = DEFAULT_START,
+    step: timedelta = timedelta(minutes=1),
+    first: int = 0,
+) -> list:
+    """
+    Generates Square order records with line items and increasing timestamps.
+
+    Args:
+        count (int): Number of orders to generate.
+        start (datetime): Timestamp of the first order.
+        step (timedelta): Time between consecutive orders.
+        first (int): Index of the first record. Batches generated with consecutive
+            indexes have distinct ids and increasing timestamps.
+
+    Returns:
+        list: Order records as returned by the Square SDK.
+    """
+    return [
+        Order(
+            id=f"ORDER{i:09d}",
+            location_id=LOCATION_ID,
+            customer_id=f"CUSTOMER{i % 50:09d}",
+            created_at=iso_to_utc(start + step * i),
+            updated_at=iso_to_utc(start + step * i),
+            state="COMPLETED",
+            line_items=[
+                {
+                    "uid": f"ORDER{i:09d}-{j}",
+                    "catalog_object_id": f"ITEM{j}",
+                    "name": name,
+                    "variation_name": variation,
+                    "quantity": str(1 + (i + j) % 3),
+                    "gross_sales_money": {"amount": price * (1 + (i + j) % 3), "currency": "USD"},
+                }
+                for j, (name, variation, price) in enumerate(MENU[: 1 + i % len(MENU)])
+            ],
+        )
+        for i in range(first, first + count)
+    ]
+
+
+def _in_range(timestamp: str, start_at: str | None, end_at: str | None) -> bool:
+    """
+    Checks an RFC 3339 timestamp against an optional inclusive start and exclusive end.
+    """
+    if start_at is None and end_at is None:
+        return True
+
+    value = parser.isoparse(timestamp)
+
+    if start_at is not None and value < parser.isoparse(start_at):
+        return False
+
+    return end_at is None or value < parser.isoparse(end_at)
+
+
+def _select(endpoint, key: tuple, predicate: Callable, sort_key: Callable, reverse: bool) -> list:
+    """
+    Filters and sorts the records of a fake endpoint, reusing the result for later pages.
+
+    Every page of a query filters the same records, so without reuse paging through a
+    large fake would take time quadratic in its size.
+
+    Returns:
+        list: The matching records in order.
+    """
+    key = (key, len(endpoint.records))
+    if key not in endpoint.results:
+        endpoint.results[key] = sorted(
+            (record for record in endpoint.records if predicate(record)),
+            key=sort_key,
+            reverse=reverse,
+        )
+
+    return endpoint.results[key]
+
+
+def _page(records: list, cursor: str | None, limit: int | None) -> tuple:
+    """
+    Slices a page of records using an offset cursor.
+
+    Returns:
+        tuple: The page of records and the cursor of the next page, or None on the last page.
+    """
+    offset = int(cursor) if cursor else 0
+    limit = limit or 100
+    next_offset = offset + limit
+
+    return records[offset:next_offset], str(next_offset) if next_offset < len(records) else None
+
+
+class _FakeCustomers:
+    """
+    Fake of the Square customers endpoints.
+    """
+
+    def __init__(self, records: list, calls: list):
+        self.records = records
+        self.calls = calls
+        self.results = {}
+
+    def list(self, *, cursor=None, limit=None, sort_field=None, sort_order=None, **kwargs):
+        self.calls.append(
+            (
+                "customers.list",
+                dict(
+                    cursor=cursor,
+                    limit=limit,
+                    sort_field=sort_field,
+                    sort_order=sort_order,
+                    **kwargs,
+                ),
+            )
+        )
+
+        records = _select(
+            self,
+            ("list", sort_order),
+            lambda c: True,
+            sort_key=lambda c: c.created_at,
+            reverse=sort_order == "DESC",
+        )
+        items, next_cursor = _page(records, cursor, limit)
+
+        return SyncPager(
+            has_next=next_cursor is not None,
+            items=items,
+            get_next=lambda: self.list(
+                cursor=next_cursor, limit=limit, sort_field=sort_field, sort_order=sort_order
+            ),
+            response=ListCustomersResponse(customers=items, cursor=next_cursor),
+        )
+
+    def search(self, *, cursor=None, limit=None, query=None, **kwargs):
+        self.calls.append(
+            ("customers.search", dict(cursor=cursor, limit=limit, query=query, **kwargs))
+        )
+
+        query = query or {}
+        updated_at = query.get("filter", {}).get("updated_at", {})
+        sort = query.get("sort", {})
+
+        start_at, end_at = updated_at.get("start_at"), updated_at.get("end_at")
+        records = _select(
+            self,
+            ("search", start_at, end_at, sort.get("order")),
+            lambda c: _in_range(c.updated_at, start_at, end_at),
+            sort_key=lambda c: c.created_at,
+            reverse=sort.get("order") == "DESC",
+        )
+        items, next_cursor = _page(records, cursor, limit)
+
+        return SearchCustomersResponse(customers=items, cursor=next_cursor)
+
+
+class _FakeGroups:
+    """
+    Fake of the Square customer groups endpoints.
+    """
+
+    def __init__(self, records: list, calls: list):
+        self.records = records
+        self.calls = calls
+        self.results = {}
+
+    def list(self, *, cursor=None, limit=None, **kwargs):
+        self.calls.append(("customers.groups.list", dict(cursor=cursor, limit=limit, **kwargs)))
+
+        items, next_cursor = _page(self.records, cursor, limit)
+
+        return SyncPager(
+            has_next=next_cursor is not None,
+            items=items,
+            get_next=lambda: self.list(cursor=next_cursor, limit=limit),
+            response=ListCustomerGroupsResponse(groups=items, cursor=next_cursor),
+        )
+
+
+class _FakePayments:
+    """
+    Fake of the Square payments endpoints.
+    """
+
+    def __init__(self, records: list, calls: list):
+        self.records = records
+        self.calls = calls
+        self.results = {}
+
+    def list(
+        self,
+        *,
+        cursor=None,
+        limit=None,
+        sort_order=None,
+        sort_field=None,
+        begin_time=None,
+        end_time=None,
+        updated_at_begin_time=None,
+        updated_at_end_time=None,
+        **kwargs,
+    ):
+        request = dict(
+            cursor=cursor,
+            limit=limit,
+            sort_order=sort_order,
+            sort_field=sort_field,
+            begin_time=begin_time,
+            end_time=end_time,
+            updated_at_begin_time=updated_at_begin_time,
+            updated_at_end_time=updated_at_end_time,
+            **kwargs,
+        )
+        self.calls.append(("payments.list", request))
+
+        sort_key = "updated_at" if sort_field == "UPDATED_AT" else "created_at"
+        records = _select(
+            self,
+            (
+                begin_time,
+                end_time,
+                updated_at_begin_time,
+                updated_at_end_time,
+                sort_key,
+                sort_order,
+            ),
+            lambda p: (
+                _in_range(p.created_at, begin_time, end_time)
+                and _in_range(p.updated_at, updated_at_begin_time, updated_at_end_time)
+            ),
+            sort_key=lambda p: getattr(p, sort_key),
+            reverse=sort_order == "DESC",
+        )
+        items, next_cursor = _page(records, cursor, limit)
+
+        return SyncPager(
+            has_next=next_cursor is not None,
+            items=items,
+            get_next=lambda: self.list(**{**request, "cursor": next_cursor}),
+            response=ListPaymentsResponse(payments=items, cursor=next_cursor),
+        )
+
+
+class _FakeOrders:
+    """
+    Fake of the Square orders endpoints.
+    """
+
+    def __init__(self, records: list, calls: list):
+        self.records = records
+        self.calls = calls
+        self.results = {}
+
+    def search(
+        self,
+        *,
+        location_ids=None,
+        cursor=None,
+        query=None,
+        limit=None,
+        return_entries=None,
+        **kwargs,
+    ):
+        self.calls.append(
+            (
+                "orders.search",
+                dict(
+                    location_ids=location_ids,
+                    cursor=cursor,
+                    query=query,
+                    limit=limit,
+                    return_entries=return_entries,
+                    **kwargs,
+                ),
+            )
+        )
+
+        query = query or {}
+        date_filter = query.get("filter", {}).get("date_time_filter", {})
+        updated_at = date_filter.get("updated_at", {})
+        sort = query.get("sort", {})
+        sort_key = sort.get("sort_field", "CREATED_AT").lower()
+
+        start_at, end_at = updated_at.get("start_at"), updated_at.get("end_at")
+        records = _select(
+            self,
+            (tuple(location_ids or ()), start_at, end_at, sort_key, sort.get("sort_order")),
+            lambda o: (
+                (not location_ids or o.location_id in location_ids)
+                and _in_range(o.updated_at, start_at, end_at)
+            ),
+            sort_key=lambda o: getattr(o, sort_key),
+            reverse=sort.get("sort_order") == "DESC",
+        )
+        items, next_cursor = _page(records, cursor, limit or 500)
+
+        if return_entries:
+            entries = [OrderEntry(order_id=o.id, location_id=o.location_id) for o in items]
+            return SearchOrdersResponse(order_entries=entries, cursor=next_cursor)
+
+        return SearchOrdersResponse(orders=items, cursor=next_cursor)
+
+    def batch_get(self, *, order_ids, location_id=None, **kwargs):
+        self.calls.append(
+            ("orders.batch_get", dict(order_ids=order_ids, location_id=location_id, **kwargs))
+        )
+
+        key = ("by_id", len(self.records))
+        if key not in self.results:
+            self.results[key] = {o.id: o for o in self.records}
+        by_id = self.results[key]
+        return BatchGetOrdersResponse(
+            orders=[by_id[order_id] for order_id in order_ids if order_id in by_id]
+        )
+
+
+class _FakeLocations:
+    """
+    Fake of the Square locations endpoints.
+    """
+
+    def __init__(self, orders: list, calls: list):
+        self.orders = orders
+        self.calls = calls
+
+    def list(self, **kwargs):
+        self.calls.append(("locations.list", kwargs))
+
+        location_ids = sorted({o.location_id for o in self.orders} or {LOCATION_ID})
+        return ListLocationsResponse(
+            locations=[Location(id=location_id) for location_id in location_ids]
+        )
+
+
+class FakeSquareClient:
+    """
+    FakeSquareClient is an in-process replacement for 'square.Square'.
+
+    Attributes:
+        customers: Fake customers endpoints, backed by the given customer records. Its
+            'groups' attribute lists the given customer groups.
+        payments: Fake payments endpoints, backed by the given payment records.
+        orders: Fake orders endpoints, backed by the given order records.
+        locations: Fake locations endpoints, listing the locations of the orders.
+        calls (list): Every call made, as (endpoint, kwargs) tuples.
+    """
+
+    def __init__(
+        self,
+        customers: list | None = None,
+        payments: list | None = None,
+        orders: list | None = None,
+        groups: list | None = None,
+    ):
+        self.calls = []
+        self.customers = _FakeCustomers(list(customers or []), self.calls)
+        self.customers.groups = _FakeGroups(list(groups or []), self.calls)
+        self.payments = _FakePayments(list(payments or []), self.calls)
+        self.orders = _FakeOrders(list(orders or []), self.calls)
+        self.locations = _FakeLocations(self.orders.records, self.calls)
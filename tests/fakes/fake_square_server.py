@@ -0,0 +1,369 @@
+"""
+Module: fake_square_server.py
+
+This module serves generated Square data over HTTP so the real Square client, connection pool,
+rate limiter and sync paths can be exercised without credentials or network access.
+
+The server answers the endpoints the ETL uses with the records of a FakeSquareClient, so
+paging and the 'updated_at' filters behave exactly like the in-process fake. It can delay
+every response and answer a share of the requests with 429 or 5xx errors to load-test the
+request scheduler's retries and throttling.
+
+Classes:
+    FakeSquareServer:
+        - Serves the customers, customer groups, payments, orders, locations and OAuth token
+            endpoints on a background thread.
+        - Counts the responses sent per endpoint and status code.
+        - Methods:
+            - start() -> FakeSquareServer: Starts serving on a background thread.
+            - stop() -> None: Stops the server.
+
+Usage:
+    with FakeSquareServer(FakeSquareClient(payments=generate_payments(1000))) as server:
+        client = square_client(token="FAKE", base_url=server.base_url)
+        PaymentAPI(merchant_id="FAKE", client=client).sync_payments()
+
+    python -m tests.fakes.fake_square_server --port 8080 --payments 10000 --error-rate 0.05
+    SQUARE_BASE_URL=http://127.0.0.1:8080 python -m belly_rubb.etl.orchestrator
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import secrets
+import threading
+import time
+from typing import Annotated
+from urllib.parse import parse_qsl, urlsplit
+
+from app.pkce_flow import iso_to_utc
+from loguru import logger
+import typer
+
+from belly_rubb.etl.archive import record_fields
+from tests.fakes.fake_square import (
+    FakeSquareClient,
+    generate_customers,
+    generate_groups,
+    generate_orders,
+    generate_payments,
+)
+
+app = typer.Typer()
+
+# Query parameters sent as strings that the fake endpoints expect as integers
+_INTEGER_PARAMS = frozenset({"limit"})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Routes requests to the FakeSquareServer owning the HTTP server.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+
+        status, headers, payload = self.server.fake.respond(
+            self.command,
+            url.path,
+            dict(parse_qsl(url.query)),
+            body,
+            self.headers.get("Authorization"),
+        )
+
+        data = json.dumps(payload, default=record_fields, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = _handle  # pylint: disable=invalid-name
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class FakeSquareServer:
+    """
+    FakeSquareServer serves the records of a FakeSquareClient over HTTP.
+
+    Every request needs a bearer token, as with Square. Injected errors are drawn from a
+    seeded random generator, so a run with the same seed and requests fails the same way.
+
+    Attributes:
+        fake (FakeSquareClient): Records served and calls made. Filters and paging are
+            applied by its endpoints.
+        latency (float): Seconds every response is delayed.
+        jitter (float): Up to this many seconds are randomly added to the latency.
+        error_rate (float): Share of the API requests answered with an error.
+        error_statuses (tuple): Status codes injected errors are drawn from.
+        retry_after (float): 'Retry-After' seconds sent with injected 429 responses.
+        token_ttl (timedelta): Lifetime of the access tokens issued by '/oauth2/token'.
+        responses (Counter): Number of responses sent per (path, status code).
+        base_url (str): URL of the running server.
+
+    Methods:
+        start() -> FakeSquareServer:
+            Starts serving on a background thread.
+        stop() -> None:
+            Stops the server and closes its socket.
+    """
+
+    def __init__(
+        self,
+        fake: FakeSquareClient | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: tuple = (429,),
+        retry_after: float = 0.0,
+        token_ttl: timedelta = timedelta(days=30),
+        seed: int | None = None,
+    ):
+        self.fake = fake or FakeSquareClient()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.token_ttl = token_ttl
+        self.responses = Counter()
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self._routes = {
+            ("GET", "/v2/customers"): lambda params, body: (
+                self.fake.customers.list(**params).response
+            ),
+            ("POST", "/v2/customers/search"): lambda params, body: self.fake.customers.search(
+                **body
+            ),
+            ("GET", "/v2/customers/groups"): lambda params, body: (
+                self.fake.customers.groups.list(**params).response
+            ),
+            ("GET", "/v2/payments"): lambda params, body: (
+                self.fake.payments.list(**params).response
+            ),
+            ("POST", "/v2/orders/search"): lambda params, body: self.fake.orders.search(**body),
+            ("POST", "/v2/orders/batch-retrieve"): lambda params, body: self.fake.orders.batch_get(
+                **body
+            ),
+            ("GET", "/v2/locations"): lambda params, body: self.fake.locations.list(**params),
+        }
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _delay(self) -> float:
+        """
+        Draws the delay of a response.
+        """
+        with self._lock:
+            return (
+                self.latency + self._random.uniform(0, self.jitter)
+                if self.jitter
+                else self.latency
+            )
+
+    def _injected_error(self) -> int | None:
+        """
+        Draws whether a request fails, and with which status code.
+        """
+        if not self.error_rate:
+            return None
+
+        with self._lock:
+            if self._random.random() >= self.error_rate:
+                return None
+            return self._random.choice(self.error_statuses)
+
+    def _issue_token(self, body: dict) -> dict:
+        """
+        Answers '/oauth2/token' with a new access and refresh token.
+        """
+        now = datetime.now(timezone.utc)
+
+        return {
+            "access_token": f"FAKE-{secrets.token_urlsafe(16)}",
+            "token_type": "bearer",
+            "expires_at": iso_to_utc(now + self.token_ttl),
+            "merchant_id": body.get("merchant_id", "FAKE"),
+            "refresh_token": body.get("refresh_token") or f"FAKE-{secrets.token_urlsafe(16)}",
+            "short_lived": False,
+            "refresh_token_expires_at": iso_to_utc(now + 3 * self.token_ttl),
+        }
+
+    def respond(
+        self, method: str, path: str, params: dict, body: dict, authorization: str | None = None
+    ) -> tuple:
+        """
+        Answers a request.
+
+        Args:
+            method (str): HTTP method.
+            path (str): URL path, e.g. '/v2/payments'.
+            params (dict): Query parameters.
+            body (dict): Parsed JSON body, empty for GET requests.
+            authorization (str | None): The 'Authorization' header.
+
+        Returns:
+            tuple: Status code, extra headers and the JSON payload of the response.
+        """
+        time.sleep(self._delay())
+
+        status, headers, payload = self._route(method, path, params, body, authorization)
+
+        with self._lock:
+            self.responses[(path, status)] += 1
+
+        return status, headers, payload
+
+    def _route(
+        self, method: str, path: str, params: dict, body: dict, authorization: str | None
+    ) -> tuple:
+        """
+        Dispatches a request to its endpoint, injecting errors on API endpoints.
+        """
+        if (method, path) == ("POST", "/oauth2/token"):
+            return 200, {}, self._issue_token(body)
+
+        endpoint = self._routes.get((method, path.rstrip("/")))
+        if endpoint is None:
+            return 404, {}, _errors("INVALID_REQUEST_ERROR", "NOT_FOUND", f"No route {path}")
+
+        if not authorization or not authorization.startswith("Bearer "):
+            return (
+                401,
+                {},
+                _errors("AUTHENTICATION_ERROR", "UNAUTHORIZED", "The request is not authorized."),
+            )
+
+        status = self._injected_error()
+        if status == 429:
+            return (
+                429,
+                {"Retry-After": str(self.retry_after)},
+                _errors("RATE_LIMIT_ERROR", "RATE_LIMITED", "Injected rate limit."),
+            )
+        if status is not None:
+            return status, {}, _errors("API_ERROR", "INTERNAL_SERVER_ERROR", "Injected error.")
+
+        params = {
+            name: int(value) if name in _INTEGER_PARAMS else value
+            for name, value in params.items()
+        }
+
+        return 200, {}, endpoint(params, body)
+
+    def start(self) -> "FakeSquareServer":
+        """
+        Starts serving on a background thread.
+
+        Returns:
+            FakeSquareServer: The server itself.
+        """
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="fake-square-server",
+            daemon=True,
+        )
+        self._thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the server and closes its socket.
+        """
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _errors(category: str, code: str, detail: str) -> dict:
+    """
+    Builds a Square error body.
+    """
+    return {"errors": [{"category": category, "code": code, "detail": detail}]}
+
+
+@app.command()
+def main(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    customers: int = 1_000,
+    groups: int = 20,
+    payments: int = 10_000,
+    orders: int = 10_000,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    error_status: Annotated[list[int], typer.Option(help="Status codes of injected errors.")] = (
+        429,
+    ),
+    retry_after: float = 1.0,
+    seed: int | None = None,
+):
+    fake = FakeSquareClient(
+        customers=generate_customers(customers, groups=groups),
+        groups=generate_groups(groups),
+        payments=generate_payments(payments),
+        orders=generate_orders(orders),
+    )
+
+    server = FakeSquareServer(
+        fake,
+        host=host,
+        port=port,
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        error_statuses=tuple(error_status),
+        retry_after=retry_after,
+        seed=seed,
+    )
+
+    logger.info(
+        f"Serving fake Square API on {server.base_url}, "
+        f"set SQUARE_BASE_URL={server.base_url} to sync from it."
+    )
+
+    with server:
+        try:
+            server._thread.join()  # pylint: disable=protected-access
+        except KeyboardInterrupt:
+            logger.info(f"Responses sent: {dict(server.responses)}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+from app.db_models import Customer, Group
+from belly_rubb.etl import BulkUpserter
+
+
+def test_rows_are_written_in_chunks(session_db):
+    upserter = BulkUpserter(Group, chunk_size=3)
+
+    written = upserter.extend(({"id": str(i), "name": f"group {i}"} for i in range(7)), session_db)
+
+    assert written == 6
+    assert len(upserter) == 1
+    assert upserter.flush(session_db) == 1
+    assert session_db.execute(select(func.count()).select_from(Group)).scalar_one() == 7
+
+
+def test_conflicts_update_rows_but_keep_created_at(session_db):
+    upserter = BulkUpserter(Customer)
+    row = {"id": "C1", "created_at": datetime(2024, 1, 1), "given_name": "Ada"}
+    upserter.add(row, session_db)
+    upserter.flush(session_db)
+
+    upserter.add({**row, "created_at": datetime(2025, 1, 1), "given_name": "Grace"}, session_db)
+    upserter.flush(session_db)
+
+    customer = session_db.execute(select(Customer)).scalar_one()
+    assert customer.given_name == "Grace"
+    assert customer.created_at == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert upserter.rows_written == 2
+
+
+def test_older_versions_do_not_overwrite_newer_rows(session_db):
+    upserter = BulkUpserter(Customer)
+    newer = {"id": "C1", "updated_at": datetime(2024, 2, 1), "given_name": "Grace"}
+    older = {"id": "C1", "updated_at": datetime(2024, 1, 1), "given_name": "Ada"}
+
+    upserter.extend([newer, older, newer], session_db)
+    upserter.flush(session_db)
+
+    customer = session_db.execute(select(Customer)).scalar_one()
+    assert customer.given_name == "Grace"
+    assert customer.updated_at == datetime(2024, 2, 1, tzinfo=timezone.utc)
@@ -0,0 +1,136 @@
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, text
+
+from app.db_models import Customer, Group, Order, Payment, SyncState
+from app.db_models.types import to_utc
+from app.migrations import migrate
+from belly_rubb.etl import CustomerAPI, OrdersAPI, PaymentAPI
+from belly_rubb.etl.checkpoint import SyncCheckpointer, SyncPage
+from tests.fakes.fake_square import (
+    FakeSquareClient,
+    generate_customers,
+    generate_orders,
+    generate_payments,
+)
+
+
+def _count(session, model):
+    return session.execute(select(func.count()).select_from(model)).scalar_one()
+
+
+def _state(session, resource):
+    session.expire_all()
+    return session.execute(
+        select(SyncState).where(SyncState.resource == resource)).scalar_one_or_none()
+
+
+def _fail_at(client, endpoint, cursor):
+    """
+    Makes an endpoint of a fake client raise when asked for the page at 'cursor'.
+    """
+    resource, method = endpoint.split(".")
+    fake = getattr(client, resource)
+    original = getattr(fake, method)
+
+    def failing(**kwargs):
+        if kwargs.get("cursor") == cursor:
+            raise ConnectionError("connection reset")
+        return original(**kwargs)
+
+    setattr(fake, method, failing)
+
+
+def test_payment_sync_resumes_from_last_checkpoint(session_db, monkeypatch):
+    monkeypatch.setattr("belly_rubb.etl.checkpoint.CHECKPOINT_PAGES", 2)
+    payments = generate_payments(50)
+
+    # Pages hold 5 payments, so the 7th page starts at offset 30
+    client = FakeSquareClient(payments=payments)
+    _fail_at(client, "payments.list", "30")
+    with pytest.raises(ConnectionError):
+        PaymentAPI(merchant_id="FAKE", client=client).sync_payments(page_limit=5)
+
+    # All 6 received pages were stored before the failure
+    state = _state(session_db, "payments")
+    assert _count(session_db, Payment) == 30
+    assert state.cursor == "30"
+    assert state.last_synced is None
+    assert state.high_water_mark == to_utc(payments[29].updated_at)
+
+    client = FakeSquareClient(payments=payments)
+    PaymentAPI(merchant_id="FAKE", client=client).sync_payments(page_limit=5)
+
+    assert client.calls[0][1]["cursor"] == "30"
+    assert len(client.calls) == 4
+    assert _count(session_db, Payment) == 50
+
+    state = _state(session_db, "payments")
+    assert state.last_synced is not None
+    assert state.cursor is None
+
+
+def test_customer_sync_commits(session_db):
+    client = FakeSquareClient(customers=generate_customers(12))
+
+    CustomerAPI(merchant_id="FAKE", client=client).sync_customers(page_limit=5)
+
+    session_db.rollback()
+    assert _count(session_db, Customer) == 12
+    assert _state(session_db, "customers").last_synced is not None
+
+
+def test_order_sync_resumes_within_location_groups(session_db, monkeypatch):
+    monkeypatch.setattr("belly_rubb.etl.checkpoint.CHECKPOINT_PAGES", 1)
+    orders = generate_orders(20)
+
+    client = FakeSquareClient(orders=orders)
+    _fail_at(client, "orders.search", "10")
+    with pytest.raises(ConnectionError):
+        OrdersAPI(merchant_id="FAKE", client=client).sync_orders(page_limit=5)
+
+    assert _state(session_db, "orders").cursor == "0:10"
+
+    client = FakeSquareClient(orders=orders)
+    OrdersAPI(merchant_id="FAKE", client=client).sync_orders(page_limit=5)
+
+    searches = [request for endpoint, request in client.calls if endpoint == "orders.search"]
+    assert searches[0]["cursor"] == "10"
+    assert _count(session_db, Order) == 20
+
+
+def test_migration_extends_existing_sync_states(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE sync_states (resource VARCHAR PRIMARY KEY, last_synced VARCHAR NOT NULL)"))
+        conn.execute(text("INSERT INTO sync_states VALUES ('payments', '2024-01-01T00:00:00Z')"))
+
+    migrate(engine)
+    migrate(engine)
+
+    columns = {column["name"]: column for column in inspect(engine).get_columns("sync_states")}
+    assert {"cursor", "high_water_mark", "checkpointed_at"} <= set(columns)
+    assert columns["last_synced"]["nullable"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT last_synced FROM sync_states")).scalar_one() \
+            == "2024-01-01 00:00:00.000000"
+
+
+def test_failed_checkpoint_keeps_rows_of_other_resources(session_db):
+    customers = SyncCheckpointer("customers", chunk_size=2, every=0)
+    groups = SyncCheckpointer("groups", chunk_size=2, every=0)
+
+    def fail(**kwargs):
+        raise ConnectionError("disk I/O error")
+
+    # Both chunks are flushed into the shared transaction before the groups checkpoint fails
+    customers.write(SyncPage({Customer: [{"id": "C1"}, {"id": "C2"}]}, cursor="2"), session_db)
+    groups.write(SyncPage({Group: [{"id": "G1"}, {"id": "G2"}]}, cursor="2"), session_db)
+    groups.api_manager.save_checkpoint = fail
+    groups.abort(session_db)
+
+    customers.complete(session_db)
+
+    session_db.rollback()
+    assert _count(session_db, Customer) == 2
+    assert _state(session_db, "groups") is None
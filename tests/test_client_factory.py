@@ -0,0 +1,21 @@
+from app.config import HTTP_MAX_CONNECTIONS
+from app.http_client import close_http_client, get_http_client
+from belly_rubb.etl.client_factory import square_client
+
+
+def test_square_clients_share_the_pooled_transport():
+    first = square_client(token="TOKEN")
+    second = square_client(token="TOKEN", base_url="http://127.0.0.1:8000")
+
+    shared = get_http_client()
+    assert first._client_wrapper.httpx_client.httpx_client is shared
+    assert second._client_wrapper.httpx_client.httpx_client is shared
+    assert shared._transport.transport._pool._max_connections == HTTP_MAX_CONNECTIONS
+
+
+def test_closed_client_is_recreated():
+    client = get_http_client()
+    close_http_client()
+
+    assert client.is_closed
+    assert get_http_client() is not client
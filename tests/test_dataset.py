@@ -0,0 +1,58 @@
+import shutil
+
+import pandas as pd
+
+from belly_rubb.dataset import ingest_orders, read_order_export
+
+HEADER = "Order,Order Date,Fulfillment Date,Item Name,Item Quantity,Item Price,Order Total\n"
+
+
+def _export(path, *rows):
+    path.write_text(HEADER + "".join(f"{row}\n" for row in rows))
+    return path
+
+
+def test_order_export_is_read_with_the_schema(tmp_path):
+    path = _export(tmp_path / "orders.csv",
+                   "Armen 59-07,2024/08/31,\"08/31/2024, 07:15 PM\",WINGS COMBO,2,17.5,35.0",
+                   "Troy Issac,not a date,,MAC&CHEESE,1,6,6")
+
+    df = read_order_export(path)
+
+    assert df["Order Date"].tolist()[0] == pd.Timestamp("2024-08-31")
+    assert df["Fulfillment Date"].tolist()[0] == pd.Timestamp("2024-08-31 19:15")
+    assert df["Order Date"].isna().tolist() == [False, True]
+    assert df["Item Quantity"].dtype == "float64"
+    assert df["Item Name"].dtype == "string"
+
+
+def test_new_exports_are_ingested_once_into_month_partitions(tmp_path):
+    raw, out = tmp_path / "raw", tmp_path / "orders"
+    raw.mkdir()
+
+    august = "Armen 59-07,2024/08/31,,WINGS COMBO,1,17.5,17.5"
+    december = "Troy Issac,2024/12/19,,MAC&CHEESE,1,6,6"
+    _export(raw / "export-1.csv", august, august, december)
+
+    # Identical line items of an export are all kept
+    first = ingest_orders(raw, out, workers=1)
+    assert (first["files"], first["rows_read"], first["rows_added"]) == (1, 3, 3)
+    assert sorted(p.parent.name for p in out.glob("month=*/orders.parquet")) == [
+        "month=2024-08", "month=2024-12"]
+
+    # A renamed copy is skipped, a new export is added
+    shutil.copy(raw / "export-1.csv", raw / "export-1-copy.csv")
+    _export(raw / "export-2.csv", "Troy Issac,2024/12/20,,MAC&CHEESE,2,6,12")
+
+    second = ingest_orders(raw, out, workers=1)
+    assert (second["files"], second["skipped"], second["rows_added"]) == (1, 2, 1)
+
+    # Exports merged by an interrupted run are not duplicated when merged again
+    (out / "_manifest.json").unlink()
+    third = ingest_orders(raw, out, workers=1)
+    assert (third["files"], third["rows_read"], third["rows_added"]) == (2, 4, 0)
+
+    orders = pd.read_parquet(out)
+    assert len(orders) == 4
+    assert orders.groupby("month", observed=True).size().to_dict() == {"2024-08": 2,
+                                                                       "2024-12": 2}
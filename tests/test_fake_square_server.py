@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+from app.db_models import AccessToken, Order, OrderLineItem, Payment
+from belly_rubb.etl import OrdersAPI, PaymentAPI, TokenProvider
+from belly_rubb.etl import token_provider
+from belly_rubb.etl.token_provider import TokenCache
+from belly_rubb.etl.client_factory import square_client
+from tests.fakes.fake_square import FakeSquareClient, generate_orders, generate_payments
+from tests.fakes.fake_square_server import FakeSquareServer
+
+
+def _count(session, model):
+    return session.execute(select(func.count()).select_from(model)).scalar_one()
+
+
+@pytest.fixture
+def server():
+    fake = FakeSquareClient(payments=generate_payments(120), orders=generate_orders(80))
+    with FakeSquareServer(fake, error_rate=0.2, seed=7) as fake_server:
+        yield fake_server
+
+
+def test_sync_over_http_survives_injected_throttling(session_db, server):
+    client = square_client(token="FAKE", base_url=server.base_url)
+
+    PaymentAPI(merchant_id="FAKE", client=client).sync_payments(page_limit=50)
+    OrdersAPI(merchant_id="FAKE", client=client).sync_orders(page_limit=50)
+
+    assert _count(session_db, Payment) == 120
+    assert _count(session_db, Order) == 80
+    assert _count(session_db, OrderLineItem) > 80
+    assert sum(count for (_, status), count in server.responses.items() if status == 429) > 0
+
+
+def test_updated_at_filter_and_cursor_are_served(server):
+    server.error_rate = 0
+    client = square_client(token="FAKE", base_url=server.base_url)
+
+    pager = client.payments.list(limit=30, updated_at_begin_time="2024-01-01T01:00:00Z")
+
+    assert len(pager.items) == 30
+    assert len(list(pager)) == 60
+    assert server.responses[("/v2/payments", 200)] == 2
+
+
+def test_requests_without_token_are_rejected(server):
+    response = httpx.get(f"{server.base_url}/v2/payments")
+
+    assert response.status_code == 401
+    assert response.json()["errors"][0]["category"] == "AUTHENTICATION_ERROR"
+
+
+def test_expired_tokens_are_refreshed_from_the_server(session_db, server, monkeypatch):
+    monkeypatch.setattr(token_provider, "POST_TOKEN_URL", f"{server.base_url}/oauth2/token")
+    now = datetime.now(timezone.utc)
+    session_db.add(AccessToken(
+        merchant_id="MERCHANT",
+        access_token="EXPIRED",
+        expires_at=now - timedelta(days=1),
+        refresh_token="REFRESH",
+        refresh_token_expires_at=now + timedelta(days=30),
+    ))
+    session_db.commit()
+
+    # A cache of its own, so neither the process-wide cache nor its refresh timer is touched
+    cache = TokenCache()
+    try:
+        token = TokenProvider(cache=cache).get_access_token("MERCHANT")
+    finally:
+        cache.clear()
+
+    assert token.startswith("FAKE-")
+    assert server.responses[("/oauth2/token", 200)] == 1
@@ -0,0 +1,58 @@
+import pandas as pd
+
+from belly_rubb.features import ItemStandardizer, compile_synonyms
+
+SYNONYMS = {
+    "beef back ribs": {
+        "base_name": "beef back ribs",
+        "aliases": ["BEEF BACK RIBS", "Beef Back Ribs"],
+        "variations": {"full rack": ["Full Rack", "Whole Rack"], "half rack": ["Half Rack"]},
+    },
+    "marsh'n'cookie": {
+        "base_name": "marshncookie",
+        "aliases": ["MARSH’n’COOKIE"],
+        "variations": {"regular": ["Regular"]},
+    },
+}
+
+
+def test_synonyms_compile_to_lowercase_reverse_maps():
+    index = compile_synonyms(SYNONYMS)
+
+    assert index.alias_to_base == {"beef back ribs": "beef back ribs",
+                                   "marsh’n’cookie": "marsh'n'cookie"}
+    assert index.variation_map == {"full rack": "full rack", "whole rack": "full rack",
+                                   "half rack": "half rack", "regular": "regular"}
+    assert index.parenthesized["beef back ribs (whole rack)"] == ("beef back ribs", "full rack")
+    assert len(index.parenthesized) == 4
+
+
+def test_rows_are_standardized_through_unique_pairs():
+    standardizer = ItemStandardizer(compile_synonyms(SYNONYMS))
+    df = pd.DataFrame({
+        "Item Name": ["BEEF BACK RIBS", "Beef Back Ribs (Half Rack)", "BEEF BACK RIBS",
+                      "CHOP-CHOP", None],
+        "Item Variation": ["Whole Rack", "Regular", "Whole Rack", "Large", "Half Rack"],
+    })
+
+    pairs, pair_codes = standardizer.unique_pairs(df)
+    standardized = standardizer.standardize(df)
+
+    assert len(pairs) == 4
+    assert pair_codes.tolist() == [0, 1, 0, 2, 3]
+    assert standardized["std_name"].tolist()[:4] == ["beef back ribs"] * 3 + ["chop-chop"]
+    assert standardized["std_variation"].tolist() == ["full rack", "half rack", "full rack",
+                                                      "large", "half rack"]
+    assert pd.isna(standardized["std_name"].iloc[4])
+    assert standardized["std_name"].dtype == "category"
+
+
+def test_categorical_columns_are_standardized_from_their_codes():
+    standardizer = ItemStandardizer(compile_synonyms(SYNONYMS))
+    df = pd.DataFrame({"Item Name": ["MARSH’n’COOKIE", "BEEF BACK RIBS"] * 3,
+                       "Item Variation": ["Regular", "Full Rack"] * 3}).astype("category")
+
+    standardized = standardizer.standardize(df)
+
+    assert standardized["std_name"].tolist() == ["marsh'n'cookie", "beef back ribs"] * 3
+    assert standardized["std_variation"].tolist() == ["regular", "full rack"] * 3
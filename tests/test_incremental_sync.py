@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from app.db_models import Payment, SyncState
+from app.db_models.types import to_utc
+from app.pkce_flow import iso_to_utc
+from belly_rubb.config import SYNC_OVERLAP_WINDOW
+from belly_rubb.etl import CustomerAPI, PaymentAPI, SyncWatermark
+from tests.fakes.fake_square import (
+    DEFAULT_START,
+    FakeSquareClient,
+    generate_customers,
+    generate_payments,
+)
+
+WATERMARK = DEFAULT_START + timedelta(minutes=89, seconds=30)
+
+
+def test_payments_push_watermark_down_to_square(session_db):
+    session_db.add(SyncState(resource="payments", last_synced=iso_to_utc(WATERMARK)))
+    session_db.commit()
+    client = FakeSquareClient(payments=generate_payments(100))
+
+    PaymentAPI(merchant_id="FAKE", client=client).sync_payments(page_limit=4)
+
+    endpoint, request = client.calls[0]
+    assert endpoint == "payments.list"
+    assert request["updated_at_begin_time"] == iso_to_utc(WATERMARK - SYNC_OVERLAP_WINDOW)
+    # Only the 10 changed payments and the 5 in the overlap window are downloaded, in 4 pages
+    assert len(client.calls) == 4
+    assert session_db.execute(select(func.count()).select_from(Payment)).scalar_one() == 15
+
+
+def test_first_payment_sync_downloads_everything(session_db):
+    client = FakeSquareClient(payments=generate_payments(20))
+
+    PaymentAPI(merchant_id="FAKE", client=client).sync_payments(page_limit=50)
+
+    assert client.calls[0][1]["updated_at_begin_time"] is None
+    assert session_db.execute(select(func.count()).select_from(Payment)).scalar_one() == 20
+
+
+def test_customers_search_filters_on_updated_at():
+    client = FakeSquareClient(customers=generate_customers(100))
+    api = CustomerAPI(merchant_id="FAKE", client=client)
+
+    pages = list(api.extract(SyncWatermark("customers", WATERMARK), page_limit=4))
+
+    endpoint, request = client.calls[0]
+    assert endpoint == "customers.search"
+    assert request["query"]["filter"]["updated_at"]["start_at"] == iso_to_utc(WATERMARK)
+    assert sum(len(page[api.model]) for page in pages) == 10
+    assert all(endpoint == "customers.search" for endpoint, _ in client.calls)
+
+
+def test_watermark_is_the_latest_stored_update(session_db):
+    payments = generate_payments(20)
+    PaymentAPI(merchant_id="FAKE", client=FakeSquareClient(payments=payments)).sync_payments()
+
+    state = session_db.execute(select(SyncState)).scalar_one()
+    assert state.last_synced == to_utc(payments[-1].updated_at)
+
+    # A rerun without changes re-reads the overlap window and keeps the watermark
+    client = FakeSquareClient(payments=payments)
+    PaymentAPI(merchant_id="FAKE", client=client).sync_payments()
+
+    session_db.expire_all()
+    assert client.calls[0][1]["updated_at_begin_time"] == \
+        iso_to_utc(DEFAULT_START + timedelta(minutes=19) - SYNC_OVERLAP_WINDOW)
+    assert session_db.execute(select(SyncState)).scalar_one().last_synced == state.last_synced
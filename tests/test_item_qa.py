@@ -0,0 +1,50 @@
+import pandas as pd
+
+from belly_rubb.features import ItemStandardizer, compile_synonyms
+from belly_rubb.item_qa import ScoreCache, match_report, suggest_canonical
+
+SYNONYMS = {
+    "baby back pork ribs": {
+        "base_name": "baby back pork ribs",
+        "aliases": ["BABY BACK PORK RIBS", "GET YOUR BABY BACK!"],
+        "variations": {"full rack": ["Full Rack"], "half rack": ["Half Rack"]},
+    },
+    "artisan mac and cheese": {
+        "base_name": "artisan mac and cheese",
+        "aliases": ["ARTISAN MAC AND CHEESE", "MAC&CHEESE"],
+        "variations": {"side": ["Side", "8oz"]},
+    },
+}
+
+
+def test_unique_pairs_are_scored_once_and_cached(tmp_path):
+    standardizer = ItemStandardizer(compile_synonyms(SYNONYMS))
+    orders = pd.DataFrame({
+        "Item Name": ["BABY BACK PORK RIBS", "GET YOUR BABY BACK!", "Artisan Mac & Cheese"] * 500,
+        "Item Variation": ["Full Rack", "Half Rack", "8oz"] * 500,
+    })
+    cache = ScoreCache(tmp_path / "scores.json")
+
+    report = match_report(orders, standardizer, cache)
+    cache.save()
+
+    names = report[report["kind"] == "name"].set_index("raw")
+    assert len(report) == 6
+    assert names.loc["baby back pork ribs", "fuzzy_match"]
+    assert names.loc["baby back pork ribs", "line_items"] == 500
+    assert not names.loc["get your baby back!", "fuzzy_match"]
+    assert not names.loc["artisan mac & cheese", "in_synonyms"]
+    assert names.loc["artisan mac & cheese", "suggestions"].startswith("artisan mac and cheese")
+
+    reloaded = ScoreCache(tmp_path / "scores.json")
+    assert len(reloaded) == 6
+    assert reloaded.scores(["get your baby back!"], ["baby back pork ribs"]).tolist() == [
+        names.loc["get your baby back!", "score"]]
+
+
+def test_suggestions_rank_menu_items_by_their_best_alias():
+    index = compile_synonyms(SYNONYMS)
+
+    suggestions = suggest_canonical(["mac cheese", "baby back ribz"], index, limit=1)
+
+    assert [s[0][0] for s in suggestions] == ["artisan mac and cheese", "baby back pork ribs"]
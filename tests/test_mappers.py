@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, text
+from square.types.payment import Payment as SquarePayment
+
+from app.db_models import Group, GroupMembership
+from app.migrations import migrate
+from belly_rubb.etl import CustomerAPI, GroupsAPI
+from belly_rubb.etl.bulk_upsert import PageWriter
+from belly_rubb.etl.mappers import PAYMENT_MAPPER, Field, RecordMapper, parse_timestamp
+from belly_rubb.etl.orchestrator import SOURCES
+from tests.fakes.fake_square import (
+    DEFAULT_START,
+    FakeSquareClient,
+    generate_customers,
+    generate_groups,
+    generate_payments,
+)
+
+
+def test_payment_mapper_reads_money_amounts():
+    payment = generate_payments(1)[0]
+
+    row = PAYMENT_MAPPER.map(payment)
+
+    assert row["total_money"] == 1250
+    assert row["approved_money"] == 1250
+    assert row["currency"] == "USD"
+    assert row["card_brand"] == "VISA"
+    assert row["status"] == "COMPLETED"
+    assert row["updated_at"] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_missing_nested_records_map_to_none():
+    row = PAYMENT_MAPPER.map(SquarePayment(id="P1", created_at="2024-01-01T00:00:00Z"))
+
+    assert row["id"] == "P1"
+    assert row["card_brand"] is None
+    assert row["amount"] is None
+    assert row["updated_at"] is None
+
+
+def test_invalid_paths_are_rejected():
+    with pytest.raises(ValueError):
+        RecordMapper([Field("id", "id; import os")])
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-01-01T00:00:00Z", datetime(2024, 1, 1, tzinfo=timezone.utc)),
+    ("2024-01-01T00:00:00.123Z", datetime(2024, 1, 1, 0, 0, 0, 123000, tzinfo=timezone.utc)),
+    ("2024-01-01T02:00:00.1+02:00", datetime(2024, 1, 1, 0, 0, 0, 100000, tzinfo=timezone.utc)),
+])
+def test_timestamps_are_parsed(value, expected):
+    assert parse_timestamp(value) == expected
+
+
+def test_groups_are_synchronized(session_db):
+    client = FakeSquareClient(groups=generate_groups(12))
+
+    GroupsAPI(merchant_id="FAKE", client=client).sync_groups(page_limit=5)
+
+    assert [endpoint for endpoint, _ in client.calls] == ["customers.groups.list"] * 3
+    assert session_db.execute(select(func.count()).select_from(Group)).scalar_one() == 12
+    assert session_db.get(Group, "GROUP000000003").name == "Group 3"
+    assert session_db.get(Group, "GROUP000000003").updated_at == \
+        DEFAULT_START + timedelta(minutes=3)
+    assert SOURCES["groups"] is GroupsAPI
+
+
+def test_group_memberships_are_stored_with_their_customers(session_db):
+    client = FakeSquareClient(customers=generate_customers(10, groups=3))
+
+    CustomerAPI(merchant_id="FAKE", client=client).sync_customers(page_limit=4)
+
+    memberships = session_db.execute(
+        select(GroupMembership.group_id, func.count()).group_by(GroupMembership.group_id)
+    ).all()
+    assert memberships == [("GROUP000000000", 4), ("GROUP000000001", 3), ("GROUP000000002", 3)]
+
+
+def test_group_memberships_are_replaced_by_newer_customer_versions(session_db):
+    def page(version, group_ids):
+        customer = generate_customers(1, step=timedelta(hours=version), first=1)[0]
+        return CustomerAPI.map_page([customer.model_copy(update={"group_ids": group_ids})])
+
+    def group_ids():
+        return session_db.scalars(
+            select(GroupMembership.group_id).order_by(GroupMembership.group_id)).all()
+
+    writer = PageWriter(chunk_size=1)
+    for version, groups in ((1, ["A", "B"]), (2, ["A"]), (1, ["A", "B"])):
+        writer.write(page(version, groups), session_db)
+        writer.flush(session_db)
+
+    # The replayed first version neither restores 'B' nor rolls 'A' back
+    assert group_ids() == ["A"]
+    assert session_db.scalars(select(GroupMembership.updated_at)).one() == \
+        DEFAULT_START + timedelta(hours=2)
+
+
+def test_migration_versions_groups_and_deduplicates_memberships(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE groups (id VARCHAR PRIMARY KEY, name VARCHAR)"))
+        conn.execute(text(
+            "CREATE TABLE group_memberships (id INTEGER PRIMARY KEY, customer_id VARCHAR, "
+            "group_id VARCHAR)"))
+        conn.execute(text("INSERT INTO group_memberships (customer_id, group_id) VALUES "
+                          "('C1', 'G1'), ('C1', 'G1'), ('C1', 'G2')"))
+
+    migrate(engine)
+    migrate(engine)
+
+    assert {"created_at", "updated_at"} <= \
+        {column["name"] for column in inspect(engine).get_columns("groups")}
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("group_memberships")}
+    assert indexes["ix_group_memberships_customer_id_group_id"]["unique"]
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, group_id FROM group_memberships ORDER BY id")).all()
+    assert rows == [(1, "G1"), (3, "G2")]
@@ -0,0 +1,79 @@
+import httpx
+
+from app.metrics import METRICS, Histogram, MetricsRegistry
+from app.pkce_flow import app as flask_app
+from app.rate_limit import RequestScheduler
+from belly_rubb.etl import OrdersAPI, PaymentAPI, SyncOrchestrator
+from tests.fakes.fake_square import FakeSquareClient, generate_orders, generate_payments
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram((1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3, 10):
+        histogram.observe(value)
+
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == 1.75
+    assert histogram.quantile(0.99) == 4
+
+
+def test_prometheus_text_has_cumulative_buckets():
+    registry = MetricsRegistry()
+    registry.inc("sync_records_decoded_total", 3, resource="payments")
+    registry.observe("sync_upsert_rows", 7, buckets=(5, 10), table='odd"name')
+
+    lines = registry.prometheus_text().splitlines()
+
+    assert "# TYPE sync_records_decoded_total counter" in lines
+    assert 'sync_records_decoded_total{resource="payments"} 3' in lines
+    assert 'sync_upsert_rows_bucket{table="odd\\"name",le="5.0"} 0' in lines
+    assert 'sync_upsert_rows_bucket{table="odd\\"name",le="10.0"} 1' in lines
+    assert 'sync_upsert_rows_bucket{table="odd\\"name",le="+Inf"} 1' in lines
+    assert 'sync_upsert_rows_count{table="odd\\"name"} 1' in lines
+
+
+def test_sync_run_summarizes_every_stage(session_db):
+    client = FakeSquareClient(payments=generate_payments(120), orders=generate_orders(30))
+    orchestrator = SyncOrchestrator([
+        PaymentAPI(merchant_id="FAKE", client=client),
+        OrdersAPI(merchant_id="FAKE", client=client),
+    ], page_limit=50)
+
+    orchestrator.run()
+    metrics = orchestrator.metrics
+
+    assert metrics["sync_fetch_seconds"]["resource=payments"]["count"] == 3
+    assert metrics["sync_map_seconds"]["resource=orders"]["count"] == 1
+    assert metrics["sync_records_decoded_total"]["resource=payments"] == 120
+    assert metrics["sync_records_filtered_total"]["decision=kept,resource=payments"] == 120
+    assert metrics["sync_upsert_rows"]["table=order_line_items"]["sum"] > 30
+    assert metrics["sync_commit_seconds"]["resource=payments"]["count"] >= 1
+
+
+def test_retries_and_throttles_are_counted():
+    statuses = iter([429, 503, 200])
+    transport = httpx.MockTransport(lambda request: httpx.Response(
+        next(statuses), headers={"Retry-After": "0"}))
+    client = httpx.Client(transport=RequestScheduler(transport, backoff_initial=0.01),
+                          base_url="http://square.test")
+    snapshot = METRICS.snapshot()
+
+    client.get("/v2/metrics-test")
+    metrics = METRICS.summary(since=snapshot)
+
+    assert metrics["square_throttles_total"] == {"endpoint=GET /v2/metrics-test": 1}
+    assert metrics["square_retries_total"] == {
+        "endpoint=GET /v2/metrics-test,status=429": 1,
+        "endpoint=GET /v2/metrics-test,status=503": 1,
+    }
+    assert metrics["square_request_seconds"]["endpoint=GET /v2/metrics-test"]["count"] == 3
+
+
+def test_metrics_route_serves_prometheus_text():
+    METRICS.inc("sync_records_decoded_total", 0, resource="route-test")
+
+    response = flask_app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'sync_records_decoded_total{resource="route-test"} 0' in response.get_data(as_text=True)
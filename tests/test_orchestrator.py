@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db_models import Customer, Group, SyncState
+from belly_rubb.etl import SyncOrchestrator
+from belly_rubb.etl.checkpoint import SyncPage
+
+PAGE_DELAY = 0.1
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeSource:
+    def __init__(self, resource, model, pages, fail=False):
+        self.resource = resource
+        self.model = model
+        self.pages = pages
+        self.fail = fail
+        self.threads = set()
+
+    def extract(self, watermark, page_limit=50):
+        self.threads.add(threading.current_thread().name)
+        for page in range(self.pages):
+            time.sleep(PAGE_DELAY)
+            if self.fail:
+                raise ValueError("boom")
+            rows = [{"id": f"{self.resource}-{page}-{i}"} for i in range(page_limit)]
+            yield SyncPage({self.model: rows}, high_water_mark=START + timedelta(hours=page))
+
+
+def _count(session, model):
+    return session.execute(select(func.count()).select_from(model)).scalar_one()
+
+
+def test_sources_are_fetched_concurrently(session_db):
+    groups = FakeSource("groups", Group, pages=3)
+    customers = FakeSource("customers", Customer, pages=3)
+
+    start = time.perf_counter()
+    counts = SyncOrchestrator([groups, customers], page_limit=10, queue_size=1).run()
+    elapsed = time.perf_counter() - start
+
+    assert counts == {"groups": 30, "customers": 30}
+    assert elapsed < 6 * PAGE_DELAY
+    assert groups.threads != customers.threads
+    assert _count(session_db, Group) == 30
+    assert _count(session_db, SyncState) == 2
+
+
+def test_failed_source_does_not_advance_sync_state(session_db):
+    groups = FakeSource("groups", Group, pages=2)
+    customers = FakeSource("customers", Customer, pages=2, fail=True)
+
+    with pytest.raises(RuntimeError, match="customers"):
+        SyncOrchestrator([groups, customers], page_limit=10).run()
+
+    states = dict(session_db.execute(select(SyncState.resource, SyncState.last_synced)).all())
+    assert states["groups"] == START + timedelta(hours=1)
+    assert states["customers"] is None
+
+
+def test_empty_pages_advance_the_checkpoint(session_db):
+    class EmptyPages(FakeSource):
+        def extract(self, watermark, page_limit=50):
+            yield SyncPage({self.model: [{"id": "G1"}]}, cursor="1")
+            yield SyncPage({self.model: []}, cursor="2")
+            raise ValueError("boom")
+
+    groups = EmptyPages("groups", Group, pages=2)
+
+    with pytest.raises(RuntimeError, match="groups"):
+        SyncOrchestrator([groups], page_limit=10).run()
+
+    state = session_db.execute(select(SyncState).where(SyncState.resource == "groups")).scalar_one()
+    assert state.cursor == "2"
+    assert _count(session_db, Group) == 1
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db_models import Order, OrderLineItem, SyncState
+from app.pkce_flow import iso_to_utc
+from belly_rubb.config import SYNC_OVERLAP_WINDOW
+from belly_rubb.etl import OrdersAPI
+from belly_rubb.etl.bulk_upsert import PageWriter
+from tests.fakes.fake_square import DEFAULT_START, FakeSquareClient, generate_orders
+from belly_rubb.queries import item_counts
+
+
+def _count(session):
+    return session.execute(select(func.count()).select_from(Order)).scalar_one()
+
+
+def test_orders_are_searched_incrementally(session_db):
+    watermark = DEFAULT_START + timedelta(minutes=249, seconds=30)
+    session_db.add(SyncState(resource="orders", last_synced=iso_to_utc(watermark)))
+    session_db.commit()
+    client = FakeSquareClient(orders=generate_orders(300))
+
+    OrdersAPI(merchant_id="FAKE", client=client).sync_orders(page_limit=20)
+
+    searches = [request for endpoint, request in client.calls if endpoint == "orders.search"]
+    assert searches[0]["query"]["filter"]["date_time_filter"]["updated_at"]["start_at"] == \
+        iso_to_utc(watermark - SYNC_OVERLAP_WINDOW)
+    assert searches[0]["location_ids"] == ["LOCATION"]
+    # The 50 changed orders plus the 5 in the overlap window
+    assert len(searches) == 3
+    assert _count(session_db) == 55
+
+
+@pytest.mark.parametrize("hydrate", [False, True])
+def test_full_sync_stores_every_order(session_db, hydrate):
+    client = FakeSquareClient(orders=generate_orders(250))
+
+    OrdersAPI(merchant_id="FAKE", client=client).sync_orders(page_limit=200, hydrate=hydrate)
+
+    batches = [request for endpoint, request in client.calls if endpoint == "orders.batch_get"]
+    assert [len(batch["order_ids"]) for batch in batches] == ([100, 100, 50] if hydrate else [])
+    assert _count(session_db) == 250
+
+
+def test_line_items_are_stored_with_their_orders(session_db):
+    client = FakeSquareClient(orders=generate_orders(30))
+
+    OrdersAPI(merchant_id="FAKE", client=client).sync_orders(page_limit=7)
+
+    assert item_counts(session_db) == [
+        ("Brisket Sandwich", 30),
+        ("Pulled Pork Plate", 20),
+        ("Mac and Cheese", 10),
+    ]
+    line_item = session_db.execute(select(OrderLineItem).limit(1)).scalar_one()
+    assert line_item.order_id == "ORDER000000000"
+    assert line_item.quantity == 1.0
+    assert line_item.gross_sales_money == 1450
+
+
+def test_line_items_are_replaced_by_newer_order_versions(session_db):
+    def page(version, uids):
+        updated_at = DEFAULT_START + timedelta(hours=version)
+        return {
+            Order: [{"id": "ORDER", "location_id": "LOCATION", "created_at": DEFAULT_START,
+                     "updated_at": updated_at, "customer_id": None}],
+            OrderLineItem: [{"order_id": "ORDER", "uid": uid, "name": uid, "quantity": 1.0,
+                             "created_at": DEFAULT_START, "updated_at": updated_at}
+                            for uid in uids],
+        }
+
+    def uids():
+        return session_db.scalars(select(OrderLineItem.uid).order_by(OrderLineItem.uid)).all()
+
+    writer = PageWriter(chunk_size=1)
+    for version, items in ((1, ["A", "B"]), (2, ["A"]), (1, ["A", "B"])):
+        writer.write(page(version, items), session_db)
+        writer.flush(session_db)
+
+    # The replayed first version neither restores 'B' nor rolls 'A' back
+    assert uids() == ["A"]
+    assert session_db.scalars(select(OrderLineItem.updated_at)).one() == \
+        DEFAULT_START + timedelta(hours=2)
+
+    writer.write(page(3, []), session_db)
+    writer.flush(session_db)
+
+    assert uids() == []
@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+from square.core.pagination import SyncPager
+
+from belly_rubb.etl.pager import PrefetchPager
+
+
+def _pager(pages: list, fail_at=None, fetched=None):
+    def build(index):
+        if index == fail_at:
+            raise ConnectionError("page failed")
+        if fetched is not None:
+            fetched.append(index)
+        return SyncPager(
+            has_next=index + 1 < len(pages),
+            items=pages[index],
+            get_next=lambda: build(index + 1),
+            response=None,
+        )
+
+    return build(0)
+
+
+@pytest.mark.parametrize("depth", [0, 1, 3])
+def test_pages_are_yielded_in_order(depth):
+    pages = [[1, 2], [3, 4], [5]]
+
+    assert list(PrefetchPager(_pager(pages), depth=depth)) == pages
+
+
+def test_fetch_errors_are_raised_in_consumer():
+    pager = PrefetchPager(_pager([[1], [2], [3]], fail_at=2), depth=2)
+
+    with pytest.raises(ConnectionError):
+        list(pager)
+
+
+def test_read_ahead_is_bounded():
+    fetched = []
+    pages = iter(PrefetchPager(_pager([[i] for i in range(50)], fetched=fetched), depth=2))
+
+    assert next(pages) == [0]
+    threading.Event().wait(0.2)
+    pages.close()
+
+    # Current page, two queued pages and the one blocked on the full queue
+    assert len(fetched) <= 4
@@ -0,0 +1,46 @@
+from sqlalchemy import select
+
+from app.db import engine, etl_engine
+from app.db_models.sync_state import SyncState
+from app.profiling import SQLProfiler, normalize_statement
+from belly_rubb.etl import PaymentAPI
+from tests.fakes.fake_square import FakeSquareClient, generate_payments
+
+
+def test_normalize_statement_collapses_literals_and_lists():
+    assert normalize_statement(
+        "SELECT *\n  FROM payments WHERE id IN (?, ?, ?) AND amount > 10 AND note = 'it''s'"
+    ) == "SELECT * FROM payments WHERE id IN (...) AND amount > ? AND note = ?"
+    assert normalize_statement(
+        "INSERT INTO orders (id, total) VALUES (?, ?), (?, ?), (?, ?)"
+    ) == "INSERT INTO orders (id, total) VALUES (...)"
+
+
+def test_per_record_select_is_flagged_as_n_plus_one(session_db, tmp_path):
+    with SQLProfiler(engine, python=True, n_plus_one_threshold=20) as profiler:
+        for _ in range(25):
+            session_db.execute(
+                select(SyncState).where(SyncState.resource == "payments")).scalars().first()
+
+    flagged = profiler.n_plus_one()
+    assert len(flagged) == 1
+    assert flagged[0].calls == 25
+    assert "FROM sync_states" in flagged[0].statement
+
+    report = profiler.write_report(tmp_path / "sql_profile.txt").read_text()
+    assert "Possible N+1 patterns" in report
+    assert "Python profile, by cumulative time" in report
+    assert (tmp_path / "sql_profile.prof").exists()
+
+
+def test_sync_upserts_are_aggregated_per_statement(session_db):
+    client = FakeSquareClient(payments=generate_payments(120))
+
+    with SQLProfiler(etl_engine) as profiler:
+        PaymentAPI(merchant_id="FAKE", client=client).sync_payments(page_limit=50)
+    stats = {s.statement: s for s in profiler.stats()}
+
+    upserts = [s for statement, s in stats.items() if statement.startswith("INSERT INTO payments")]
+    assert len(upserts) == 1
+    assert upserts[0].rows == 120
+    assert not profiler.n_plus_one()
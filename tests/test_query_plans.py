@@ -0,0 +1,86 @@
+"""
+Query-plan regression tests for the analytical queries in 'belly_rubb.queries'.
+
+Each query is run against a seeded database while its SQL is captured, then explained with
+'EXPLAIN QUERY PLAN'. A query fails if any step scans a table or builds an automatic index,
+which means an index it relies on is missing.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, text
+
+from app.db import engine
+from app.db_models import Customer, Group, GroupMembership, Order, OrderLineItem, Payment
+from belly_rubb import queries
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = START + timedelta(days=7)
+
+CANONICAL_QUERIES = [
+    (queries.item_counts, (START, END)),
+    (queries.item_variation_counts, (START, END)),
+    (queries.customer_payments, ("C1",)),
+    (queries.location_sales, ("L1", START, END)),
+    (queries.group_customers, ("G1",)),
+    (queries.customer_groups, ("C1",)),
+]
+
+
+@pytest.fixture
+def seeded_db(session_db):
+    session_db.add_all(Group(id=f"G{i}", name=f"group {i}") for i in range(5))
+    for i in range(50):
+        created_at = START + timedelta(hours=i)
+        session_db.add(Customer(id=f"C{i}", created_at=created_at, updated_at=created_at))
+        session_db.add(GroupMembership(customer_id=f"C{i}", group_id=f"G{i % 5}"))
+        session_db.add(Order(id=f"O{i}", location_id=f"L{i % 3}", customer_id=f"C{i % 10}",
+                             created_at=created_at, updated_at=created_at))
+        session_db.add(Payment(id=f"P{i}", order_id=f"O{i}", location_id=f"L{i % 3}",
+                               created_at=created_at, updated_at=created_at,
+                               total_money=10.0, currency="USD"))
+        session_db.add(OrderLineItem(order_id=f"O{i}", uid="1", name=f"item {i % 4}",
+                                     variation_name="Regular", created_at=created_at))
+    session_db.commit()
+    session_db.execute(text("ANALYZE"))
+
+    yield session_db
+
+
+def _explain(function, args, session) -> list:
+    """
+    Runs a query function and returns the query plan of the last statement it executed.
+    """
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        function(session, *args)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    statement, parameters = captured[-1]
+    plan = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+
+    return [row[3] for row in plan]
+
+
+@pytest.mark.parametrize("function, args", CANONICAL_QUERIES,
+                         ids=[function.__name__ for function, _ in CANONICAL_QUERIES])
+def test_analytical_queries_use_indexes(seeded_db, function, args):
+    plan = _explain(function, args, seeded_db)
+
+    scans = [step for step in plan if step.startswith("SCAN") or "AUTOMATIC" in step]
+    assert not scans, f"{function.__name__} falls back to a scan: {plan}"
+
+
+def test_analytical_queries_return_seeded_rows(seeded_db):
+    assert {payment.id for payment in queries.customer_payments(seeded_db, "C1")} == \
+        {"P1", "P11", "P21", "P31", "P41"}
+    assert queries.location_sales(seeded_db, "L1", START, START + timedelta(hours=10)) == \
+        [("USD", 3, 30.0)]
+    assert len(queries.group_customers(seeded_db, "G1")) == 10
+    assert [group.id for group in queries.customer_groups(seeded_db, "C1")] == ["G1"]
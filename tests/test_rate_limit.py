@@ -0,0 +1,88 @@
+import threading
+import time
+
+import httpx
+
+from app.rate_limit import RATE_LIMIT_KEY_HEADER, RequestScheduler, TokenBucket
+
+
+def _scheduler(statuses: list, seen: list, **kwargs) -> httpx.Client:
+    responses = iter(statuses)
+
+    def handler(request):
+        seen.append(request)
+        status, headers = next(responses)
+        return httpx.Response(status, headers=headers, json={})
+
+    kwargs.setdefault("backoff_initial", 0.01)
+    scheduler = RequestScheduler(httpx.MockTransport(handler), **kwargs)
+    return httpx.Client(transport=scheduler, base_url="http://square.test")
+
+
+def test_throttled_and_failed_pages_are_retried():
+    seen = []
+    client = _scheduler([(429, {"Retry-After": "0"}), (503, {}), (200, {})], seen)
+
+    response = client.get("/v2/payments", headers={RATE_LIMIT_KEY_HEADER: "MERCHANT"})
+
+    assert response.status_code == 200
+    assert len(seen) == 3
+    assert all(RATE_LIMIT_KEY_HEADER not in request.headers for request in seen)
+
+
+def test_retry_after_is_honoured():
+    seen = []
+    client = _scheduler([(429, {"Retry-After": "0.2"}), (200, {})], seen)
+
+    start = time.perf_counter()
+    client.get("/v2/payments")
+
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_last_response_is_returned_after_max_retries():
+    seen = []
+    client = _scheduler([(500, {})] * 3, seen, max_retries=2)
+
+    assert client.get("/v2/payments").status_code == 500
+    assert len(seen) == 3
+
+
+def test_server_errors_are_only_retried_for_idempotent_requests():
+    seen = []
+    client = _scheduler([(503, {}), (429, {"Retry-After": "0"}), (200, {})], seen)
+
+    # The token exchange may have been applied, so only throttling is retried
+    assert client.post("/oauth2/token", json={}).status_code == 503
+    assert client.post("/oauth2/token", json={}).status_code == 200
+    assert len(seen) == 3
+
+    seen.clear()
+    client = _scheduler([(503, {}), (200, {})], seen)
+    assert client.post("/v2/orders/search", json={}).status_code == 200
+    assert len(seen) == 2
+
+
+def test_throttling_lowers_the_bucket_rate():
+    seen = []
+    client = _scheduler([(429, {"Retry-After": "0"}), (200, {})], seen, rate=8.0, burst=4)
+
+    client.get("/v2/customers/search", headers={RATE_LIMIT_KEY_HEADER: "MERCHANT"})
+    bucket = client._transport.bucket("MERCHANT", "GET /v2/customers/search")
+
+    # Halved by the 429, then raised by a tenth of the maximum on success
+    assert bucket.rate == 4.8
+
+
+def test_token_bucket_spaces_out_concurrent_requests():
+    bucket = TokenBucket(rate=50.0, burst=1)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The first token is in the bucket, the other five arrive at 50 per second
+    assert time.perf_counter() - start >= 0.09
@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.storage import apply_storage_profile, storage_pragmas
+
+
+def test_etl_bulk_profile_is_applied_to_new_connections(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    apply_storage_profile(engine, "etl-bulk")
+
+    pragmas = storage_pragmas(engine)
+
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["synchronous"] == 1
+    assert pragmas["cache_size"] == -64_000
+    assert pragmas["temp_store"] == 2
+    assert pragmas["busy_timeout"] == 30_000
+
+
+def test_default_profile_keeps_the_rollback_journal(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'default.db'}")
+    apply_storage_profile(engine, "default")
+
+    assert storage_pragmas(engine)["journal_mode"] == "delete"
+
+
+def test_app_engine_keeps_sqlite_defaults_when_etl_modules_are_loaded(tmp_path):
+    # The engines are created at import time, so a fresh process sees a fresh database
+    script = (
+        "import json\n"
+        "import belly_rubb.etl\n"
+        "from app.db import engine, etl_engine\n"
+        "from app.storage import storage_pragmas\n"
+        "app_pragmas = storage_pragmas(engine)\n"
+        "print(json.dumps([app_pragmas, storage_pragmas(etl_engine)]))\n"
+    )
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("SQLITE_STORAGE_PROFILE", "ETL_STORAGE_PROFILE")}
+    env["DB_PATH"] = f"sqlite:///{tmp_path / 'app.db'}"
+
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True,
+                            text=True, check=True)
+    app_pragmas, etl_pragmas = json.loads(result.stdout.splitlines()[-1])
+
+    assert app_pragmas["journal_mode"] == "delete"
+    assert app_pragmas["synchronous"] == 2
+    assert etl_pragmas["journal_mode"] == "wal"
+    assert etl_pragmas["synchronous"] == 1
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError, match="Unknown storage profile"):
+        apply_storage_profile(create_engine("sqlite://"), "fastest")
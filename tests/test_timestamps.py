@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, func, inspect, select, text
+
+from app.db_models import Payment
+from app.migrations import migrate
+from app.db_models.types import to_utc
+
+
+def test_timestamps_are_stored_in_utc(session_db):
+    session_db.add(Payment(id="P1", created_at="2024-01-01T10:00:00+02:00",
+                           updated_at=datetime(2024, 1, 1, 9, tzinfo=timezone(timedelta(hours=1)))))
+    session_db.add(Payment(id="P2", created_at="2024-01-01T08:30:00Z",
+                           updated_at="2024-01-01T08:30:00Z"))
+    session_db.commit()
+
+    payment = session_db.get(Payment, "P1")
+    assert payment.created_at == datetime(2024, 1, 1, 8, tzinfo=timezone.utc)
+    assert payment.created_at.tzinfo is timezone.utc
+
+    # Offsets no longer decide the order, so MAX() returns the latest update
+    latest = session_db.execute(select(func.max(Payment.updated_at))).scalar_one()
+    assert latest == to_utc("2024-01-01T08:30:00Z")
+
+
+def test_migration_normalizes_timestamps_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.migrations.MIGRATION_BATCH_SIZE", 3)
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE payments (id VARCHAR PRIMARY KEY, created_at VARCHAR, "
+            "updated_at VARCHAR, status VARCHAR, amount FLOAT, total_money FLOAT, "
+            "approved_money FLOAT, currency VARCHAR, card_brand VARCHAR, "
+            "location_id VARCHAR, order_id VARCHAR, square_product VARCHAR)"))
+        conn.execute(text("INSERT INTO payments (id, created_at, updated_at) VALUES "
+                          "(:id, :created_at, :updated_at)"), [
+            {"id": f"P{i}", "created_at": f"2024-01-01T{i:02d}:00:00Z",
+             "updated_at": f"2024-01-01 {i:02d}:00:00+00:00"} for i in range(10)
+        ] + [{"id": "LOCAL", "created_at": None, "updated_at": "2024-01-02T01:00:00+02:00"},
+             {"id": "BROKEN", "created_at": "yesterday", "updated_at": "2024-01-01T05:30:00Z"}])
+
+    migrate(engine)
+    migrate(engine)
+
+    with engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT id, updated_at FROM payments")).all())
+        latest = conn.execute(text("SELECT MAX(updated_at) FROM payments")).scalar_one()
+        created = conn.execute(text("SELECT created_at FROM payments WHERE id = 'LOCAL'"))
+        broken = conn.execute(text(
+            "SELECT created_at, updated_at FROM payments WHERE id = 'BROKEN'")).one()
+
+        assert rows["P3"] == "2024-01-01 03:00:00.000000"
+        assert latest == "2024-01-01 23:00:00.000000"
+        assert created.scalar_one() is None
+        # The unparseable value is quarantined and cleared, the rest of its row normalized
+        assert tuple(broken) == (None, "2024-01-01 05:30:00.000000")
+        quarantined = conn.execute(text("SELECT * FROM timestamp_quarantine")).all()
+        assert [tuple(row) for row in quarantined] == [
+            ("payments", '{"id": "BROKEN"}', "created_at", "yesterday")]
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("payments")}
+    assert {"ix_payments_updated_at", "ix_payments_order_id"} <= indexes
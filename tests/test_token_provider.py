@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+
+import pytest
+
+from app.db_models import AccessToken
+from app.pkce_flow import iso_to_utc
+from belly_rubb.etl.token_provider import TokenCache, TokenProvider
+
+
+@pytest.fixture
+def cache():
+    token_cache = TokenCache(margin=timedelta(hours=1), retry=timedelta(minutes=5))
+    yield token_cache
+    token_cache.clear()
+
+
+def _loader(expires_in: timedelta, delay: float = 0.0):
+    loads = []
+
+    def load(merchant_id):
+        loads.append(merchant_id)
+        time.sleep(delay)
+        return f"token-{len(loads)}", datetime.now(timezone.utc) + expires_in
+
+    return load, loads
+
+
+def test_concurrent_callers_share_a_single_load(cache):
+    load, loads = _loader(timedelta(days=30), delay=0.05)
+    tokens = []
+
+    threads = [
+        threading.Thread(target=lambda: tokens.append(cache.get("MERCHANT", load)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["MERCHANT"]
+    assert tokens == ["token-1"] * 8
+
+
+def test_fresh_token_is_served_from_memory(cache):
+    load, loads = _loader(timedelta(days=30))
+
+    assert cache.get("MERCHANT", load) == cache.get("MERCHANT", load) == "token-1"
+    assert len(loads) == 1
+
+
+def test_stale_token_is_reloaded(cache):
+    load, loads = _loader(timedelta(minutes=30))
+
+    assert cache.get("MERCHANT", load) == "token-1"
+
+    # A token inside the margin is retried, not reloaded on every call
+    assert cache.get("MERCHANT", load) == "token-1"
+    assert cache.refresh("MERCHANT", load, force=True) == "token-2"
+    assert len(loads) == 2
+
+
+def test_token_is_served_until_it_expires(cache):
+    load, loads = _loader(timedelta(minutes=2))
+
+    # Inside the refresh margin but outside the expiry skew
+    assert cache.get("MERCHANT", load) == cache.get("MERCHANT", load) == "token-1"
+    assert len(loads) == 1
+
+    cache.skew = timedelta(minutes=5)
+    assert cache.get("MERCHANT", load) == "token-2"
+
+
+def test_background_refresh_runs_before_expiry():
+    cache = TokenCache(margin=timedelta(seconds=30) - timedelta(milliseconds=50))
+    load, loads = _loader(timedelta(seconds=30))
+
+    try:
+        assert cache.get("MERCHANT", load) == "token-1"
+        time.sleep(0.3)
+        assert len(loads) >= 2
+        assert cache.get("MERCHANT", load) == f"token-{len(loads)}"
+    finally:
+        cache.clear()
+
+
+def test_provider_reads_database_once(session_db, cache, monkeypatch):
+    session_db.add(AccessToken(
+        merchant_id="MERCHANT",
+        access_token="ACCESS",
+        expires_at=iso_to_utc(datetime.now(timezone.utc) + timedelta(days=30)),
+        refresh_token="REFRESH",
+        refresh_token_expires_at=iso_to_utc(datetime.now(timezone.utc) + timedelta(days=90)),
+    ))
+    session_db.commit()
+
+    provider = TokenProvider(cache=cache)
+    assert provider.get_access_token("MERCHANT") == "ACCESS"
+
+    # Further reads never reach the database
+    monkeypatch.setattr(provider, "_pull_token", pytest.fail)
+    assert provider.get_access_token("MERCHANT") == "ACCESS"
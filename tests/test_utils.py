@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from belly_rubb import utils
+from belly_rubb.features import load_synonym_index
+
+SYNONYMS = {
+    "chicken wings": {
+        "base_name": "chicken wings",
+        "aliases": ["CHICKEN WINGS", "WINGS"],
+        "variations": {"6 pcs": ["6 pcs", "6 Wings"]},
+    },
+}
+
+
+@pytest.fixture
+def synonyms_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_COMPILED", {})
+    path = tmp_path / "item_synonyms.json"
+    path.write_text(json.dumps(SYNONYMS))
+    return path
+
+
+def test_index_is_cached_in_memory_until_the_file_changes(synonyms_path, tmp_path):
+    first = load_synonym_index(synonyms_path, tmp_path)
+    assert load_synonym_index(synonyms_path, tmp_path) is first
+
+    changed = {**SYNONYMS, "fries": {"aliases": ["FRIES"], "variations": {}}}
+    synonyms_path.write_text(json.dumps(changed))
+
+    assert load_synonym_index(synonyms_path, tmp_path).alias_to_base["fries"] == "fries"
+
+    # Only the compiled form of the current content is kept on disk
+    assert len(list(tmp_path.glob("item_synonyms.compile_synonyms.*.json"))) == 1
+
+
+def test_new_processes_load_the_compiled_index_from_disk(synonyms_path, tmp_path,
+                                                         monkeypatch):
+    compiled = load_synonym_index(synonyms_path, tmp_path)
+    cache_file, = tmp_path.glob("item_synonyms.compile_synonyms.*.json")
+    cached = json.loads(cache_file.read_text())
+    assert cached[0] == compiled.alias_to_base
+
+    # Same content with a new mtime is recognized by its hash and not compiled again
+    cached[0] = {"wings": "cached wings"}
+    cache_file.write_text(json.dumps(cached))
+    stat = os.stat(synonyms_path)
+    os.utime(synonyms_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    monkeypatch.setattr(utils, "_COMPILED", {})
+
+    index = load_synonym_index(synonyms_path, tmp_path)
+    assert index.alias_to_base == {"wings": "cached wings"}
+    assert index.parenthesized == compiled.parenthesized
+
+
+def test_editing_a_literal_of_the_compiler_invalidates_the_disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_COMPILED", {})
+    path = tmp_path / "config.json"
+    path.write_text("{}")
+
+    def compile_config(config):
+        return {"version": 1}
+
+    def edited(config):
+        return {"version": 2}
+    edited.__name__ = compile_config.__name__
+
+    assert utils.load_compiled_config(path, compile_config, dict, tmp_path) == {"version": 1}
+    assert utils.load_compiled_config(path, edited, dict, tmp_path) == {"version": 2}
+    assert len(list(tmp_path.glob("config.compile_config.*.json"))) == 1
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.db_models import SyncState
+from app.pkce_flow import iso_to_utc
+from belly_rubb.etl import APIManager, SyncWatermark
+
+LAST_SYNCED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _record(updated_at: datetime):
+    return SimpleNamespace(updated_at=iso_to_utc(updated_at))
+
+
+def test_missing_sync_state_treats_every_record_as_recent(session_db):
+    watermark = SyncWatermark.load("payments", session_db)
+
+    assert watermark.last_synced is None
+    assert watermark.is_recent(LAST_SYNCED - timedelta(days=365))
+
+
+def test_watermark_is_parsed_once(session_db):
+    session_db.add(SyncState(resource="payments", last_synced=iso_to_utc(LAST_SYNCED)))
+    session_db.commit()
+
+    watermark = SyncWatermark.load("payments", session_db, overlap=timedelta(0))
+
+    assert watermark.last_synced == LAST_SYNCED
+    assert watermark.is_recent(LAST_SYNCED + timedelta(seconds=1))
+    assert watermark.is_recent(LAST_SYNCED)
+    assert not watermark.is_recent(LAST_SYNCED - timedelta(seconds=1))
+
+
+def test_overlap_window_reaches_back_before_watermark():
+    watermark = SyncWatermark("payments", LAST_SYNCED, overlap=timedelta(minutes=5))
+
+    assert watermark.since() == LAST_SYNCED - timedelta(minutes=5)
+    assert watermark.isoformat() == "2023-12-31T23:55:00Z"
+    assert watermark.is_recent(LAST_SYNCED - timedelta(minutes=5))
+    assert not watermark.is_recent(LAST_SYNCED - timedelta(minutes=6))
+
+
+def test_iter_records_stops_at_first_old_record_when_sorted():
+    watermark = SyncWatermark("payments", LAST_SYNCED)
+    records = [
+        _record(LAST_SYNCED + timedelta(hours=2)),
+        _record(LAST_SYNCED - timedelta(hours=1)),
+        _record(LAST_SYNCED + timedelta(hours=1)),
+    ]
+
+    assert len(list(APIManager().iter_records(records, watermark))) == 2
+    assert len(list(APIManager().iter_records(records, watermark, sorted_by_updated=True))) == 1